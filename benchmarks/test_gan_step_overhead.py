@@ -0,0 +1,84 @@
+import time
+from argparse import Namespace
+
+import numpy as np
+import pytest
+import torch
+from torch.utils.data import TensorDataset, DataLoader
+
+from pytorch_lightning import Trainer
+
+pytest.importorskip('torchvision')
+from pl_examples.domain_templates.generative_adversarial_net import GAN  # noqa: E402
+
+
+class SyntheticGAN(GAN):
+
+    def train_dataloader(self):
+        imgs = torch.randn(64, 1, 28, 28)
+        labels = torch.zeros(64, dtype=torch.long)
+        return DataLoader(TensorDataset(imgs, labels), batch_size=self.hparams.batch_size)
+
+    def on_epoch_end(self):
+        pass
+
+
+def naive_toggle(model, optimizers, opt_idx):
+    # what the training loop used to do on every step
+    for param in model.parameters():
+        param.requires_grad = False
+    for group in optimizers[opt_idx].param_groups:
+        for param in group['params']:
+            param.requires_grad = True
+
+
+def measure(fn, num_runs=10, num_steps=200):
+    """Returns the mean time per call over several runs."""
+    times = []
+    for _ in range(num_runs):
+        start = time.perf_counter()
+        for step in range(num_steps):
+            fn(step % 2)
+        times.append((time.perf_counter() - start) / num_steps)
+    return np.mean(times)
+
+
+def test_gan_toggle_overhead(tmpdir, record_property):
+    """
+    Verify that toggling the parameters between the generator and the discriminator
+    with the cached partition flips each parameter at most once per step and is not slower
+    than going through the model
+    :param tmpdir:
+    :return:
+    """
+    hparams = Namespace(latent_dim=100, lr=0.0002, b1=0.5, b2=0.999, batch_size=16)
+    model = SyntheticGAN(hparams)
+    trainer = Trainer(
+        default_save_path=tmpdir,
+        max_epochs=1,
+        progress_bar_refresh_rate=0,
+        weights_summary=None,
+        logger=False,
+        checkpoint_callback=False,
+    )
+    trainer.fit(model)
+
+    # generator and discriminator alternate, so only these transitions are ever computed
+    assert set(trainer._params_toggles) == {(None, 0), (0, 1), (1, 0)}
+
+    # a step only flips the parameters which change owner, the naive toggle sets all of them
+    # and then the ones of the optimizer again
+    num_params = len(list(model.parameters()))
+    for opt_idx in (0, 1):
+        enable, disable = trainer._params_toggles[(1 - opt_idx, opt_idx)]
+        own_params = len(trainer._params_by_optimizer[opt_idx])
+        other_params = len(trainer._params_by_optimizer[1 - opt_idx])
+        assert len(enable) + len(disable) == own_params + other_params < num_params + own_params
+
+    naive_time = measure(lambda opt_idx: naive_toggle(model, trainer.optimizers, opt_idx))
+    cached_time = measure(trainer.toggle_optimizer_params)
+    record_property('naive_toggle_us', naive_time * 1e6)
+    record_property('cached_toggle_us', cached_time * 1e6)
+
+    # the timings are noisy, the tolerance keeps the check from failing on a slow run
+    assert cached_time <= naive_time * 1.2
@@ -0,0 +1,74 @@
+import pytest
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.utils.data import TensorDataset, DataLoader
+
+from pytorch_lightning import Trainer, LightningModule
+
+
+class CountingModel(LightningModule):
+    def __init__(self, optimizer_name, max_iter=1):
+        super(CountingModel, self).__init__()
+        self.optimizer_name = optimizer_name
+        self.max_iter = max_iter
+        self.linear = nn.Linear(10, 1)
+        self.forward_calls = 0
+
+    def forward(self, x):
+        self.forward_calls += 1
+        return self.linear(x)
+
+    def training_step(self, batch, batch_nb):
+        x, y = batch
+        loss = F.mse_loss(self(x), y)
+        return {'loss': loss, 'log': {'train_loss': loss}}
+
+    def configure_optimizers(self):
+        if self.optimizer_name == 'lbfgs':
+            return torch.optim.LBFGS(self.parameters(), lr=0.1, max_iter=self.max_iter)
+        return torch.optim.SGD(self.parameters(), lr=0.1)
+
+    def train_dataloader(self):
+        x = torch.randn(64, 10)
+        y = x.sum(dim=1, keepdim=True)
+        return DataLoader(TensorDataset(x, y), batch_size=8)
+
+
+@pytest.mark.parametrize(['optimizer_name', 'max_iter'], [
+    pytest.param('sgd', 1, id='sgd'),
+    pytest.param('lbfgs', 1, id='lbfgs-1-iter'),
+    pytest.param('lbfgs', 3, id='lbfgs-3-iter'),
+])
+def test_forward_calls_per_step(tmpdir, optimizer_name, max_iter):
+    """
+    Verify that the training step is not run again for the optimizer closure,
+    only when the optimizer really evaluates it again
+    :param tmpdir:
+    :return:
+    """
+    model = CountingModel(optimizer_name, max_iter)
+    trainer = Trainer(
+        default_save_path=tmpdir,
+        max_epochs=1,
+        progress_bar_refresh_rate=0,
+        weights_summary=None,
+        logger=False,
+        checkpoint_callback=False,
+    )
+    trainer.fit(model)
+
+    num_steps = trainer.num_training_batches
+    assert trainer.global_step == num_steps
+
+    optimizer = trainer.optimizers[0]
+    if optimizer_name == 'lbfgs':
+        # LBFGS counts its closure evaluations, the first of every step is the cached one
+        func_evals = optimizer.state[optimizer._params[0]]['func_evals']
+        expected_forward_calls = func_evals
+    else:
+        expected_forward_calls = num_steps
+
+    assert model.forward_calls == expected_forward_calls
+    if max_iter == 1:
+        assert model.forward_calls == num_steps
@@ -15,6 +15,7 @@ import numpy as np
 
 from pytorch_lightning.callbacks.base import Callback
 from pytorch_lightning import _logger as log
+from pytorch_lightning.core.saving import remove_checkpoint
 
 
 class ModelCheckpoint(Callback):
@@ -106,6 +107,8 @@ class ModelCheckpoint(Callback):
         self.kth_best_model = ''
         self.best = 0
         self.save_function = None
+        # writes and removes the checkpoints in the background with `Trainer(async_checkpoints=...)`
+        self.checkpoint_writer = None
 
         mode_dict = {
             'min': (np.less, np.Inf, 'min'),
@@ -123,7 +126,15 @@ class ModelCheckpoint(Callback):
         self.monitor_op, self.kth_value, self.mode = mode_dict[mode]
 
     def _del_model(self, filepath):
-        os.remove(filepath)
+        if self.checkpoint_writer is not None:
+            # the checkpoint may still be in the making
+            self.checkpoint_writer.remove(filepath)
+        else:
+            remove_checkpoint(filepath)
+
+    def _file_exists(self, filepath):
+        pending = self.checkpoint_writer is not None and self.checkpoint_writer.is_pending(filepath)
+        return pending or os.path.isfile(filepath)
 
     def _save_model(self, filepath):
         # make paths
@@ -197,7 +208,7 @@ class ModelCheckpoint(Callback):
 
         filepath = self.format_checkpoint_name(epoch, metrics)
         version_cnt = 0
-        while os.path.isfile(filepath):
+        while self._file_exists(filepath):
             filepath = self.format_checkpoint_name(epoch, metrics, ver=version_cnt)
             # this epoch called before
             version_cnt += 1
@@ -218,11 +229,11 @@ class ModelCheckpoint(Callback):
             self._save_model(filepath)
 
     def _do_check_save(self, filepath, current, epoch):
-        # remove kth
+        # remove kth, once the new checkpoint is saved
+        delpath = None
         if len(self.best_k_models) == self.save_top_k and self.save_top_k > 0:
             delpath = self.kth_best_model
             self.best_k_models.pop(self.kth_best_model)
-            self._del_model(delpath)
 
         self.best_k_models[filepath] = current
         if len(self.best_k_models) == self.save_top_k:
@@ -241,3 +252,8 @@ class ModelCheckpoint(Callback):
                 f' {current:0.5f} (best {self.best:0.5f}), saving model to'
                 f' {filepath} as top {self.save_top_k}')
         self._save_model(filepath)
+
+        # an incremental checkpoint shares the unchanged tensors with the one it replaces,
+        # which only stay in the store as long as a checkpoint references them
+        if delpath is not None:
+            self._del_model(delpath)
@@ -1,30 +1,58 @@
 """
 Module to describe gradients
 """
-from typing import Dict
+import math
+from typing import Dict, Optional
 
+import torch
 from torch import nn
 
 
 class GradInformation(nn.Module):
 
-    def grad_norm(self, norm_type: float) -> Dict[str, int]:
-        results = {}
-        total_norm = 0
+    def grad_norm(self, norm_type: float, group_depth: Optional[int] = None) -> Dict[str, float]:
+        """Computes the norms of the gradients and their total norm.
+
+        The norms are computed on the device and copied to the host together,
+        instead of one sync per parameter.
+
+        Args:
+            norm_type: The type of the norm, e.g. 2 for the 2-norm.
+            group_depth: If given, the parameters are grouped by the first ``group_depth``
+                parts of their names and one norm is reported per group,
+                e.g. 1 reports a norm per top-level module.
+
+        Return:
+            Dict with the norm of every parameter (or group) and the total norm.
+        """
+        names, norms = [], []
         for name, p in self.named_parameters():
-            if p.requires_grad:
-                try:
-                    param_norm = p.grad.data.norm(norm_type)
-                    total_norm += param_norm ** norm_type
-                    norm = param_norm ** (1 / norm_type)
-
-                    grad = round(norm.data.cpu().numpy().flatten()[0], 3)
-                    results['grad_{}_norm_{}'.format(norm_type, name)] = grad
-                except Exception:
-                    # this param had no grad
-                    pass
-
-        total_norm = total_norm ** (1. / norm_type)
-        grad = round(total_norm.data.cpu().numpy().flatten()[0], 3)
-        results['grad_{}_norm_total'.format(norm_type)] = grad
+            if p.requires_grad and p.grad is not None:
+                names.append(name)
+                norms.append(p.grad.data.norm(norm_type))
+
+        if not norms:
+            return {}
+
+        # single transfer to the host
+        device = norms[0].device
+        norms = torch.stack([norm.to(device, torch.float32) for norm in norms]).cpu().tolist()
+
+        groups = {}
+        for name, norm in zip(names, norms):
+            if group_depth is not None:
+                name = '.'.join(name.split('.')[:group_depth])
+            groups.setdefault(name, []).append(norm)
+        groups['total'] = norms
+
+        results = {}
+        for name, group_norms in groups.items():
+            results['grad_{}_norm_{}'.format(norm_type, name)] = round(_total_norm(group_norms, norm_type), 3)
         return results
+
+
+def _total_norm(norms, norm_type: float) -> float:
+    """Combines the norms of several tensors into the norm of all of them."""
+    if norm_type == math.inf:
+        return max(norms)
+    return sum(norm ** norm_type for norm in norms) ** (1. / norm_type)
@@ -17,7 +17,7 @@ from pytorch_lightning import _logger as log
 from pytorch_lightning.core.grads import GradInformation
 from pytorch_lightning.core.hooks import ModelHooks
 from pytorch_lightning.core.memory import ModelSummary
-from pytorch_lightning.core.saving import ModelIO, load_hparams_from_tags_csv
+from pytorch_lightning.core.saving import ModelIO, load_checkpoint, load_hparams_from_tags_csv
 from pytorch_lightning.overrides.data_parallel import LightningDistributedDataParallel
 from pytorch_lightning.utilities.exceptions import MisconfigurationException
 
@@ -72,6 +72,10 @@ class LightningModule(ABC, GradInformation, ModelIO, ModelHooks):
 
         self.hparams = None
 
+        #: Bumped by :meth:`freeze` and :meth:`unfreeze`, so that the trainer sets ``requires_grad``
+        #: of all parameters again when it toggles between multiple optimizers
+        self._requires_grad_version = 0
+
     def print(self, *args, **kwargs) -> None:
         r"""
         Prints only from process 0. Use this in any distributed mode to log only once.
@@ -236,6 +240,47 @@ class LightningModule(ABC, GradInformation, ModelIO, ModelHooks):
             Deprecated in v0.7.0. Use  :meth:`training_step_end` instead.
         """
 
+    def training_epoch_accumulate(self, state: Any, output: Dict[str, Tensor]) -> Any:
+        """Called after every training step to fold its output into a running state.
+
+        Override this when the outputs of a whole epoch are too many to keep in memory.
+        :meth:`training_epoch_end` then receives the final state instead of the list of outputs.
+
+        .. code-block:: python
+
+            # the pseudocode for these calls
+            state = None
+            for train_batch in train_data:
+                out = training_step(train_batch)
+                state = training_epoch_accumulate(state, out)
+            training_epoch_end(state)
+
+        Args:
+            state: What this method returned for the previous step, ``None`` for the first step.
+            output: What you returned in :meth:`training_step`, detached from the graph.
+
+        Return:
+            The updated state.
+
+        Note:
+            If this method is not overridden, this won't be called.
+
+        Examples:
+            .. code-block:: python
+
+                from pytorch_lightning.trainer.supporters import EpochOutputReducer
+
+                def training_epoch_accumulate(self, state, output):
+                    if state is None:
+                        state = EpochOutputReducer(train_acc='mean')
+                    state.update(output)
+                    return state
+
+                def training_epoch_end(self, state):
+                    train_acc_mean = state.compute()['train_acc']
+                    return {'log': {'train_acc': train_acc_mean.item()}}
+        """
+
     def training_epoch_end(
             self,
             outputs: Union[List[Dict[str, Tensor]], List[List[Dict[str, Tensor]]]]
@@ -254,6 +299,7 @@ class LightningModule(ABC, GradInformation, ModelIO, ModelHooks):
         Args:
             outputs: List of outputs you defined in :meth:`training_step`, or if there are
                 multiple dataloaders, a list containing a list of outputs for each dataloader.
+                If :meth:`training_epoch_accumulate` is overridden, the state it returned last.
 
         Return:
             Dict or OrderedDict.
@@ -530,6 +576,49 @@ class LightningModule(ABC, GradInformation, ModelIO, ModelHooks):
             Will be removed in 1.0.0.
         """
 
+    def validation_epoch_accumulate(self, state: Any, output: Dict[str, Tensor]) -> Any:
+        """Called after every validation step to fold its output into a running state.
+
+        Override this when the outputs of a whole validation epoch are too many to keep in memory.
+        :meth:`validation_epoch_end` then receives the final state (one per dataloader)
+        instead of the list of outputs.
+
+        .. code-block:: python
+
+            # the pseudocode for these calls
+            state = None
+            for val_batch in val_data:
+                out = validation_step(val_batch)
+                state = validation_epoch_accumulate(state, out)
+            validation_epoch_end(state)
+
+        Args:
+            state: What this method returned for the previous step, ``None`` for the first step.
+            output: What you returned in :meth:`validation_step`.
+
+        Return:
+            The updated state.
+
+        Note:
+            If this method is not overridden, this won't be called.
+
+        Examples:
+            .. code-block:: python
+
+                from pytorch_lightning.trainer.supporters import EpochOutputReducer
+
+                def validation_epoch_accumulate(self, state, output):
+                    if state is None:
+                        # keep the predictions in pinned CPU memory instead of on the GPU
+                        state = EpochOutputReducer(val_loss='mean', preds='cat', offload=True)
+                    state.update(output)
+                    return state
+
+                def validation_epoch_end(self, state):
+                    results = state.compute()
+                    return {'log': {'val_loss': results['val_loss']}}
+        """
+
     def validation_epoch_end(
             self,
             outputs: Union[List[Dict[str, Tensor]], List[List[Dict[str, Tensor]]]]
@@ -549,6 +638,7 @@ class LightningModule(ABC, GradInformation, ModelIO, ModelHooks):
         Args:
             outputs: List of outputs you defined in :meth:`validation_step`, or if there
                 are multiple dataloaders, a list containing a list of outputs for each dataloader.
+                If :meth:`validation_epoch_accumulate` is overridden, the state it returned last.
 
         Return:
             Dict or OrderedDict.
@@ -757,6 +847,49 @@ class LightningModule(ABC, GradInformation, ModelIO, ModelHooks):
              Will be removed in 1.0.0.
         """
 
+    def test_epoch_accumulate(self, state: Any, output: Dict[str, Tensor]) -> Any:
+        """Called after every test step to fold its output into a running state.
+
+        Override this when the outputs of a whole test epoch are too many to keep in memory.
+        :meth:`test_epoch_end` then receives the final state (one per dataloader)
+        instead of the list of outputs.
+
+        .. code-block:: python
+
+            # the pseudocode for these calls
+            state = None
+            for test_batch in test_data:
+                out = test_step(test_batch)
+                state = test_epoch_accumulate(state, out)
+            test_epoch_end(state)
+
+        Args:
+            state: What this method returned for the previous step, ``None`` for the first step.
+            output: What you returned in :meth:`test_step`.
+
+        Return:
+            The updated state.
+
+        Note:
+            If this method is not overridden, this won't be called.
+
+        Examples:
+            .. code-block:: python
+
+                from pytorch_lightning.trainer.supporters import EpochOutputReducer
+
+                def test_epoch_accumulate(self, state, output):
+                    if state is None:
+                        # keep the predictions in pinned CPU memory instead of on the GPU
+                        state = EpochOutputReducer(test_loss='mean', preds='cat', offload=True)
+                    state.update(output)
+                    return state
+
+                def test_epoch_end(self, state):
+                    results = state.compute()
+                    return {'log': {'test_loss': results['test_loss']}}
+        """
+
     def test_epoch_end(
             self,
             outputs: Union[List[Dict[str, Tensor]], List[List[Dict[str, Tensor]]]]
@@ -776,6 +909,7 @@ class LightningModule(ABC, GradInformation, ModelIO, ModelHooks):
         Args:
             outputs: List of outputs you defined in :meth:`test_step_end`, or if there
                 are multiple dataloaders, a list containing a list of outputs for each dataloader
+                If :meth:`test_epoch_accumulate` is overridden, the state it returned last.
 
         Return:
             Dict or OrderedDict: Dict has the following optional keys:
@@ -1448,7 +1582,8 @@ class LightningModule(ABC, GradInformation, ModelIO, ModelHooks):
             map_location:
                 If your checkpoint saved a GPU model and you now load on CPUs
                 or a different number of GPUs, use this to map to the new setup.
-                The behaviour is the same as in :func:`torch.load`.
+                The behaviour is the same as in :func:`torch.load`, except for checkpoints saved with
+                ``Trainer(checkpoint_format='streaming')``, whose tensors are only moved to a device.
             tags_csv: Optional path to a .csv file with two columns (key, value)
                 as in this example::
 
@@ -1498,10 +1633,7 @@ class LightningModule(ABC, GradInformation, ModelIO, ModelHooks):
                 pretrained_model.freeze()
                 y_hat = pretrained_model(x)
         """
-        if map_location is not None:
-            checkpoint = torch.load(checkpoint_path, map_location=map_location)
-        else:
-            checkpoint = torch.load(checkpoint_path, map_location=lambda storage, loc: storage)
+        checkpoint = load_checkpoint(checkpoint_path, map_location=map_location)
 
         if tags_csv is not None:
             # add the hparams from csv file to checkpoint
@@ -1567,6 +1699,7 @@ class LightningModule(ABC, GradInformation, ModelIO, ModelHooks):
         """
         for param in self.parameters():
             param.requires_grad = False
+        self._requires_grad_version = getattr(self, '_requires_grad_version', 0) + 1
 
         self.eval()
 
@@ -1582,6 +1715,7 @@ class LightningModule(ABC, GradInformation, ModelIO, ModelHooks):
         """
         for param in self.parameters():
             param.requires_grad = True
+        self._requires_grad_version = getattr(self, '_requires_grad_version', 0) + 1
 
         self.train()
 
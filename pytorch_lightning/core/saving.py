@@ -1,10 +1,31 @@
 import csv
+import hashlib
+import io
 import os
+import struct
 from argparse import Namespace
-from typing import Union, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, Dict, Any, Callable, List, Optional, Tuple
+
+import numpy as np
+import torch
 
 from pytorch_lightning import _logger as log
 
+# the layout of streaming checkpoints:
+#   magic | tensor data, each aligned to _ALIGNMENT | pickled checkpoint without that data | offset of the pickle
+_STREAMING_MAGIC = b'PLSTRM01'
+# the layout of incremental checkpoints:
+#   magic | pickled checkpoint referencing the tensor data in files of _BLOB_DIR, named by their hash
+_INCREMENTAL_MAGIC = b'PLINCR01'
+_BLOB_DIR = '.checkpoint_blobs'
+_ALIGNMENT = 64
+_STREAMED_DTYPES = {
+    torch.float16, torch.float32, torch.float64, torch.uint8, torch.int8,
+    torch.int16, torch.int32, torch.int64, torch.bool,
+}
+_PREFETCH_CHUNK = 16 * 1024 * 1024
+
 
 class ModelIO(object):
 
@@ -36,6 +57,299 @@ class ModelIO(object):
         """
 
 
+class _TensorRef(object):
+    """Stands for a tensor stored outside the pickle of a streaming or incremental checkpoint:
+    at ``offset`` in the checkpoint file, or in the ``blob`` file of the blob store."""
+
+    def __init__(self, offset: int, dtype: str, shape: Tuple[int, ...], blob: Optional[str] = None):
+        self.offset = offset
+        self.dtype = dtype
+        self.shape = shape
+        self.blob = blob
+
+    @property
+    def nbytes(self) -> int:
+        return int(np.prod(self.shape, dtype=np.int64)) * np.dtype(self.dtype).itemsize
+
+
+def save_streaming_checkpoint(checkpoint: Dict[str, Any], filepath: str) -> None:
+    """Saves a checkpoint in a layout which :func:`load_checkpoint` maps into memory instead of reading it.
+
+    The tensors are written one at a time, each moved to the CPU on its own, followed by a pickle of the
+    rest of the checkpoint with references to them. Tensors of types numpy can't hold are pickled.
+
+    Args:
+        checkpoint: The checkpoint to save, anything ``torch.save`` accepts
+        filepath: The file to write
+    """
+    with open(filepath, 'wb') as fp:
+        fp.write(_STREAMING_MAGIC)
+        written = {}
+
+        def write_tensor(tensor):
+            if not _is_streamable(tensor):
+                return tensor
+            # tensors shared in the checkpoint (e.g. tied weights) are stored once
+            if id(tensor) not in written:
+                array = _to_array(tensor)
+                fp.write(b'\0' * (-fp.tell() % _ALIGNMENT))
+                ref = _TensorRef(fp.tell(), str(array.dtype.newbyteorder('=')), tuple(tensor.shape))
+                written[id(tensor)] = (tensor, ref)
+                fp.write(array.tobytes())
+            return written[id(tensor)][1]
+
+        buffer = io.BytesIO()
+        torch.save(_map_tensors(checkpoint, write_tensor), buffer)
+        skeleton_offset = fp.tell()
+        fp.write(buffer.getvalue())
+        fp.write(struct.pack('<Q', skeleton_offset))
+
+
+def save_incremental_checkpoint(checkpoint: Dict[str, Any], filepath: str) -> None:
+    """Saves a checkpoint as a manifest referencing its tensors in a content-addressed blob store.
+
+    The blob store is a directory next to the checkpoint, shared by all incremental checkpoints in that
+    directory. Each tensor is stored under the hash of its data, so only the tensors which changed
+    since an earlier checkpoint (e.g. not the frozen layers) are written. Tensors of types numpy can't
+    hold are pickled in the manifest. :func:`remove_checkpoint` removes the blobs no checkpoint uses anymore.
+
+    Args:
+        checkpoint: The checkpoint to save, anything ``torch.save`` accepts
+        filepath: The file to write the manifest to
+
+    Examples:
+        >>> import tempfile
+        >>> tmpdir = tempfile.mkdtemp()
+        >>> weights = {'frozen': torch.zeros(3), 'trained': torch.ones(3)}
+        >>> save_incremental_checkpoint({'state_dict': weights}, os.path.join(tmpdir, 'first.ckpt'))
+        >>> weights['trained'] += 1
+        >>> save_incremental_checkpoint({'state_dict': weights}, os.path.join(tmpdir, 'second.ckpt'))
+        >>> len(os.listdir(os.path.join(tmpdir, _BLOB_DIR)))
+        3
+        >>> remove_checkpoint(os.path.join(tmpdir, 'first.ckpt'))
+        >>> len(os.listdir(os.path.join(tmpdir, _BLOB_DIR)))
+        2
+    """
+    store = _blob_store(filepath)
+    os.makedirs(store, exist_ok=True)
+    written = {}
+
+    def write_blob(tensor):
+        if not _is_streamable(tensor):
+            return tensor
+        if id(tensor) not in written:
+            array = _to_array(tensor)
+            data = array.tobytes()
+            blob = hashlib.blake2b(data, digest_size=20).hexdigest()
+            blob_path = os.path.join(store, blob)
+            # only tensors which aren't in the store yet are written
+            if not os.path.isfile(blob_path):
+                with open(blob_path + '.part', 'wb') as fp:
+                    fp.write(data)
+                os.replace(blob_path + '.part', blob_path)
+            ref = _TensorRef(0, str(array.dtype.newbyteorder('=')), tuple(tensor.shape), blob=blob)
+            written[id(tensor)] = (tensor, ref)
+        return written[id(tensor)][1]
+
+    buffer = io.BytesIO()
+    torch.save(_map_tensors(checkpoint, write_blob), buffer)
+    with open(filepath, 'wb') as fp:
+        fp.write(_INCREMENTAL_MAGIC)
+        fp.write(buffer.getvalue())
+
+
+def is_streaming_checkpoint(filepath: str) -> bool:
+    """Tells whether ``filepath`` was saved by :func:`save_streaming_checkpoint`."""
+    return _read_magic(filepath) == _STREAMING_MAGIC
+
+
+def is_incremental_checkpoint(filepath: str) -> bool:
+    """Tells whether ``filepath`` was saved by :func:`save_incremental_checkpoint`."""
+    return _read_magic(filepath) == _INCREMENTAL_MAGIC
+
+
+def load_checkpoint(filepath: str, map_location: Any = None, prefetch_threads: int = 4) -> Dict[str, Any]:
+    """Loads a checkpoint saved by ``torch.save``, :func:`save_streaming_checkpoint`
+    or :func:`save_incremental_checkpoint`.
+
+    The tensors of streaming and incremental checkpoints are mapped from the files rather than read:
+    they take no memory until used, e.g. copied into the parameters by ``load_state_dict``, and modifying
+    them doesn't change the files. The ``state_dict`` is read ahead by ``prefetch_threads`` threads.
+
+    Args:
+        filepath: The checkpoint file
+        map_location: Where to load the tensors, as for :func:`torch.load`; loads to the CPU by default.
+            A device moves the mapped tensors onto it, with a function or dict they stay on the CPU.
+        prefetch_threads: How many threads read the ``state_dict`` ahead, 0 to not read ahead
+
+    Returns:
+        The checkpoint
+
+    Examples:
+        >>> import tempfile
+        >>> filepath = os.path.join(tempfile.mkdtemp(), 'example.ckpt')
+        >>> save_streaming_checkpoint({'state_dict': {'weight': torch.ones(2, 2)}, 'epoch': 3}, filepath)
+        >>> checkpoint = load_checkpoint(filepath)
+        >>> checkpoint['epoch'], checkpoint['state_dict']['weight'].sum().item()
+        (3, 4.0)
+    """
+    if map_location is None:
+        map_location = lambda storage, loc: storage  # noqa: E731
+
+    magic = _read_magic(filepath)
+    if magic == _STREAMING_MAGIC:
+        with open(filepath, 'rb') as fp:
+            fp.seek(-8, os.SEEK_END)
+            skeleton_end = fp.tell()
+            skeleton_offset, = struct.unpack('<Q', fp.read(8))
+            fp.seek(skeleton_offset)
+            skeleton = torch.load(io.BytesIO(fp.read(skeleton_end - skeleton_offset)), map_location=map_location)
+    elif magic == _INCREMENTAL_MAGIC:
+        skeleton = _read_manifest(filepath, map_location)
+    else:
+        return torch.load(filepath, map_location=map_location)
+
+    store = _blob_store(filepath)
+
+    def data_path(ref: _TensorRef) -> str:
+        return filepath if ref.blob is None else os.path.join(store, ref.blob)
+
+    if prefetch_threads > 0 and isinstance(skeleton, dict):
+        ranges = [(data_path(ref), ref.offset, ref.nbytes) for ref in _tensor_refs(skeleton.get('state_dict'))]
+        _prefetch(ranges, prefetch_threads)
+
+    device = map_location if isinstance(map_location, (str, torch.device)) else None
+    files = {}
+    tensors = {}
+
+    def map_tensor(ref):
+        if not isinstance(ref, _TensorRef):
+            return ref
+        if id(ref) not in tensors:
+            dtype = np.dtype(ref.dtype).newbyteorder('<')
+            path = data_path(ref)
+            if ref.nbytes == 0:
+                array = np.empty(ref.shape, dtype=dtype)
+            else:
+                if path not in files:
+                    # copy-on-write, so the tensors can be modified
+                    files[path] = np.memmap(path, dtype=np.uint8, mode='c')
+                array = files[path][ref.offset:ref.offset + ref.nbytes].view(dtype).reshape(ref.shape)
+            if not dtype.isnative:
+                array = array.astype(dtype.newbyteorder('='))
+            tensor = torch.from_numpy(array)
+            tensors[id(ref)] = tensor if device is None else tensor.to(device)
+        return tensors[id(ref)]
+
+    return _map_tensors(skeleton, map_tensor)
+
+
+def remove_checkpoint(filepath: str) -> None:
+    """Removes a checkpoint, and for an incremental one the blobs no other checkpoint next to it uses."""
+    incremental = is_incremental_checkpoint(filepath)
+    os.remove(filepath)
+    if incremental:
+        collect_blobs(os.path.dirname(os.path.abspath(filepath)))
+
+
+def collect_blobs(dirpath: str) -> int:
+    """Removes the blobs which none of the incremental checkpoints in ``dirpath`` reference.
+
+    Returns:
+        The number of blobs removed
+    """
+    store = os.path.join(dirpath, _BLOB_DIR)
+    if not os.path.isdir(store):
+        return 0
+
+    used = set()
+    for entry in os.scandir(dirpath):
+        if entry.is_file() and is_incremental_checkpoint(entry.path):
+            used.update(ref.blob for ref in _tensor_refs(_read_manifest(entry.path)))
+
+    removed = 0
+    for entry in os.scandir(store):
+        # also removes what's left of interrupted writes
+        if entry.name not in used:
+            os.remove(entry.path)
+            removed += 1
+    return removed
+
+
+def _map_tensors(obj, fn: Callable):
+    """Applies ``fn`` to the tensors (and tensor references) of a nested checkpoint, copying the containers."""
+    if isinstance(obj, (torch.Tensor, _TensorRef)):
+        return fn(obj)
+    if isinstance(obj, dict):
+        items = {k: _map_tensors(v, fn) for k, v in obj.items()}
+        if type(obj) is dict:
+            return items
+        # e.g. the OrderedDict of a state_dict, with its version information
+        mapping = type(obj)(items)
+        if hasattr(obj, '_metadata'):
+            mapping._metadata = obj._metadata
+        return mapping
+    if isinstance(obj, list):
+        return [_map_tensors(x, fn) for x in obj]
+    if isinstance(obj, tuple):
+        items = [_map_tensors(x, fn) for x in obj]
+        return type(obj)(*items) if hasattr(obj, '_fields') else tuple(items)
+    return obj
+
+
+def _is_streamable(tensor: torch.Tensor) -> bool:
+    return tensor.dtype in _STREAMED_DTYPES and tensor.layout == torch.strided and not tensor.is_quantized
+
+
+def _to_array(tensor: torch.Tensor) -> np.ndarray:
+    """The data of a tensor as a little-endian array on the CPU."""
+    array = tensor.detach().cpu().contiguous().numpy()
+    return array.astype(array.dtype.newbyteorder('<'), copy=False)
+
+
+def _read_magic(filepath: str) -> bytes:
+    with open(filepath, 'rb') as fp:
+        return fp.read(len(_STREAMING_MAGIC))
+
+
+def _read_manifest(filepath: str, map_location: Any = 'cpu'):
+    with open(filepath, 'rb') as fp:
+        fp.seek(len(_INCREMENTAL_MAGIC))
+        return torch.load(io.BytesIO(fp.read()), map_location=map_location)
+
+
+def _blob_store(filepath: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(filepath)), _BLOB_DIR)
+
+
+def _tensor_refs(obj) -> List[_TensorRef]:
+    if isinstance(obj, _TensorRef):
+        return [obj]
+    if isinstance(obj, dict):
+        obj = list(obj.values())
+    if isinstance(obj, (list, tuple)):
+        return [ref for x in obj for ref in _tensor_refs(x)]
+    return []
+
+
+def _prefetch(ranges: List[Tuple[str, int, int]], num_threads: int) -> None:
+    """Reads (file, offset, size) ranges in parallel so they are in the page cache when they are copied."""
+    def read(data_range):
+        path, offset, size = data_range
+        buffer = memoryview(bytearray(min(size, _PREFETCH_CHUNK)))
+        with open(path, 'rb', buffering=0) as fp:
+            fp.seek(offset)
+            remaining = size
+            while remaining > 0:
+                num_read = fp.readinto(buffer[:min(remaining, len(buffer))])
+                if not num_read:
+                    break
+                remaining -= num_read
+
+    with ThreadPoolExecutor(num_threads) as pool:
+        list(pool.map(read, ranges))
+
+
 def load_hparams_from_tags_csv(tags_csv: str) -> Namespace:
     if not os.path.isfile(tags_csv):
         log.warning(f'Missing Tags: {tags_csv}.')
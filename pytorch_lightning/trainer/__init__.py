@@ -135,6 +135,69 @@ Example::
     # default used by the Trainer
     trainer = Trainer(amp_level='O1')
 
+async_checkpoints
+^^^^^^^^^^^^^^^^^
+Writes checkpoints on a background thread. The checkpoint is copied to CPU memory, which only
+briefly pauses training, and then serialized and written to disk while training goes on. Up to this many
+checkpoints wait to be written, saving one more waits for the oldest.
+Checkpoints are still written atomically, and all of them are on disk when `fit` returns.
+Set to 0 to write checkpoints before training goes on.
+
+.. code-block:: python
+
+    # default used by the Trainer
+    trainer = Trainer(async_checkpoints=0)
+
+Example::
+
+    # write up to 2 checkpoints in the background
+    trainer = Trainer(async_checkpoints=2)
+
+auto_tune_dataloader
+^^^^^^^^^^^^^^^^^^^^
+Before training, runs short timed sweeps over the `num_workers`, `pin_memory` (when training on a GPU)
+and `prefetch_factor` (on PyTorch versions supporting it) of the train dataloader, and re-creates it with
+the settings loading the most samples per second. With `'batch_size'` the batch size is first doubled
+for as long as a training step still fits in GPU memory.
+The measurements are logged and saved in `dataloader_tuning.json` in the `default_save_path`, later runs
+over the same dataset (and batch size) use the saved settings without measuring again.
+With `ddp` and `ddp2` only the first process measures the settings and sends them to the others, so that
+all of them run as many batches. The dataloader is not tuned on TPUs.
+
+.. code-block:: python
+
+    # default used by the Trainer
+    trainer = Trainer(auto_tune_dataloader=False)
+
+Example::
+
+    # tune the worker processes, pinned memory and prefetching
+    trainer = Trainer(auto_tune_dataloader=True)
+
+    # also use the largest batch size which fits
+    trainer = Trainer(auto_tune_dataloader='batch_size')
+
+batches_per_epoch
+^^^^^^^^^^^^^^^^^
+Runs "virtual" epochs of this many batches instead of one pass over the train dataloader per epoch.
+The epochs draw their batches from the same dataloader iterator, so its worker processes are not restarted
+between epochs; a new pass only starts (and reshuffles a distributed sampler) once the data is exhausted.
+
+Everything scheduled per epoch (validation with `val_check_interval` and `check_val_every_n_epoch`,
+checkpointing, epoch-wise learning rate schedulers, `accumulate_grad_batches` schedules) then happens every
+`batches_per_epoch` steps, also for an infinite train dataloader (e.g. a streaming `IterableDataset`).
+Use `max_steps` to end training. `train_percent_check` is ignored.
+
+.. code-block:: python
+
+    # default used by the Trainer
+    trainer = Trainer(batches_per_epoch=None)
+
+Example::
+
+    # validate, checkpoint and step the lr schedulers every 5000 steps, for 100000 steps
+    trainer = Trainer(batches_per_epoch=5000, max_steps=100000, max_epochs=1000)
+
 benchmark
 ^^^^^^^^^
 
@@ -211,6 +274,34 @@ Example::
         prefix=''
     )
 
+checkpoint_format
+^^^^^^^^^^^^^^^^^
+How checkpoints are saved. `'torch'` saves them with `torch.save`, so loading one reads all of it into
+memory before the weights are copied into the model. `'streaming'` writes the tensors one after the other,
+followed by the rest of the checkpoint. Loading such a checkpoint maps the tensors from the file, so
+the weights are read (in parallel) straight into the parameters, and restoring takes about one copy
+of the model in memory instead of two.
+`'incremental'` saves each tensor in a store (the `.checkpoint_blobs` directory next to the checkpoints)
+under the hash of its data, and the checkpoint file itself only references them. Tensors which didn't
+change since an earlier checkpoint, like those of frozen layers, are not written again. Incremental
+checkpoints load like streaming ones, and when the checkpoint callback removes one, the tensors no other
+checkpoint uses are removed from the store.
+All formats are loaded by `resume_from_checkpoint` and
+:meth:`~pytorch_lightning.core.lightning.LightningModule.load_from_checkpoint`.
+
+.. code-block:: python
+
+    # default used by the Trainer
+    trainer = Trainer(checkpoint_format='torch')
+
+Example::
+
+    # save checkpoints which load without reading them into memory first
+    trainer = Trainer(checkpoint_format='streaming')
+
+    # only write the tensors which changed since the last checkpoint
+    trainer = Trainer(checkpoint_format='incremental')
+
 default_save_path
 ^^^^^^^^^^^^^^^^^
 
@@ -341,6 +432,38 @@ Example::
 
 .. note:: See the `multi-gpu computing guide <multi_gpu.rst>`_
 
+grad_norm_group_depth
+^^^^^^^^^^^^^^^^^^^^^
+When `track_grad_norm` is enabled, report one norm per group of parameters instead of one
+per parameter. Parameters are grouped by the first `grad_norm_group_depth` parts of their
+names, which keeps the number of logged values bounded for big models.
+
+Example::
+
+    # default used by the Trainer (ie: one norm per parameter)
+    trainer = Trainer(grad_norm_group_depth=None)
+
+    # one norm per top-level module, e.g. `grad_2_norm_encoder`
+    trainer = Trainer(track_grad_norm=2, grad_norm_group_depth=1)
+
+gradient_clip_algorithm
+^^^^^^^^^^^^^^^^^^^^^^^
+How the gradients are clipped when `gradient_clip_val` is set:
+
+- 'norm' scales the gradients down so their total norm is at most `gradient_clip_val`.
+- 'value' clamps each gradient value to [-gradient_clip_val, gradient_clip_val].
+
+With multiple optimizers, the gradients of each optimizer's parameters are clipped
+separately right before that optimizer steps.
+
+Example::
+
+    # default used by the Trainer
+    trainer = Trainer(gradient_clip_algorithm='norm')
+
+    # clip each gradient value to [-0.5, 0.5]
+    trainer = Trainer(gradient_clip_val=0.5, gradient_clip_algorithm='value')
+
 gradient_clip_val
 ^^^^^^^^^^^^^^^^^
 Gradient clipping value
@@ -470,6 +593,43 @@ Example::
     # Run at least for 100 steps (disable min_epochs)
     trainer = Trainer(min_steps=100, min_epochs=0)
 
+max_tokens_per_batch
+^^^^^^^^^^^^^^^^^^^^
+Batches samples of similar length together, as many as fit in this many padded tokens, to waste little
+compute on padding variable-length inputs (e.g. text). Applies to the dataloaders with the default sampler
+whose dataset has a `lengths` attribute, the length of each sample. Their `batch_size` is then replaced by a
+:class:`~pytorch_lightning.trainer.supporters.BucketBatchSampler`, which shuffles the train samples within
+buckets of similar length every epoch. In distributed training every process gets the same number of
+train batches, of similar token counts in every step; the validation and test dataloaders are not
+sharded. The `collate_fn` of the dataloader has to pad the samples.
+
+.. code-block:: python
+
+    # default used by the Trainer
+    trainer = Trainer(max_tokens_per_batch=None)
+
+Example::
+
+    # batches of at most 4096 padded tokens
+    trainer = Trainer(max_tokens_per_batch=4096)
+
+nan_check_interval
+^^^^^^^^^^^^^^^^^^
+How often (in batches) the loss and the model weights are checked for nan and inf values.
+The check looks at all of them at once and only searches for the offending weight
+when it finds a nan or inf. Set to 0 to disable the check.
+
+Example::
+
+    # default used by the Trainer (ie: check after every batch)
+    trainer = Trainer(nan_check_interval=1)
+
+    # check every 100 batches
+    trainer = Trainer(nan_check_interval=100)
+
+    # don't check
+    trainer = Trainer(nan_check_interval=0)
+
 num_nodes
 ^^^^^^^^^
 
@@ -582,6 +742,24 @@ See Also:
     - `test_percent_check`_
 
 
+persistent_workers
+^^^^^^^^^^^^^^^^^^
+Keeps the worker processes of the train and validation dataloaders alive across epochs and validation
+runs, instead of starting them (and pickling the dataset to them) for every pass over the data.
+The sampler is iterated again in place for every pass, a `DistributedSampler` gets its epoch set.
+Only applies to dataloaders with `num_workers > 0` over a map-style dataset, the workers are stopped
+when training ends. An epoch which is left early (e.g. the validation sanity check) restarts the workers.
+
+.. code-block:: python
+
+    # default used by the Trainer
+    trainer = Trainer(persistent_workers=False)
+
+Example::
+
+    # start the dataloader workers only once
+    trainer = Trainer(persistent_workers=True)
+
 precision
 ^^^^^^^^^
 Full precision (32), half precision (16).
@@ -601,6 +779,20 @@ Example::
     # one day
     trainer = Trainer(precision=8|4|2)
 
+prefetch_batches
+^^^^^^^^^^^^^^^^
+Number of batches to load ahead of the training and evaluation loops on a background thread.
+When training on a single GPU the batches are also copied to the device in advance
+on a separate CUDA stream, which hides the host-to-device transfer behind the previous step.
+
+Example::
+
+    # default used by the Trainer (ie: load batches on demand)
+    trainer = Trainer(prefetch_batches=0)
+
+    # keep two batches ready
+    trainer = Trainer(prefetch_batches=2)
+
 print_nan_grads
 ^^^^^^^^^^^^^^^
 
@@ -644,6 +836,20 @@ Example::
     profiler = AdvancedProfiler()
     trainer = Trainer(profiler=profiler)
 
+progress_bar_min_interval
+^^^^^^^^^^^^^^^^^^^^^^^^^
+Minimum time in seconds between two refreshes of the progress bars.
+Iterations in between are counted and shown with the next refresh, and the progress bar metrics
+(e.g. the running loss) are only read, and synced from the GPU, when the bar refreshes.
+
+Example::
+
+    # default used by the Trainer
+    trainer = Trainer(progress_bar_min_interval=0.1)
+
+    # refresh every `progress_bar_refresh_rate` steps
+    trainer = Trainer(progress_bar_min_interval=0)
+
 progress_bar_refresh_rate
 ^^^^^^^^^^^^^^^^^^^^^^^^^
 How often to refresh progress bar (in steps).
@@ -754,6 +960,28 @@ Example::
     # (ie: production cases with streaming data)
     trainer = Trainer(val_check_interval=1000)
 
+throughput_window
+^^^^^^^^^^^^^^^^^
+Logs the speed of the training loop with the step metrics, computed over this many recent steps.
+Set to 0 to disable. Use it to spot input pipeline stalls without turning on a profiler.
+
+- `throughput/samples_per_sec` and `throughput/batches_per_sec`
+- `throughput/data_wait_fraction`: fraction of the step time spent waiting for the batch
+- `throughput/forward_fraction`, `throughput/backward_fraction` and `throughput/optimizer_fraction`
+- `throughput/step_time_p50` and `throughput/step_time_p95`: step latency percentiles in seconds
+
+Time spent in validation, checkpointing and logging is not part of any step.
+
+.. code-block:: python
+
+    # default used by the Trainer
+    trainer = Trainer(throughput_window=0)
+
+Example::
+
+    # log the throughput over the last 100 steps
+    trainer = Trainer(throughput_window=100)
+
 track_grad_norm
 ^^^^^^^^^^^^^^^
 
@@ -789,6 +1017,23 @@ Example::
     # run through only 25% of the training set each epoch
     trainer = Trainer(train_percent_check=0.25)
 
+training_outputs_retention
+^^^^^^^^^^^^^^^^^^^^^^^^^^
+What is kept of the outputs of `training_step` for `training_epoch_end`.
+Outputs are never kept when `training_epoch_end` is not overridden.
+
+- 'all' keeps the complete (detached) outputs.
+- 'cpu' keeps them in CPU memory, the copies from the GPU run in the background.
+- a list of keys keeps only those keys of each output, e.g. to drop large tensors returned for logging.
+
+Example::
+
+    # default used by the Trainer
+    trainer = Trainer(training_outputs_retention='all')
+
+    # only keep what training_epoch_end uses
+    trainer = Trainer(training_outputs_retention=['loss', 'acc'])
+
 truncated_bptt_steps
 ^^^^^^^^^^^^^^^^^^^^
 
@@ -15,6 +15,7 @@ class TrainerCallbackConfigMixin(ABC):
     weights_save_path: str
     ckpt_path: str
     checkpoint_callback: ModelCheckpoint
+    checkpoint_writer: ...
 
     @property
     @abstractmethod
@@ -66,6 +67,7 @@ class TrainerCallbackConfigMixin(ABC):
         if self.checkpoint_callback:
             # set the path for the callbacks
             self.checkpoint_callback.save_function = self.save_checkpoint
+            self.checkpoint_callback.checkpoint_writer = self.checkpoint_writer
 
             # if checkpoint callback used, then override the weights path
             self.weights_save_path = self.checkpoint_callback.dirpath
@@ -6,11 +6,22 @@ from pytorch_lightning.callbacks import Callback
 
 class TrainerCallbackHookMixin(ABC):
 
+    # hooks which are called on every batch, only dispatched to the callbacks implementing them
+    BATCH_HOOKS = ('on_batch_start', 'on_batch_end')
+
     def __init__(self):
         # this is just a summary on variables used in this abstract class,
         # the proper values/initialisation should be done in child class
         self.callbacks: list[Callback] = []
         self.get_model: Callable = ...
+        self._live_callbacks: dict = {}
+
+    def resolve_callback_hooks(self):
+        """Resolves once per fit which callbacks implement the batch hooks."""
+        self._live_callbacks = {
+            name: [callback for callback in self.callbacks if _is_callback_hook_overridden(callback, name)]
+            for name in self.BATCH_HOOKS
+        }
 
     def on_init_start(self):
         """Called when the trainer initialization begins, model has not yet been set."""
@@ -44,12 +55,12 @@ class TrainerCallbackHookMixin(ABC):
 
     def on_batch_start(self):
         """Called when the training batch begins."""
-        for callback in self.callbacks:
+        for callback in self._live_callbacks.get('on_batch_start', self.callbacks):
             callback.on_batch_start(self, self.get_model())
 
     def on_batch_end(self):
         """Called when the training batch ends."""
-        for callback in self.callbacks:
+        for callback in self._live_callbacks.get('on_batch_end', self.callbacks):
             callback.on_batch_end(self, self.get_model())
 
     def on_validation_start(self):
@@ -71,3 +82,8 @@ class TrainerCallbackHookMixin(ABC):
         """Called when the test ends."""
         for callback in self.callbacks:
             callback.on_test_end(self, self.get_model())
+
+
+def _is_callback_hook_overridden(callback: Callback, name: str) -> bool:
+    hook = getattr(callback, name)
+    return getattr(hook, '__func__', None) is not getattr(Callback, name)
@@ -1,14 +1,42 @@
+import json
+import os
 import warnings
 from abc import ABC, abstractmethod
-from typing import Union, List, Tuple, Callable
+from typing import Union, List, Tuple, Callable, Optional
 
+import torch
 import torch.distributed as torch_distrib
-from torch.utils.data import DataLoader
+from torch.utils.data import DataLoader, RandomSampler, SequentialSampler
 from torch.utils.data.distributed import DistributedSampler
 
+from pytorch_lightning import _logger as log
 from pytorch_lightning.core import LightningModule
+from pytorch_lightning.trainer.dataloader_args import rebuild_dataloader
+from pytorch_lightning.trainer.dataloader_tuning import (
+    dataset_fingerprint,
+    format_tuning_results,
+    load_tuning_cache,
+    save_tuning_cache,
+    tune_dataloader,
+)
+from pytorch_lightning.trainer.supporters import (
+    BatchPrefetcher,
+    BucketBatchSampler,
+    CyclingIterator,
+    FastForwardBatchSampler,
+    PersistentWorkersLoader,
+    SeededRandomSampler,
+)
 from pytorch_lightning.utilities.exceptions import MisconfigurationException
 
+try:
+    from torch.utils.data import IterableDataset
+except ImportError:
+    # IterableDataset was added in PyTorch 1.2
+    ITERABLE_DATASET_AVAILABLE = False
+else:
+    ITERABLE_DATASET_AVAILABLE = True
+
 try:
     from apex import amp
 except ImportError:
@@ -39,6 +67,14 @@ def _has_len(dataloader: DataLoader) -> bool:
         return False
 
 
+def _is_cuda_oom(err: RuntimeError) -> bool:
+    """ Checks if an error is raised because the GPU ran out of memory """
+    oom_error = getattr(torch.cuda, 'OutOfMemoryError', None)
+    if oom_error is not None and isinstance(err, oom_error):
+        return True
+    return 'CUDA out of memory' in str(err)
+
+
 class TrainerDataLoadingMixin(ABC):
 
     # this is just a summary on variables used in this abstract class,
@@ -51,6 +87,8 @@ class TrainerDataLoadingMixin(ABC):
     use_tpu: bool
     tpu_local_core_rank: int
     train_dataloader: DataLoader
+    train_batch_iterator: ...
+    batches_per_epoch: ...
     num_training_batches: Union[int, float]
     val_check_batch: ...
     val_dataloaders: List[DataLoader]
@@ -60,11 +98,25 @@ class TrainerDataLoadingMixin(ABC):
     train_percent_check: float
     val_percent_check: float
     test_percent_check: float
+    prefetch_batches: int
+    persistent_workers: bool
+    auto_tune_dataloader: ...
+    max_tokens_per_batch: Optional[int]
+    train_sampler_seed: Optional[int]
+    default_save_path: str
+    optimizers: ...
+    single_gpu: bool
+    data_parallel_device_ids: ...
+    truncated_bptt_steps: ...
 
     @abstractmethod
     def is_overriden(self, *args):
         """Warning: this is just empty shell for code implemented in other class."""
 
+    @abstractmethod
+    def transfer_batch_to_gpu(self, *args):
+        """Warning: this is just empty shell for code implemented in other class."""
+
     def _percent_range_check(self, name: str) -> None:
         value = getattr(self, name)
         msg = f'`{name}` must lie in the range [0.0, 1.0], but got {value:.3f}.'
@@ -87,30 +139,306 @@ class TrainerDataLoadingMixin(ABC):
             return dataloader
 
         need_dist_sampler = self.use_ddp or self.use_ddp2 or self.use_tpu
-        no_sampler_added = dataloader.sampler is None
-
-        if need_dist_sampler and no_sampler_added:
+        # leave samplers and batch samplers of the user alone
+        default_sampler = type(dataloader.sampler) in (SequentialSampler, RandomSampler) \
+            and (dataloader.batch_size is not None or dataloader.batch_sampler is None)
 
-            skip_keys = ['sampler', 'batch_sampler', 'dataset_kind']
+        # the evaluation dataloaders are not sharded: a distributed sampler would repeat samples to give
+        # every process as many, which biases the aggregated metrics
+        if self.max_tokens_per_batch is not None and default_sampler:
+            return self._add_bucket_batch_sampler(dataloader, distributed=need_dist_sampler and train)
 
-            dl_args = {
-                k: v for k, v in dataloader.__dict__.items() if not k.startswith('_') and k not in skip_keys
-            }
+        if need_dist_sampler and default_sampler and train:
+            shuffle = isinstance(dataloader.sampler, RandomSampler)
 
             if self.use_tpu:
                 sampler = DistributedSampler(
                     dataloader.dataset,
                     num_replicas=xm.xrt_world_size(),
-                    rank=xm.get_ordinal()
+                    rank=xm.get_ordinal(),
+                    shuffle=shuffle
                 )
             else:
-                sampler = DistributedSampler(dataloader.dataset)
+                sampler = DistributedSampler(dataloader.dataset, shuffle=shuffle)
 
-            dl_args['sampler'] = sampler
-            dataloader = type(dataloader)(**dl_args)
+            # all other arguments, e.g. `num_workers` and `pin_memory`, are kept
+            dataloader = rebuild_dataloader(dataloader, sampler=sampler)
 
         return dataloader
 
+    def _add_bucket_batch_sampler(self, dataloader: DataLoader, distributed: bool) -> DataLoader:
+        """Batches the samples of similar length together, up to ``max_tokens_per_batch`` padded tokens.
+        The lengths are taken from the ``lengths`` attribute of the dataset."""
+        lengths = getattr(dataloader.dataset, 'lengths', None)
+        if lengths is None:
+            warnings.warn('`max_tokens_per_batch` is set, but the dataset of a dataloader has no `lengths`'
+                          ' attribute with the length of each sample, its samples are not batched by length.')
+            return dataloader
+
+        num_replicas, rank = 1, 0
+        if distributed and self.use_tpu:
+            num_replicas, rank = xm.xrt_world_size(), xm.get_ordinal()
+        elif distributed:
+            num_replicas, rank = torch_distrib.get_world_size(), torch_distrib.get_rank()
+
+        batch_sampler = BucketBatchSampler(
+            lengths,
+            max_tokens=self.max_tokens_per_batch,
+            shuffle=isinstance(dataloader.sampler, RandomSampler),
+            num_replicas=num_replicas,
+            rank=rank,
+        )
+        return rebuild_dataloader(dataloader, batch_sampler=batch_sampler)
+
+    def seed_train_sampler(self, dataloader: DataLoader) -> DataLoader:
+        """Replaces the ``RandomSampler`` of the train dataloader by a :class:`SeededRandomSampler`,
+        whose order can be drawn again to resume an epoch in the middle.
+
+        Args:
+            dataloader: The train dataloader
+
+        Returns:
+            The dataloader with the seeded sampler, or the dataloader itself if it has no plain ``RandomSampler``
+        """
+        if not isinstance(dataloader, DataLoader) or type(dataloader.sampler) is not RandomSampler:
+            return dataloader
+        sampler = dataloader.sampler
+        if getattr(sampler, 'replacement', False) or len(sampler) != len(dataloader.dataset):
+            return dataloader
+        if dataloader.batch_size is None and dataloader.batch_sampler is not None:
+            return dataloader
+
+        if self.train_sampler_seed is None:
+            self.train_sampler_seed = torch.initial_seed() % 2 ** 31
+        try:
+            sampler = SeededRandomSampler(dataloader.dataset, self.train_sampler_seed)
+            return rebuild_dataloader(dataloader, sampler=sampler)
+        except MisconfigurationException as err:
+            warnings.warn(f'The train dataloader can not be resumed in the middle of an epoch: {err}')
+            return dataloader
+
+    def fast_forward_train_dataloader(self, num_batches: int) -> int:
+        """Makes the next pass over the train dataloader start after its first ``num_batches`` batches,
+        without loading them.
+
+        Args:
+            num_batches: The number of batches to skip
+
+        Returns:
+            The number of batches skipped, 0 if the dataloader can not be fast-forwarded
+        """
+        dataloader = self.train_dataloader
+        if not isinstance(dataloader, DataLoader) or self.train_batch_iterator is not None \
+                or dataloader.batch_sampler is None or not _has_len(dataloader):
+            warnings.warn('The train dataloader can not be fast-forwarded,'
+                          ' the resumed epoch starts from its beginning.')
+            return 0
+
+        try:
+            self.train_dataloader = rebuild_dataloader(
+                dataloader, batch_sampler=FastForwardBatchSampler(dataloader.batch_sampler, num_batches)
+            )
+        except MisconfigurationException as err:
+            warnings.warn(f'The train dataloader can not be fast-forwarded, the resumed epoch starts from its'
+                          f' beginning: {err}')
+            return 0
+        return num_batches
+
+    def tune_train_dataloader(self, model: LightningModule, dataloader: DataLoader) -> DataLoader:
+        """Re-creates the train dataloader with the settings measured to load the most samples per second,
+        when ``auto_tune_dataloader`` is enabled.
+
+        The results are saved in ``dataloader_tuning.json`` in the ``default_save_path``, per dataset
+        fingerprint, later runs over the same data reuse them instead of measuring again.
+
+        Args:
+            model: The current `LightningModule`, used to find the largest batch size which fits
+            dataloader: The dataloader to tune
+
+        Returns:
+            The tuned dataloader, or the dataloader itself if tuning is disabled or not possible
+        """
+        if not self.auto_tune_dataloader or not isinstance(dataloader, DataLoader):
+            return dataloader
+        # the number of workers changes what an iterable dataset yields
+        if ITERABLE_DATASET_AVAILABLE and isinstance(dataloader.dataset, IterableDataset):
+            return dataloader
+        if not _has_len(dataloader):
+            return dataloader
+
+        # the TPU cores have no collective to share the tuned settings before the training starts
+        if self.use_tpu:
+            warnings.warn('`auto_tune_dataloader` is not supported on TPUs, the dataloader is not tuned.')
+            return dataloader
+
+        # the processes must agree on the settings, the batch size decides how many batches each of them runs
+        # and a process running fewer batches than the others would hang the gradient synchronisation,
+        # so only the first process measures them and sends them to the others
+        distributed = (self.use_ddp or self.use_ddp2) and torch_distrib.is_initialized()
+        settings = None
+        if not distributed or torch_distrib.get_rank() == 0:
+            settings = self._tuned_settings(model, dataloader)
+        if distributed:
+            settings = self._broadcast_settings(settings, next(model.parameters()).device)
+
+        return rebuild_dataloader(dataloader, **settings)
+
+    def _tuned_settings(self, model: LightningModule, dataloader: DataLoader) -> dict:
+        """Measures the dataloader settings, or reads them from the tuning cache."""
+        transfer_fn = None
+        if self.single_gpu:
+            gpu_id = 0
+            if isinstance(self.data_parallel_device_ids, list):
+                gpu_id = self.data_parallel_device_ids[0]
+            transfer_fn = lambda batch: self.transfer_batch_to_gpu(batch, gpu_id)
+
+        device = next(model.parameters()).device
+        tune_batch_size = self.auto_tune_dataloader == 'batch_size'
+        if tune_batch_size and device.type != 'cuda':
+            warnings.warn('`auto_tune_dataloader="batch_size"` needs the model on a GPU,'
+                          ' the batch size is not tuned.')
+            tune_batch_size = False
+        if tune_batch_size and self.truncated_bptt_steps is not None:
+            warnings.warn('`auto_tune_dataloader="batch_size"` can not run a training step without the hidden'
+                          ' states of truncated back-propagation through time, the batch size is not tuned.')
+            tune_batch_size = False
+
+        cache_path = os.path.join(self.default_save_path, 'dataloader_tuning.json')
+        fingerprint = dataset_fingerprint(dataloader, tune_batch_size=tune_batch_size, device=str(device))
+        cache = load_tuning_cache(cache_path)
+        if fingerprint in cache:
+            settings = cache[fingerprint]['settings']
+            log.info(f'Using the dataloader settings tuned before: {settings}')
+            return settings
+
+        fits_in_memory = None
+        if tune_batch_size:
+            fits_in_memory = lambda dl: self._batch_fits_in_memory(model, dl, device.index)
+        settings, trials = tune_dataloader(
+            dataloader,
+            num_batches=min(20, len(dataloader)),
+            max_workers=os.cpu_count() or 1,
+            transfer_fn=transfer_fn,
+            fits_in_memory=fits_in_memory,
+        )
+        log.info(format_tuning_results(trials))
+        log.info(f'Using the dataloader settings: {settings}')
+
+        cache[fingerprint] = dict(settings=settings, samples_per_sec=max(speed for _, speed in trials))
+        save_tuning_cache(cache_path, cache)
+        return settings
+
+    @staticmethod
+    def _broadcast_settings(settings: Optional[dict], device: torch.device) -> dict:
+        """Sends the tuned settings of the first process to all the others."""
+        # NCCL only communicates tensors on the GPU
+        if torch_distrib.get_backend() != 'nccl':
+            device = torch.device('cpu')
+
+        data = json.dumps(settings).encode() if settings is not None else b''
+        size = torch.tensor([len(data)], dtype=torch.long, device=device)
+        torch_distrib.broadcast(size, src=0)
+        buffer = torch.zeros(int(size.item()), dtype=torch.uint8, device=device)
+        if data:
+            buffer.copy_(torch.tensor(list(data), dtype=torch.uint8))
+        torch_distrib.broadcast(buffer, src=0)
+        return json.loads(bytes(buffer.cpu().tolist()).decode())
+
+    def _batch_fits_in_memory(self, model: LightningModule, dataloader: DataLoader,
+                              gpu_id: int) -> bool:
+        """Runs a training step and backward pass on the first batch of ``dataloader`` to check
+        that the GPU memory suffices. The step leaves no trace: the gradients, the buffers
+        (e.g. batch norm statistics), the random number generators and the train/eval mode are restored."""
+        training = model.training
+        grads = [param.grad for param in model.parameters()]
+        buffers = [buffer.detach().cpu().clone() for buffer in model.buffers()]
+        rng_state = torch.get_rng_state()
+        cuda_rng_state = torch.cuda.get_rng_state(gpu_id)
+
+        args = [self.transfer_batch_to_gpu(next(iter(dataloader)), gpu_id), 0]
+        if len(self.optimizers) > 1:
+            args.append(0)
+        output = loss = None
+        try:
+            model.train()
+            # the gradients of the probe must not add up with the ones of the model
+            for param in model.parameters():
+                param.grad = None
+            output = model.training_step(*args)
+            loss = output['loss'] if isinstance(output, dict) else output
+            loss.backward()
+        except RuntimeError as err:
+            if not _is_cuda_oom(err):
+                raise
+            return False
+        finally:
+            # free the batch and the activations before emptying the cache
+            args = output = loss = None
+            for param, grad in zip(model.parameters(), grads):
+                param.grad = grad
+            with torch.no_grad():
+                for buffer, saved in zip(model.buffers(), buffers):
+                    buffer.copy_(saved)
+            torch.set_rng_state(rng_state)
+            torch.cuda.set_rng_state(cuda_rng_state, gpu_id)
+            model.train(training)
+            torch.cuda.empty_cache()
+        return True
+
+    def keep_workers_alive(self, dataloader, num_batches: Union[int, float]):
+        """Wraps a dataloader so that its worker processes are reused by all the passes over it,
+        when ``persistent_workers`` is enabled.
+
+        Args:
+            dataloader: The dataloader to wrap
+            num_batches: The number of batches used of each pass
+
+        Returns:
+            The wrapped dataloader, or the dataloader itself if it has no workers to keep
+        """
+        if not self.persistent_workers or not isinstance(dataloader, DataLoader) or dataloader.num_workers == 0:
+            return dataloader
+        # iterable datasets have no sampler which could start the next pass
+        if ITERABLE_DATASET_AVAILABLE and isinstance(dataloader.dataset, IterableDataset):
+            return dataloader
+        if not _has_len(dataloader) or num_batches == 0:
+            return dataloader
+
+        return PersistentWorkersLoader(dataloader, num_batches)
+
+    def shutdown_persistent_workers(self) -> None:
+        """Stops the worker processes kept alive for the train and validation dataloaders."""
+        for dataloader in [self.train_dataloader] + (self.val_dataloaders or []):
+            if isinstance(dataloader, PersistentWorkersLoader):
+                dataloader.shutdown()
+
+    def prefetch_dataloader(self, dataloader, put_back: Optional[Callable[[list], None]] = None):
+        """Wraps a dataloader so that the next ``prefetch_batches`` batches are loaded in the background.
+
+        On a single GPU the batches are also copied to the device ahead of time, on a side CUDA stream.
+        Other modes only overlap the data loading itself. TPUs use their own ``ParallelLoader``.
+
+        Args:
+            dataloader: The dataloader (or any iterable of batches) to wrap
+            put_back: Called with the batches loaded ahead when the pass over them is left early
+
+        Returns:
+            The wrapped iterable, or the dataloader itself if prefetching is disabled
+        """
+        if not self.prefetch_batches or self.use_tpu:
+            return dataloader
+
+        transfer_fn, device = None, None
+        if self.single_gpu:
+            gpu_id = 0
+            if isinstance(self.data_parallel_device_ids, list):
+                gpu_id = self.data_parallel_device_ids[0]
+            device = torch.device('cuda', gpu_id)
+            transfer_fn = lambda batch: self.transfer_batch_to_gpu(batch, gpu_id)
+
+        return BatchPrefetcher(dataloader, self.prefetch_batches, transfer_fn=transfer_fn, device=device,
+                               put_back=put_back)
+
     def reset_train_dataloader(self, model: LightningModule) -> None:
         """Resets the train dataloader and initialises required variables
         (number of batches, when to validate, etc.).
@@ -118,23 +446,45 @@ class TrainerDataLoadingMixin(ABC):
         Args:
             model: The current `LightningModule`
         """
+        # the workers of the previous dataloader won't be used anymore
+        if isinstance(self.train_dataloader, PersistentWorkersLoader):
+            self.train_dataloader.shutdown()
+
         self.train_dataloader = self.request_dataloader(model.train_dataloader)
 
         self.num_training_batches = 0
 
         # automatically add samplers
         self.train_dataloader = self.auto_add_sampler(self.train_dataloader, train=True)
+        self.train_dataloader = self.seed_train_sampler(self.train_dataloader)
+        self.train_dataloader = self.tune_train_dataloader(model, self.train_dataloader)
 
         self._worker_check(self.train_dataloader, 'train dataloader')
         self._percent_range_check('train_percent_check')
 
-        if not _has_len(self.train_dataloader):
+        if self.batches_per_epoch is not None:
+            self.num_training_batches = self.batches_per_epoch
+        elif not _has_len(self.train_dataloader):
             self.num_training_batches = float('inf')
         else:
             # try getting the length
             self.num_training_batches = len(self.train_dataloader)
             self.num_training_batches = int(self.num_training_batches * self.train_percent_check)
 
+        # virtual epochs go through complete passes over the dataloader
+        num_batches = self.num_training_batches if self.batches_per_epoch is None else float('inf')
+        self.train_dataloader = self.keep_workers_alive(self.train_dataloader, num_batches)
+
+        # virtual epochs draw their batches from one iterator which outlives the epochs
+        self.train_batch_iterator = None
+        if self.batches_per_epoch is not None:
+            sampler = getattr(self.train_dataloader, 'sampler', None)
+            batch_sampler = getattr(self.train_dataloader, 'batch_sampler', None)
+            set_epoch = sampler.set_epoch if hasattr(sampler, 'set_epoch') else None
+            if hasattr(batch_sampler, 'set_epoch'):
+                set_epoch = batch_sampler.set_epoch
+            self.train_batch_iterator = CyclingIterator(self.train_dataloader, on_restart=set_epoch)
+
         # determine when to check validation
         # if int passed in, val checks that often
         # otherwise, it checks in [0, 1.0] % range of a training epoch
@@ -146,7 +496,7 @@ class TrainerDataLoadingMixin(ABC):
                     f'to the number of the training batches ({self.num_training_batches}). '
                     'If you want to disable validation set `val_percent_check` to 0.0 instead.')
         else:
-            if not _has_len(self.train_dataloader):
+            if self.num_training_batches == float('inf'):
                 if self.val_check_interval == 1.0:
                     self.val_check_batch = float('inf')
                 else:
@@ -202,6 +552,10 @@ class TrainerDataLoadingMixin(ABC):
                     'When using an infinite DataLoader (e.g. with an IterableDataset or when '
                     f'DataLoader does not implement `__len__`) for `{mode}_dataloader`, '
                     f'`Trainer({mode}_percent_check)` must be `0.0` or `1.0`.')
+
+        # validation runs many times, testing once
+        if mode == 'val':
+            dataloaders = [self.keep_workers_alive(dataloader, num_batches) for dataloader in dataloaders]
         return num_batches, dataloaders
 
     def reset_val_dataloader(self, model: LightningModule) -> None:
@@ -211,6 +565,11 @@ class TrainerDataLoadingMixin(ABC):
             model: The current `LightningModule`
         """
         if self.is_overriden('validation_step'):
+            # the workers of the previous dataloaders won't be used anymore
+            for dataloader in self.val_dataloaders or []:
+                if isinstance(dataloader, PersistentWorkersLoader):
+                    dataloader.shutdown()
+
             self.num_val_batches, self.val_dataloaders =\
                 self._reset_eval_dataloader(model, 'val')
 
@@ -0,0 +1,138 @@
+"""
+Re-creates DataLoaders with some of their arguments replaced, e.g. to add a distributed sampler.
+
+The arguments are read from the attributes named like the ``__init__`` arguments, which the ``DataLoader``
+keeps for its own arguments, so this works for most DataLoaders. The DataLoaders re-created here keep the
+arguments they are constructed with, so they can be re-created in turn.
+"""
+import inspect
+from typing import Any, Dict, List
+
+from torch.utils.data import DataLoader
+
+from pytorch_lightning.utilities.exceptions import MisconfigurationException
+
+_INIT_ARGS_ATTR = '_pl_init_args'
+
+
+def accepts_argument(dataloader: DataLoader, name: str) -> bool:
+    """Tells whether the type of ``dataloader`` can be constructed with the argument ``name``."""
+    for p in inspect.signature(type(dataloader).__init__).parameters.values():
+        if p.kind is p.VAR_KEYWORD or (p.name == name and p.kind is not p.VAR_POSITIONAL):
+            return True
+    return False
+
+
+def rebuild_dataloader(dataloader: DataLoader, **replacements) -> DataLoader:
+    """Re-creates a DataLoader, of the same type, with the same arguments except for the ``replacements``.
+
+    Arguments which conflict with a replacement are reset: a new ``sampler`` or ``batch_sampler``
+    resets ``shuffle``, a new ``batch_sampler`` also the ``sampler``, ``batch_size`` and ``drop_last``,
+    and ``num_workers=0`` resets ``prefetch_factor`` and ``persistent_workers``.
+
+    Args:
+        dataloader: The DataLoader to re-create
+        replacements: The arguments to replace
+
+    Returns:
+        The new DataLoader
+
+    Raises:
+        MisconfigurationException:
+            If the type of ``dataloader`` does not accept a replaced argument, or the value of a required
+            argument is not known
+
+    Examples:
+        >>> from torch.utils.data import SequentialSampler
+        >>> loader = DataLoader(range(10), batch_size=4, shuffle=True, pin_memory=True)
+        >>> loader = rebuild_dataloader(loader, sampler=SequentialSampler(range(10)))
+        >>> loader.pin_memory, loader.batch_size, next(iter(loader)).tolist()
+        (True, 4, [0, 1, 2, 3])
+    """
+    cls = type(dataloader)
+    parameters = list(inspect.signature(cls.__init__).parameters.values())[1:]
+    recorded = getattr(dataloader, _INIT_ARGS_ATTR, None)
+    if recorded is not None and recorded[0] is _init_owner(cls):
+        arguments = dict(recorded[1])
+    else:
+        arguments = _arguments_from_attributes(dataloader, parameters)
+
+    names = {p.name for p in parameters if p.kind not in (p.VAR_POSITIONAL, p.VAR_KEYWORD)}
+    var_keyword = next((p.name for p in parameters if p.kind is p.VAR_KEYWORD), None)
+    if var_keyword is not None:
+        arguments[var_keyword] = dict(arguments.get(var_keyword, {}))
+
+    reset = set()
+    if 'sampler' in replacements or 'batch_sampler' in replacements:
+        reset.add('shuffle')
+    if 'sampler' in replacements:
+        reset.add('batch_sampler')
+    if 'batch_sampler' in replacements:
+        reset.update(['sampler', 'batch_size', 'drop_last'])
+    if replacements.get('num_workers', None) == 0:
+        reset.update(['prefetch_factor', 'persistent_workers'])
+    for name in reset - set(replacements):
+        arguments.pop(name, None)
+        if var_keyword is not None:
+            arguments[var_keyword].pop(name, None)
+
+    for name, value in replacements.items():
+        if name in names:
+            arguments[name] = value
+        elif var_keyword is not None:
+            arguments[var_keyword][name] = value
+        else:
+            raise MisconfigurationException(
+                f'Trying to re-create the `{cls.__name__}` with `{name}={value!r}`, but its `__init__`'
+                f' does not take a `{name}` argument. Add it, or `**kwargs` passed on to the `DataLoader`.'
+            )
+
+    args, kwargs = _call_arguments(parameters, arguments)
+    new_dataloader = cls(*args, **kwargs)
+    # the new dataloader can be re-created in turn
+    object.__setattr__(new_dataloader, _INIT_ARGS_ATTR, (_init_owner(cls), arguments))
+    return new_dataloader
+
+
+def _init_owner(cls: type) -> type:
+    """The class defining the ``__init__`` which ``cls`` uses."""
+    return next(base for base in cls.__mro__ if '__init__' in base.__dict__)
+
+
+def _arguments_from_attributes(dataloader: DataLoader, parameters: List[inspect.Parameter]) -> Dict[str, Any]:
+    arguments = {}
+    for p in parameters:
+        if p.kind in (p.VAR_POSITIONAL, p.VAR_KEYWORD):
+            continue
+        if hasattr(dataloader, p.name):
+            arguments[p.name] = getattr(dataloader, p.name)
+        elif p.default is p.empty:
+            raise MisconfigurationException(
+                f'Trying to re-create the `{type(dataloader).__name__}`, but the value of its required'
+                f' `__init__` argument `{p.name}` is unknown. Keep it in an attribute named `{p.name}`.'
+            )
+
+    # the DataLoader derives a batch sampler from the sampler, or the other way round
+    if isinstance(dataloader, DataLoader):
+        if dataloader.batch_size is not None or dataloader.batch_sampler is None:
+            arguments.pop('batch_sampler', None)
+        else:
+            for name in ('sampler', 'batch_size', 'drop_last'):
+                arguments.pop(name, None)
+    return arguments
+
+
+def _call_arguments(parameters: List[inspect.Parameter], arguments: Dict[str, Any]):
+    # arguments before a used *args can only be passed positionally
+    has_var_positional = any(p.kind is p.VAR_POSITIONAL and arguments.get(p.name) for p in parameters)
+    args, kwargs = [], {}
+    for p in parameters:
+        if p.kind is p.VAR_POSITIONAL:
+            args.extend(arguments.get(p.name, ()))
+        elif p.kind is p.VAR_KEYWORD:
+            kwargs.update(arguments.get(p.name, {}))
+        elif p.kind is p.POSITIONAL_ONLY or (has_var_positional and p.kind is p.POSITIONAL_OR_KEYWORD):
+            args.append(arguments.get(p.name, p.default))
+        elif p.name in arguments:
+            kwargs[p.name] = arguments[p.name]
+    return args, kwargs
@@ -0,0 +1,184 @@
+"""
+Finds the DataLoader settings with the best throughput with short timed sweeps.
+
+The sweeps go over ``num_workers``, then ``pin_memory`` and ``prefetch_factor`` (where the DataLoader
+takes it) for the best worker count. The results are kept in a JSON file per dataset
+fingerprint, so later runs over the same data reuse them without measuring again.
+"""
+import hashlib
+import inspect
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import torch
+from torch.utils.data import DataLoader
+
+from pytorch_lightning import _logger as log
+from pytorch_lightning.trainer.dataloader_args import accepts_argument, rebuild_dataloader
+
+
+def dataset_fingerprint(dataloader: DataLoader, **extra) -> str:
+    """Identifies the data a DataLoader loads, independently of the settings which get tuned.
+
+    Args:
+        dataloader: The DataLoader to identify
+        extra: Anything else the best settings depend on, like the device the batches go to
+
+    Returns:
+        A hex digest
+    """
+    def qualname(obj) -> Optional[str]:
+        cls = obj if inspect.isclass(obj) or inspect.isfunction(obj) else type(obj)
+        return None if obj is None else f'{cls.__module__}.{cls.__qualname__}'
+
+    dataset = dataloader.dataset
+    description = dict(
+        dataset=qualname(dataset),
+        length=len(dataset) if hasattr(dataset, '__len__') else None,
+        batch_size=dataloader.batch_size,
+        sampler=qualname(dataloader.sampler),
+        num_replicas=getattr(dataloader.sampler, 'num_replicas', 1),
+        collate_fn=qualname(dataloader.collate_fn),
+        cpu_count=os.cpu_count(),
+        **extra
+    )
+    return hashlib.sha1(json.dumps(description, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def measure_throughput(dataloader: DataLoader, num_batches: int,
+                       transfer_fn: Optional[Callable] = None) -> float:
+    """Measures how many samples per second a DataLoader loads.
+
+    The first batch is not timed, since it includes starting the worker processes.
+
+    Args:
+        dataloader: The DataLoader to measure
+        num_batches: How many batches to time
+        transfer_fn: Moves a batch to the device it is used on, to time the transfer too
+
+    Returns:
+        The samples per second
+    """
+    iterator = iter(dataloader)
+    try:
+        batch = next(iterator)
+        if transfer_fn is not None:
+            transfer_fn(batch)
+
+        timed_batches = 0
+        start = time.perf_counter()
+        for batch in iterator:
+            if transfer_fn is not None:
+                transfer_fn(batch)
+            timed_batches += 1
+            if timed_batches >= num_batches:
+                break
+        if transfer_fn is not None and torch.cuda.is_available():
+            torch.cuda.synchronize()
+        duration = time.perf_counter() - start
+    finally:
+        shutdown_workers = getattr(iterator, '_shutdown_workers', None)
+        if shutdown_workers is not None:
+            shutdown_workers()
+
+    if timed_batches == 0:
+        return 0.
+    return timed_batches * (dataloader.batch_size or 1) / max(duration, 1e-9)
+
+
+def find_max_batch_size(dataloader: DataLoader, fits_in_memory: Callable[[DataLoader], bool],
+                        max_trials: int = 10) -> int:
+    """Doubles the batch size of a DataLoader for as long as a batch still fits in memory.
+
+    Args:
+        dataloader: The DataLoader to start from
+        fits_in_memory: Tells whether a batch of the given DataLoader fits in memory
+        max_trials: The most times to double the batch size
+
+    Returns:
+        The largest batch size which fits, at least the one of ``dataloader``
+    """
+    batch_size = dataloader.batch_size
+    dataset_size = len(dataloader.dataset)
+    for _ in range(max_trials):
+        if batch_size * 2 > dataset_size:
+            break
+        if not fits_in_memory(rebuild_dataloader(dataloader, batch_size=batch_size * 2, num_workers=0)):
+            break
+        batch_size *= 2
+    return batch_size
+
+
+def tune_dataloader(dataloader: DataLoader, num_batches: int, max_workers: int,
+                    transfer_fn: Optional[Callable] = None,
+                    fits_in_memory: Optional[Callable[[DataLoader], bool]] = None
+                    ) -> Tuple[Dict, List[Tuple[Dict, float]]]:
+    """Sweeps the settings of a DataLoader and picks the ones with the most samples per second.
+
+    Args:
+        dataloader: The DataLoader to tune
+        num_batches: How many batches to time per configuration
+        max_workers: The most worker processes to try
+        transfer_fn: Moves a batch to the device it is used on; ``pin_memory`` is only tried with it
+        fits_in_memory: Tells whether a batch of the given DataLoader fits in memory,
+            the batch size is only tuned with it
+
+    Returns:
+        Tuple (best settings, list of (settings, samples per second) for all configurations tried)
+    """
+    base = {}
+    if fits_in_memory is not None and dataloader.batch_size is not None:
+        base['batch_size'] = find_max_batch_size(dataloader, fits_in_memory)
+
+    trials = []
+
+    def sweep(best: Dict, key: str, values: List) -> Dict:
+        if not accepts_argument(dataloader, key):
+            return best
+        results = []
+        for value in values:
+            settings = dict(best, **{key: value})
+            speed = measure_throughput(rebuild_dataloader(dataloader, **settings), num_batches, transfer_fn)
+            trials.append((settings, speed))
+            results.append((speed, settings))
+        return max(results, key=lambda result: result[0])[1]
+
+    worker_counts = [0] + [2 ** i for i in range(max_workers.bit_length()) if 2 ** i <= max_workers]
+    best = sweep(base, 'num_workers', worker_counts)
+    if transfer_fn is not None:
+        best = sweep(best, 'pin_memory', [False, True])
+    if best.get('num_workers', 0) > 0:
+        best = sweep(best, 'prefetch_factor', [2, 4, 8])
+    return best, trials
+
+
+def load_tuning_cache(path: str) -> Dict:
+    """Reads the tuning results saved in ``path``, if any."""
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with open(path) as fp:
+            return json.load(fp)
+    except (OSError, ValueError) as err:
+        log.warning(f'Could not read the dataloader tuning results from {path}: {err}')
+        return {}
+
+
+def save_tuning_cache(path: str, cache: Dict) -> None:
+    """Writes the tuning results to ``path``, atomically."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.part'
+    with open(tmp_path, 'w') as fp:
+        json.dump(cache, fp, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def format_tuning_results(trials: List[Tuple[Dict, float]]) -> str:
+    """Lists the configurations tried, fastest first."""
+    lines = ['DataLoader tuning results (samples/sec):']
+    for settings, speed in sorted(trials, key=lambda trial: -trial[1]):
+        options = ', '.join(f'{k}={v}' for k, v in sorted(settings.items()))
+        lines.append(f'{speed:>12.1f}  {options}')
+    return '\n'.join(lines)
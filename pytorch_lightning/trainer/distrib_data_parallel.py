@@ -114,12 +114,14 @@ When the script starts again, Lightning will:
 """
 
 import os
+import queue
 import re
 import warnings
 from abc import ABC, abstractmethod
 from typing import Union
 
 import torch
+import torch.multiprocessing as mp
 from pytorch_lightning import _logger as log
 from pytorch_lightning.loggers import LightningLoggerBase
 from pytorch_lightning.utilities.exceptions import MisconfigurationException
@@ -144,6 +146,9 @@ class TrainerDDPMixin(ABC):
     amp_level: str
     use_tpu: bool
     default_save_path: str
+    proc_rank: int
+    spawn_weights_queue: ...
+    spawn_weights_received: ...
 
     @property
     @abstractmethod
@@ -167,6 +172,10 @@ class TrainerDDPMixin(ABC):
     def init_optimizers(self, *args):
         """Warning: this is just empty shell for code implemented in other class."""
 
+    @abstractmethod
+    def get_model(self):
+        """Warning: this is just empty shell for code implemented in other class."""
+
     def init_tpu(self):
         # turn off all the GPU stuff
         self.distributed_backend = None
@@ -346,34 +355,69 @@ class TrainerDDPMixin(ABC):
         # when ddp ends, we save the model
         self.save_spawn_weights(model)
 
-    def save_spawn_weights(self, model):
+    def init_spawn_weights_queue(self, start_method: str = 'spawn', in_process: bool = False):
         """
-        Dump a temporary checkpoint after ddp ends to get weights out of the process
-        :param model:
+        Open the channel through which the spawned rank 0 process hands back the trained weights
+        :param start_method: how the processes are started
+        :param in_process: whether the training runs in this process, which then trains the model itself
         :return:
         """
-        if self.proc_rank == 0:
-            path = os.path.join(self.default_save_path, '__temp_weight_ddp_end.ckpt')
-            self.save_checkpoint(path)
+        if in_process:
+            self.spawn_weights_queue, self.spawn_weights_received = None, None
+            return
 
-    def load_spawn_weights(self, original_model):
+        context = mp.get_context(start_method)
+        self.spawn_weights_queue = context.Queue()
+        self.spawn_weights_received = context.Event()
+
+    def save_spawn_weights(self, model):
         """
-        Load the temp weights saved in the process
-        To recover the trained model from the ddp process we load the saved weights
+        Hand the weights back to the process which spawned this one, through shared memory
         :param model:
         :return:
         """
-        # load weights saved in ddp
-        path = os.path.join(self.default_save_path, '__temp_weight_ddp_end.ckpt')
-        loaded_model = original_model.__class__.load_from_checkpoint(path)
+        if self.proc_rank == 0 and self.spawn_weights_queue is not None:
+            # tensors on the CPU are moved to shared memory instead of being copied through the queue
+            state_dict = self.get_model().state_dict()
+            for name, tensor in state_dict.items():
+                state_dict[name] = tensor.detach().cpu()
+            self.spawn_weights_queue.put(state_dict)
 
-        # copy loaded weights to old model
-        original_model.load_state_dict(loaded_model.state_dict())
+            # the shared memory is handed over by this process, so it can't exit before
+            self.spawn_weights_received.wait()
 
-        # remove ddp weights
-        os.remove(path)
+    def load_spawn_weights(self, original_model, processes):
+        """
+        Load the weights handed back by the spawned rank 0 into the original model, in place,
+        and wait for the spawned processes to finish
+        :param original_model:
+        :param processes: the context of the spawned processes, None if the training ran in this process
+        :return:
+        """
+        if processes is None or self.spawn_weights_queue is None:
+            # the original model was trained in this process
+            self.spawn_weights_queue, self.spawn_weights_received = None, None
+            return
+
+        state_dict = None
+        try:
+            while state_dict is None:
+                try:
+                    state_dict = self.spawn_weights_queue.get(timeout=0.1)
+                except queue.Empty:
+                    # raises the error of a failed process, and is true once all of them finished
+                    if processes.join(timeout=0):
+                        break
+        finally:
+            self.spawn_weights_received.set()
+
+        while not processes.join():
+            pass
+        self.spawn_weights_queue, self.spawn_weights_received = None, None
 
-        return loaded_model
+        # copy the weights into the existing parameters
+        if state_dict is not None:
+            original_model.load_state_dict(state_dict)
 
     def resolve_root_node_address(self, root_node):
         if '[' in root_node:
@@ -135,6 +135,7 @@ from tqdm.auto import tqdm
 
 from pytorch_lightning.core.lightning import LightningModule
 from pytorch_lightning.overrides.data_parallel import LightningDistributedDataParallel, LightningDataParallel
+from pytorch_lightning.trainer.supporters import BatchPrefetcher, ThrottledProgressBar
 from pytorch_lightning.utilities.exceptions import MisconfigurationException
 
 try:
@@ -173,6 +174,7 @@ class TrainerEvaluationLoopMixin(ABC):
     use_tpu: bool
     reload_dataloaders_every_epoch: ...
     progress_bar_refresh_rate: ...
+    progress_bar_min_interval: float
 
     # Callback system
     on_validation_start: Callable
@@ -192,6 +194,10 @@ class TrainerEvaluationLoopMixin(ABC):
     def is_overriden(self, *args):
         """Warning: this is just empty shell for code implemented in other class."""
 
+    @abstractmethod
+    def is_hook_live(self, *args):
+        """Warning: this is just empty shell for code implemented in other class."""
+
     @abstractmethod
     def transfer_batch_to_tpu(self, *args):
         """Warning: this is just empty shell for code implemented in other class."""
@@ -204,6 +210,10 @@ class TrainerEvaluationLoopMixin(ABC):
     def add_tqdm_metrics(self, *args):
         """Warning: this is just empty shell for code implemented in other class."""
 
+    @abstractmethod
+    def add_callback_metrics(self, *args):
+        """Warning: this is just empty shell for code implemented in other class."""
+
     @abstractmethod
     def log_metrics(self, *args):
         """Warning: this is just empty shell for code implemented in other class."""
@@ -216,6 +226,10 @@ class TrainerEvaluationLoopMixin(ABC):
     def reset_val_dataloader(self, *args):
         """Warning: this is just empty shell for code implemented in other class."""
 
+    @abstractmethod
+    def prefetch_dataloader(self, *args):
+        """Warning: this is just empty shell for code implemented in other class."""
+
     def _evaluate(self, model: LightningModule, dataloaders, max_batches: int, test_mode: bool = False):
         """Run evaluation code.
 
@@ -237,10 +251,13 @@ class TrainerEvaluationLoopMixin(ABC):
 
         # bookkeeping
         outputs = []
+        model_ref = self.get_model()
+        accumulate_hook = 'test_epoch_accumulate' if test_mode else 'validation_epoch_accumulate'
+        accumulate_outputs = self.is_overriden(accumulate_hook, model=model_ref)
 
         # run validation
         for dataloader_idx, dataloader in enumerate(dataloaders):
-            dl_outputs = []
+            dl_outputs = None if accumulate_outputs else []
 
             # on TPU we have to wrap it under the ParallelLoader
             if self.use_tpu:
@@ -248,6 +265,9 @@ class TrainerEvaluationLoopMixin(ABC):
                 dataloader = xla_pl.ParallelLoader(dataloader, [device])
                 dataloader = dataloader.per_device_loader(device)
 
+            # load (and transfer) the next batches while the current one is evaluated
+            dataloader = self.prefetch_dataloader(dataloader)
+
             for batch_idx, batch in enumerate(dataloader):
                 if batch is None:
                     continue
@@ -263,18 +283,21 @@ class TrainerEvaluationLoopMixin(ABC):
 
                 # on dp / ddp2 might still want to do something with the batch parts
                 if test_mode:
-                    if self.is_overriden('test_step_end'):
+                    if self.is_hook_live('test_step_end'):
                         model_ref = self.get_model()
                         with self.profiler.profile('test_step_end'):
                             output = model_ref.test_step_end(output)
                 else:
-                    if self.is_overriden('validation_step_end'):
+                    if self.is_hook_live('validation_step_end'):
                         model_ref = self.get_model()
                         with self.profiler.profile('validation_step_end'):
                             output = model_ref.validation_step_end(output)
 
                 # track outputs for collation
-                dl_outputs.append(output)
+                if accumulate_outputs:
+                    dl_outputs = getattr(model_ref, accumulate_hook)(dl_outputs, output)
+                else:
+                    dl_outputs.append(output)
 
                 # batch done
                 if self.progress_bar_refresh_rate >= 1 and batch_idx % self.progress_bar_refresh_rate == 0:
@@ -283,6 +306,11 @@ class TrainerEvaluationLoopMixin(ABC):
                     else:
                         self.val_progress_bar.update(self.progress_bar_refresh_rate)
                         self.main_progress_bar.update(self.progress_bar_refresh_rate)
+
+            # release the prefetching thread when the loop was cut short
+            if isinstance(dataloader, BatchPrefetcher):
+                dataloader.close()
+
             outputs.append(dl_outputs)
 
         eval_results = {}
@@ -366,6 +394,7 @@ class TrainerEvaluationLoopMixin(ABC):
         total = max_batches if max_batches != float('inf') else None
         pbar = tqdm(desc=desc, total=total, leave=test_mode, position=position,
                     disable=not self.progress_bar_refresh_rate, dynamic_ncols=True, file=sys.stdout)
+        pbar = ThrottledProgressBar(pbar, self.progress_bar_min_interval)
         setattr(self, f'{"test" if test_mode else "val"}_progress_bar', pbar)
 
         # run evaluation
@@ -388,14 +417,14 @@ class TrainerEvaluationLoopMixin(ABC):
         self.log_metrics(log_metrics, {})
 
         # track metrics for callbacks
-        self.callback_metrics.update(callback_metrics)
+        self.add_callback_metrics(callback_metrics)
 
         # hook
         model.on_post_performance_check()
 
         # add model specific metrics
         if not test_mode:
-            self.main_progress_bar.set_postfix(**self.training_tqdm_dict)
+            self.main_progress_bar.flush(lambda: self.training_tqdm_dict)
 
         # close progress bar
         if test_mode:
@@ -1,5 +1,5 @@
 from abc import ABC
-from typing import Union, Iterable
+from typing import Union, Iterable, List
 
 import torch
 
@@ -16,6 +16,7 @@ class TrainerLoggingMixin(ABC):
     log_gpu_memory: ...
     logger: Union[LightningLoggerBase, bool]
     tqdm_metrics: ...
+    _callback_metrics: dict
     global_step: int
     proc_rank: int
     use_dp: bool
@@ -74,25 +75,47 @@ class TrainerLoggingMixin(ABC):
             self.logger.log_metrics(scalar_metrics, step=step)
             self.logger.save()
 
-    def add_tqdm_metrics(self, metrics):
+    @property
+    def callback_metrics(self) -> dict:
+        """Metrics available to callbacks.
+
+        Tensors recorded by the steps are kept on their device and only converted
+        to Python scalars here, when the metrics are actually read.
+        """
+        if any(isinstance(v, (torch.Tensor, dict)) for v in self._callback_metrics.values()):
+            self._callback_metrics.update(self.metrics_to_scalars(self._callback_metrics))
+        return self._callback_metrics
+
+    @callback_metrics.setter
+    def callback_metrics(self, metrics: dict):
+        self._callback_metrics = metrics
+
+    def add_callback_metrics(self, metrics):
+        """Records metrics for callbacks without syncing with the device."""
         for k, v in metrics.items():
             if isinstance(v, torch.Tensor):
-                v = v.item()
+                v = v.detach()
 
-            self.tqdm_metrics[k] = v
+            self._callback_metrics[k] = v
 
-    def metrics_to_scalars(self, metrics):
-        new_metrics = {}
+    def add_tqdm_metrics(self, metrics):
+        """Records metrics for the progress bar; they are converted to scalars on the next refresh."""
         for k, v in metrics.items():
             if isinstance(v, torch.Tensor):
-                v = v.item()
+                v = v.detach()
 
-            if isinstance(v, dict):
-                v = self.metrics_to_scalars(v)
+            self.tqdm_metrics[k] = v
 
-            new_metrics[k] = v
+    def metrics_to_scalars(self, metrics):
+        """Converts all tensors in (nested) metrics to Python scalars.
 
-        return new_metrics
+        Tensors are stacked per device and dtype, so the conversion costs one host transfer
+        per device instead of one ``.item()`` sync per metric.
+        """
+        tensors = []
+        _collect_tensors(metrics, tensors)
+        scalars = iter(_tensors_to_scalars(tensors))
+        return _replace_tensors(metrics, scalars)
 
     def process_output(self, output, train=False):
         """Reduces output according to the training mode.
@@ -112,10 +135,6 @@ class TrainerLoggingMixin(ABC):
             num_gpus = self.num_gpus
             callback_metrics = self.reduce_distributed_output(callback_metrics, num_gpus)
 
-        for k, v in callback_metrics.items():
-            if isinstance(v, torch.Tensor):
-                callback_metrics[k] = v.item()
-
         # ---------------
         # EXTRACT PROGRESS BAR KEYS
         # ---------------
@@ -177,10 +196,10 @@ class TrainerLoggingMixin(ABC):
         callback_metrics.update(progress_bar_metrics)
         callback_metrics.update(log_metrics)
 
-        # convert tensors to numpy
+        # keep tensors on their device, they are converted to scalars once they are needed
         for k, v in callback_metrics.items():
             if isinstance(v, torch.Tensor):
-                callback_metrics[k] = v.item()
+                callback_metrics[k] = v.detach()
 
         return loss, progress_bar_metrics, log_metrics, callback_metrics, hiddens
 
@@ -207,3 +226,41 @@ class TrainerLoggingMixin(ABC):
                 reduced = torch.mean(output[k])
                 output[k] = reduced
         return output
+
+
+def _collect_tensors(metrics: dict, tensors: List[torch.Tensor]) -> None:
+    for v in metrics.values():
+        if isinstance(v, torch.Tensor):
+            tensors.append(v)
+        elif isinstance(v, dict):
+            _collect_tensors(v, tensors)
+
+
+def _replace_tensors(metrics: dict, scalars) -> dict:
+    new_metrics = {}
+    for k, v in metrics.items():
+        if isinstance(v, torch.Tensor):
+            v = next(scalars)
+        elif isinstance(v, dict):
+            v = _replace_tensors(v, scalars)
+
+        new_metrics[k] = v
+    return new_metrics
+
+
+def _tensors_to_scalars(tensors: List[torch.Tensor]) -> list:
+    """Same as ``[t.item() for t in tensors]`` but with a single transfer per device and dtype."""
+    scalars = [None] * len(tensors)
+    groups = {}
+    for i, tensor in enumerate(tensors):
+        if tensor.numel() != 1:
+            # raises the usual error for tensors which are not scalars
+            scalars[i] = tensor.item()
+            continue
+        groups.setdefault((tensor.device, tensor.dtype), []).append(i)
+
+    for idxs in groups.values():
+        stacked = torch.stack([tensors[i].detach().reshape(()) for i in idxs])
+        for i, value in zip(idxs, stacked.cpu().tolist()):
+            scalars[i] = value
+    return scalars
@@ -6,6 +6,35 @@ from pytorch_lightning.core.lightning import LightningModule
 
 class TrainerModelHooksMixin(ABC):
 
+    # hooks which are called on every step or epoch and are therefore resolved once per fit
+    LOOP_HOOKS = (
+        'on_epoch_start', 'on_epoch_end', 'on_batch_start', 'on_batch_end', 'on_after_backward',
+        'training_step_end', 'training_end', 'validation_step_end', 'test_step_end',
+    )
+
+    # this is just a summary on variables used in this abstract class,
+    #  the proper values/initialisation should be done in child class
+    _live_model_hooks: ...
+    _training_step_takes_optimizer_idx: bool
+
+    def resolve_model_hooks(self, model: LightningModule) -> None:
+        """Resolves which loop hooks the model overrides and how its ``training_step`` is called.
+
+        Done once per fit, so the loops don't have to introspect the model on every batch.
+        """
+        self._live_model_hooks = {name for name in self.LOOP_HOOKS if self.is_overriden(name, model)}
+
+        training_step = getattr(model, 'training_step', None)
+        self._training_step_takes_optimizer_idx = (
+            training_step is not None and 'optimizer_idx' in inspect.signature(training_step).parameters
+        )
+
+    def is_hook_live(self, method_name: str) -> bool:
+        """Same as :meth:`is_overriden` for the :attr:`LOOP_HOOKS`, but looked up in the resolved hooks."""
+        if self._live_model_hooks is None:
+            self.resolve_model_hooks(self.get_model())
+        return method_name in self._live_model_hooks
+
     def is_function_implemented(self, f_name):
         model = self.get_model()
         f_op = getattr(model, f_name, None)
@@ -11,6 +11,16 @@ from pytorch_lightning.core.lightning import LightningModule
 
 class TrainerOptimizersMixin(ABC):
 
+    # this is just a summary on variables used in this abstract class,
+    #  the proper values/initialisation should be done in child class
+    optimizers: ...
+    _params_all: ...
+    _params_by_optimizer: ...
+    _params_toggles: ...
+    _params_model: ...
+    _params_version: ...
+    _params_owner: ...
+
     def init_optimizers(
             self,
             model: LightningModule
@@ -106,6 +116,52 @@ class TrainerOptimizersMixin(ABC):
                                  'is a invalid input.')
         return lr_schedulers
 
+    def partition_optimizer_params(self, model: LightningModule) -> None:
+        """Caches which parameters each optimizer trains, so ``requires_grad`` can be toggled
+        between multiple optimizers without going through the model on every step."""
+        self._params_model = model
+        self._params_all = list(model.parameters())
+        self._params_by_optimizer = [[p for group in optimizer.param_groups for p in group['params']]
+                                     for optimizer in self.optimizers]
+        self._params_toggles = {}
+        self._params_version = None
+        self._params_owner = None
+
+    def toggle_optimizer_params(self, opt_idx: int):
+        """Makes only the parameters of optimizer ``opt_idx`` require grads.
+
+        Only the parameters whose state differs from the previously toggled optimizer are flipped.
+        After ``freeze()`` or ``unfreeze()`` of the model all the parameters are set again. Other
+        changes of ``requires_grad`` between two steps are not noticed and not corrected.
+        """
+        prev_idx = self._params_owner
+        version = getattr(self._params_model, '_requires_grad_version', 0)
+        if version != self._params_version:
+            prev_idx, self._params_version = None, version
+
+        key = (prev_idx, opt_idx)
+        if key not in self._params_toggles:
+            self._params_toggles[key] = self._diff_optimizer_params(*key)
+        enable, disable = self._params_toggles[key]
+
+        for param in disable:
+            param.requires_grad = False
+        for param in enable:
+            param.requires_grad = True
+        self._params_owner = opt_idx
+
+    def _diff_optimizer_params(self, prev_idx, opt_idx: int) -> Tuple[List, List]:
+        own_params = self._params_by_optimizer[opt_idx]
+        own_ids = {id(p) for p in own_params}
+        if prev_idx is None:
+            return own_params, [p for p in self._params_all if id(p) not in own_ids]
+
+        prev_params = self._params_by_optimizer[prev_idx]
+        prev_ids = {id(p) for p in prev_params}
+        enable = [p for p in own_params if id(p) not in prev_ids]
+        disable = [p for p in prev_params if id(p) not in own_ids]
+        return enable, disable
+
 
 class _MockOptimizer(Optimizer):
     """The `_MockOptimizer` will be used inplace of an optimizer in the event that `None`
@@ -1,15 +1,34 @@
+import itertools
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
 import torch
 
+from pytorch_lightning.core.saving import (
+    _map_tensors,
+    remove_checkpoint,
+    save_incremental_checkpoint,
+    save_streaming_checkpoint,
+)
+from pytorch_lightning.trainer.dataloader_args import rebuild_dataloader
+
 
-class TensorRunningMean(object):
+class TensorRunningAccum(object):
     """
-    Tracks a running mean without graph references.
-    Round robbin for the mean
+    Tracks the running statistics of the last ``window_length`` values without graph references.
+    Round robbin for the statistics
+
+    The values are kept on the device they are appended from, so appending doesn't sync with
+    the host, only converting a statistic to a Python number does.
 
     Examples:
-        >>> accum = TensorRunningMean(5)
-        >>> accum.last(), accum.mean()
-        (None, None)
+        >>> accum = TensorRunningAccum(5)
+        >>> accum.last(), accum.mean(), accum.ema()
+        (None, None, None)
         >>> accum.append(torch.tensor(1.5))
         >>> accum.last(), accum.mean()
         (tensor(1.5000), tensor(1.5000))
@@ -18,31 +37,47 @@ class TensorRunningMean(object):
         (tensor(2.5000), tensor(2.))
         >>> accum.reset()
         >>> _= [accum.append(torch.tensor(i)) for i in range(13)]
-        >>> accum.last(), accum.mean()
-        (tensor(12.), tensor(10.))
+        >>> accum.last(), accum.mean(), accum.min(), accum.max()
+        (tensor(12.), tensor(10.), tensor(8.), tensor(12.))
+        >>> accum = TensorRunningAccum(5, ema_decay=0.5)
+        >>> _= [accum.append(torch.tensor(i)) for i in (1., 3., 5.)]
+        >>> accum.ema()
+        tensor(3.5000)
     """
-    def __init__(self, window_length: int):
+    def __init__(self, window_length: int, ema_decay: float = 0.9):
         self.window_length = window_length
-        self.memory = torch.Tensor(self.window_length)
+        self.ema_decay = ema_decay
+        # allocated on the device and with the dtype of the first value
+        self.memory: Optional[torch.Tensor] = None
+        self.ema_value: Optional[torch.Tensor] = None
         self.current_idx: int = 0
-        self.last_idx: int = None
+        self.last_idx: Optional[int] = None
         self.rotated: bool = False
 
     def reset(self) -> None:
-        self = TensorRunningMean(self.window_length)
+        """Forgets the values, keeping the memory for the next ones."""
+        self.current_idx = 0
+        self.last_idx = None
+        self.rotated = False
 
     def last(self):
         if self.last_idx is not None:
             return self.memory[self.last_idx]
 
     def append(self, x):
-        # map proper type for memory if they don't match
-        if self.memory.type() != x.type():
-            self.memory.type_as(x)
+        x = torch.as_tensor(x)
+        if self.memory is None or self.memory.device != x.device:
+            dtype = x.dtype if x.is_floating_point() else torch.get_default_dtype()
+            self.memory = torch.zeros(self.window_length, dtype=dtype, device=x.device)
+            self.ema_value = torch.zeros((), dtype=dtype, device=x.device)
 
         # store without grads
         with torch.no_grad():
             self.memory[self.current_idx] = x
+            if self.last_idx is None:
+                self.ema_value.copy_(x)
+            else:
+                self.ema_value.mul_(self.ema_decay).add_(x, alpha=1 - self.ema_decay)
             self.last_idx = self.current_idx
 
         # increase index
@@ -53,6 +88,940 @@ class TensorRunningMean(object):
         if self.current_idx == 0:
             self.rotated = True
 
+    def _window(self) -> Optional[torch.Tensor]:
+        if self.last_idx is not None:
+            return self.memory if self.rotated else self.memory[:self.current_idx]
+
     def mean(self):
+        window = self._window()
+        return window.mean() if window is not None else None
+
+    def min(self):
+        window = self._window()
+        return window.min() if window is not None else None
+
+    def max(self):
+        window = self._window()
+        return window.max() if window is not None else None
+
+    def ema(self):
+        """Exponential moving average of all the values since the last reset."""
         if self.last_idx is not None:
-            return self.memory.mean() if self.rotated else self.memory[:self.current_idx].mean()
+            return self.ema_value.clone()
+
+
+class ThroughputMonitor(object):
+    """
+    Tracks the speed of the last ``window_length`` training steps in preallocated ring buffers,
+    so recording a step doesn't allocate. A window length of 0 disables the monitor.
+
+    A step lasts from requesting its batch until the batch is trained on. The time spent waiting
+    for the batch and in the forward, backward and optimizer phases are recorded separately.
+    On GPUs the phases are measured on the host, kernels still running when a phase ends are
+    accounted to the phase which waits for them.
+
+    Examples:
+        >>> import itertools
+        >>> monitor = ThroughputMonitor(4, clock=itertools.count(step=0.5).__next__)
+        >>> monitor.metrics()
+        {}
+        >>> for _ in range(6):
+        ...     monitor.start_step()
+        ...     monitor.batch_ready()
+        ...     with monitor.record('optimizer'), monitor.record('forward'):
+        ...         pass
+        ...     monitor.end_step(num_samples=8)
+        >>> metrics = {k.split('/')[1]: round(v, 2) for k, v in monitor.metrics().items()}
+        >>> metrics['samples_per_sec'], metrics['batches_per_sec'], metrics['step_time_p95']
+        (2.67, 0.33, 3.0)
+        >>> metrics['data_wait_fraction'], metrics['forward_fraction'], metrics['optimizer_fraction']
+        (0.17, 0.17, 0.33)
+    """
+    PHASES = ('data', 'forward', 'backward', 'optimizer')
+
+    def __init__(self, window_length: int, clock: Callable[[], float] = time.perf_counter):
+        self.window_length = window_length
+        self.clock = clock
+        # one row per phase, followed by the step times and the number of samples per step
+        self.memory = np.zeros((len(self.PHASES) + 2, window_length))
+        self.current = [0.] * len(self.PHASES)
+        if window_length:
+            self.timers = {phase: _PhaseTimer(self, idx) for idx, phase in enumerate(self.PHASES)}
+        else:
+            self.timers = dict.fromkeys(self.PHASES, _NoTimer())
+        self.active_idx = None
+        self.current_idx: int = 0
+        self.num_steps: int = 0
+        self.step_start: float = 0.
+
+    def reset(self) -> None:
+        self.current = [0.] * len(self.PHASES)
+        self.active_idx = None
+        self.current_idx = 0
+        self.num_steps = 0
+
+    def start_step(self) -> None:
+        self.step_start = self.clock()
+
+    def batch_ready(self) -> None:
+        self.current[0] = self.clock() - self.step_start
+
+    def record(self, phase: str) -> '_PhaseTimer':
+        """Returns a reusable context manager adding the time spent in it to ``phase`` of the current step."""
+        return self.timers[phase]
+
+    def end_step(self, num_samples: int) -> None:
+        if not self.window_length:
+            return
+
+        step_time = self.clock() - self.step_start
+
+        idx = self.current_idx
+        for phase_idx, phase_time in enumerate(self.current):
+            self.memory[phase_idx, idx] = phase_time
+            self.current[phase_idx] = 0.
+        self.memory[-2, idx] = step_time
+        self.memory[-1, idx] = num_samples
+
+        self.current_idx = (idx + 1) % self.window_length
+        self.num_steps += 1
+
+    def metrics(self) -> Dict[str, float]:
+        """Computes the throughput metrics over the steps in the window."""
+        num_steps = min(self.num_steps, self.window_length)
+        if not num_steps:
+            return {}
+
+        window = self.memory[:, :num_steps]
+        step_times = window[-2]
+        total_time = max(step_times.sum(), 1e-12)
+        metrics = {
+            'samples_per_sec': window[-1].sum() / total_time,
+            'batches_per_sec': num_steps / total_time,
+        }
+        for phase_idx, phase in enumerate(self.PHASES):
+            name = 'data_wait' if phase == 'data' else phase
+            metrics[f'{name}_fraction'] = window[phase_idx].sum() / total_time
+        metrics['step_time_p50'], metrics['step_time_p95'] = np.percentile(step_times, [50, 95])
+        return {f'throughput/{k}': float(v) for k, v in metrics.items()}
+
+
+class _PhaseTimer(object):
+    """Times a phase, excluding it from the enclosing phase (e.g. closure re-evaluations in the optimizer)."""
+
+    def __init__(self, monitor: ThroughputMonitor, phase_idx: int):
+        self.monitor = monitor
+        self.phase_idx = phase_idx
+        self.outer_idx = None
+        self.start = 0.
+
+    def __enter__(self):
+        self.outer_idx, self.monitor.active_idx = self.monitor.active_idx, self.phase_idx
+        self.start = self.monitor.clock()
+
+    def __exit__(self, *args):
+        elapsed = self.monitor.clock() - self.start
+        self.monitor.current[self.phase_idx] += elapsed
+        if self.outer_idx is not None:
+            self.monitor.current[self.outer_idx] -= elapsed
+        self.monitor.active_idx = self.outer_idx
+
+
+class _NoTimer(object):
+    """Stands in for the phase timers of a disabled :class:`ThroughputMonitor`."""
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *args):
+        pass
+
+
+class ThrottledProgressBar(object):
+    """
+    Wraps a tqdm progress bar to refresh it at most every ``min_interval`` seconds.
+
+    Updates in between are counted and forwarded with the next refresh, the postfix is only
+    computed when the bar refreshes, so fast loops don't read their metrics and format them
+    on every batch. Everything else is passed through to the wrapped bar.
+
+    Examples:
+        >>> import io
+        >>> from tqdm import tqdm
+        >>> clock = iter([0., 0.05, 0.2, 0.3]).__next__
+        >>> pbar = ThrottledProgressBar(tqdm(total=10, file=io.StringIO()), min_interval=0.1, clock=clock)
+        >>> pbar.update(1, postfix=lambda: {'loss': '1.000'})
+        >>> pbar.n, pbar.postfix
+        (1, 'loss=1.000')
+        >>> pbar.update(1, postfix=lambda: {'loss': '2.000'})
+        >>> pbar.n, pbar.postfix
+        (1, 'loss=1.000')
+        >>> pbar.update(1, postfix=lambda: {'loss': '3.000'})
+        >>> pbar.n, pbar.postfix
+        (3, 'loss=3.000')
+        >>> pbar.close()
+    """
+    def __init__(self, bar, min_interval: float, clock: Callable[[], float] = time.monotonic):
+        self.bar = bar
+        self.min_interval = min_interval
+        self.clock = clock
+        self.pending: int = 0
+        self.postfix_fn: Optional[Callable[[], dict]] = None
+        self.last_refresh: float = float('-inf')
+
+    def __getattr__(self, name):
+        # only called for attributes the wrapper doesn't have
+        if name == 'bar':
+            raise AttributeError(name)
+        return getattr(self.bar, name)
+
+    def update(self, n: int = 1, postfix: Optional[Callable[[], dict]] = None) -> None:
+        """Counts ``n`` more iterations, ``postfix`` returns the metrics to show once the bar refreshes."""
+        if self.bar.disable:
+            return
+
+        self.pending += n
+        if postfix is not None:
+            self.postfix_fn = postfix
+        now = self.clock()
+        if now - self.last_refresh >= self.min_interval:
+            self._refresh(now)
+
+    def flush(self, postfix: Optional[Callable[[], dict]] = None) -> None:
+        """Refreshes the bar with the pending iterations and postfix right away."""
+        if not self.bar.disable:
+            self._refresh(self.clock(), postfix)
+
+    def _refresh(self, now: float, postfix: Optional[Callable[[], dict]] = None) -> None:
+        postfix = postfix or self.postfix_fn
+        self.postfix_fn = None
+        if postfix is not None:
+            self.bar.set_postfix(refresh=not self.pending, **postfix())
+        if self.pending:
+            self.bar.update(self.pending)
+            self.pending = 0
+        self.last_refresh = now
+
+    def reset(self, total=None) -> None:
+        self.pending = 0
+        self.postfix_fn = None
+        self.bar.reset(total)
+
+    def close(self) -> None:
+        self.flush()
+        self.bar.close()
+
+
+class EpochOutputReducer(object):
+    """
+    Folds step outputs into running per-key reductions, so an epoch
+    only keeps one value per key alive instead of the outputs of every step.
+
+    Supported reductions are ``'sum'``, ``'mean'``, ``'max'``, ``'min'`` and ``'cat'``
+    (concatenation along the first dimension). Keys without a reduction are ignored.
+
+    Args:
+        offload: copy the values to be concatenated to pinned CPU memory as they arrive,
+            so they don't hold on to accelerator memory.
+        reductions: reduction per key of the step outputs.
+
+    Examples:
+        >>> reducer = EpochOutputReducer(loss='mean', correct='sum', preds='cat')
+        >>> reducer.compute()
+        {}
+        >>> reducer.update({'loss': torch.tensor(1.), 'correct': 3, 'preds': torch.tensor([1, 2])})
+        >>> reducer.update({'loss': torch.tensor(2.), 'correct': 4, 'preds': torch.tensor([3]), 'other': 0})
+        >>> reducer.compute()
+        {'loss': tensor(1.5000), 'correct': tensor(7), 'preds': tensor([1, 2, 3])}
+    """
+    REDUCTIONS = ('sum', 'mean', 'max', 'min', 'cat')
+
+    def __init__(self, offload: bool = False, **reductions: str):
+        for key, reduction in reductions.items():
+            if reduction not in self.REDUCTIONS:
+                raise ValueError(f'Unknown reduction `{reduction}` for `{key}`,'
+                                 f' use one of {self.REDUCTIONS}.')
+        self.offload = offload
+        self.reductions = reductions
+        self.reset()
+
+    def reset(self) -> None:
+        self.values: Dict[str, torch.Tensor] = {}
+        self.counts: Dict[str, int] = {}
+        # the GPUs the offloaded values are being copied from
+        self._pending_copies: set = set()
+
+    def update(self, output: dict) -> None:
+        for key, reduction in self.reductions.items():
+            if key not in output:
+                continue
+
+            # store without grads
+            value = torch.as_tensor(output[key]).detach()
+            if reduction == 'cat':
+                value = value.reshape(-1, *value.shape[1:])
+                if self.offload and value.is_cuda:
+                    value = self._offload(value)
+                self.values.setdefault(key, []).append(value)
+            elif key not in self.values:
+                # booleans are counted, their in-place sum would be a logical or
+                self.values[key] = value.long() if value.dtype == torch.bool else value.clone()
+            elif reduction in ('sum', 'mean'):
+                total = self.values[key]
+                dtype = torch.promote_types(total.dtype, value.dtype)
+                if dtype == total.dtype:
+                    total += value
+                else:
+                    # e.g. integers followed by floats, which the integer accumulator would truncate
+                    self.values[key] = total.to(dtype) + value
+            elif reduction == 'max':
+                self.values[key] = torch.max(self.values[key], value)
+            else:
+                self.values[key] = torch.min(self.values[key], value)
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def _offload(self, value: torch.Tensor) -> torch.Tensor:
+        """Starts copying ``value`` into pinned CPU memory without waiting for the copy."""
+        buffer = torch.empty(value.shape, dtype=value.dtype, pin_memory=True)
+        buffer.copy_(value, non_blocking=True)
+        self._pending_copies.add(value.device)
+        return buffer
+
+    def compute(self) -> Dict[str, torch.Tensor]:
+        """Returns the reduced value of every key seen so far."""
+        # the offloaded values are only safe to read once their copies are done
+        for device in self._pending_copies:
+            torch.cuda.synchronize(device)
+        self._pending_copies.clear()
+
+        results = {}
+        for key, value in self.values.items():
+            reduction = self.reductions[key]
+            if reduction == 'cat':
+                value = torch.cat(value)
+            elif reduction == 'mean':
+                if not value.is_floating_point():
+                    value = value.float()
+                value = value / self.counts[key]
+            results[key] = value
+        return results
+
+
+class BatchPrefetcher(object):
+    """
+    Loads batches from an iterable on a background thread and keeps up to ``depth`` of them ready
+    ahead of the consumer, so that collation and host-to-device copies overlap with the current step.
+
+    If ``transfer_fn`` is given it is applied to every batch on the background thread. When ``device``
+    is a GPU the transfer runs on a side CUDA stream and the consumer waits on it only when the batch
+    is actually handed out.
+
+    When the consumer stops early, the batches loaded ahead are handed to ``put_back`` (as they came
+    from the iterable, before the transfer), e.g. to return them to a :class:`CyclingIterator`.
+
+    Examples:
+        >>> list(BatchPrefetcher(range(5), depth=2))
+        [0, 1, 2, 3, 4]
+        >>> list(BatchPrefetcher(range(3), depth=1, transfer_fn=lambda x: x * 10))
+        [0, 10, 20]
+    """
+
+    _END = object()
+
+    def __init__(self, iterable, depth: int, transfer_fn: Optional[Callable] = None,
+                 device: Optional[torch.device] = None, put_back: Optional[Callable[[list], None]] = None):
+        self.iterable = iterable
+        self.depth = max(1, depth)
+        self.transfer_fn = transfer_fn
+        self.device = device
+        self.put_back = put_back
+        self._stop_event = None
+        self._thread = None
+        self._batches = None
+        self._leftover = None
+
+    def __len__(self):
+        return len(self.iterable)
+
+    def __iter__(self):
+        # only one pass can be in flight at a time
+        self.close()
+
+        stop_event = threading.Event()
+        batches = queue.Queue(maxsize=self.depth)
+        stream = None
+        if self.device is not None and self.device.type == 'cuda':
+            stream = torch.cuda.Stream(device=self.device)
+
+        # the batch the loader holds when it is stopped
+        leftover = []
+        thread = threading.Thread(target=self._load,
+                                  args=(iter(self.iterable), batches, stop_event, stream, leftover),
+                                  name='BatchPrefetcher', daemon=True)
+        self._stop_event, self._thread, self._batches, self._leftover = stop_event, thread, batches, leftover
+        thread.start()
+
+        try:
+            while True:
+                item = batches.get()
+                if item is self._END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+
+                batch, ready, _ = item
+                if ready is not None:
+                    # make the compute stream wait for the copy and tell the allocator who uses the memory
+                    current_stream = torch.cuda.current_stream(self.device)
+                    current_stream.wait_event(ready)
+                    _record_stream(batch, current_stream)
+                yield batch
+        finally:
+            self._shutdown(stop_event, thread, batches, leftover)
+
+    def close(self) -> None:
+        """Stops the background thread, e.g. when the consumer leaves the loop early."""
+        if self._thread is not None:
+            self._shutdown(self._stop_event, self._thread, self._batches, self._leftover)
+
+    def _shutdown(self, stop_event, thread, batches, leftover):
+        stop_event.set()
+        # unblock the loader if it waits on a full queue
+        unused = _drain(batches)
+        if thread is not threading.current_thread():
+            thread.join()
+        # the loader may have put one more batch before it saw the stop
+        unused += _drain(batches) + leftover
+        del leftover[:]
+        if self._thread is thread:
+            self._stop_event, self._thread, self._batches, self._leftover = None, None, None, None
+        if unused and self.put_back is not None:
+            self.put_back(unused)
+
+    def _load(self, iterator, batches, stop_event, stream, leftover):
+        try:
+            for original in iterator:
+                batch, ready = original, None
+                if self.transfer_fn is not None:
+                    if stream is not None:
+                        with torch.cuda.stream(stream):
+                            batch = self.transfer_fn(batch)
+                            ready = torch.cuda.Event()
+                            ready.record(stream)
+                    else:
+                        batch = self.transfer_fn(batch)
+
+                if not _put_until(batches, (batch, ready, original), stop_event):
+                    leftover.append(original)
+                    return
+        except Exception as exc:
+            _put_until(batches, exc, stop_event)
+            return
+        _put_until(batches, self._END, stop_event)
+
+
+class CheckpointWriter(object):
+    """
+    Saves checkpoints atomically: to a temporary file with a ``.part`` suffix which then replaces the
+    destination, so a checkpoint is never seen incomplete.
+
+    With ``max_pending > 0`` the checkpoint is first copied to CPU memory, which is fast, and then
+    serialized and written on a background thread, with up to ``max_pending`` checkpoints in flight;
+    saving more waits for the oldest one. Removals are queued behind the writes, and errors of the
+    background thread are raised by the next call. Use ``wait`` to make sure all checkpoints are written.
+    The ``checkpoint_format`` is one of ``'torch'``, ``'streaming'`` and ``'incremental'``, see
+    :func:`~pytorch_lightning.core.saving.save_streaming_checkpoint` and
+    :func:`~pytorch_lightning.core.saving.save_incremental_checkpoint`.
+
+    Examples:
+        >>> import os, tempfile
+        >>> writer = CheckpointWriter(max_pending=2)
+        >>> filepath = os.path.join(tempfile.mkdtemp(), 'example.ckpt')
+        >>> writer.save({'weight': torch.ones(2)}, filepath)
+        >>> writer.wait()
+        >>> torch.load(filepath)
+        {'weight': tensor([1., 1.])}
+        >>> writer.remove(filepath)
+        >>> writer.close()
+        >>> os.path.exists(filepath)
+        False
+    """
+
+    def __init__(self, max_pending: int = 0, checkpoint_format: str = 'torch'):
+        self.max_pending = max_pending
+        self.checkpoint_format = checkpoint_format
+        self._init_state()
+
+    def _init_state(self):
+        self._lock = threading.Lock()
+        self._pending_paths: Dict[str, int] = {}
+        self._error = None
+        self._queue = None
+        self._thread = None
+
+    def __getstate__(self):
+        # the thread and its queue stay in this process
+        return {'max_pending': self.max_pending, 'checkpoint_format': self.checkpoint_format}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_state()
+
+    def save(self, checkpoint: dict, filepath: str) -> None:
+        """Saves the checkpoint to ``filepath``, in the background if ``max_pending > 0``."""
+        self._raise_error()
+        if self.max_pending <= 0:
+            _write_checkpoint(checkpoint, filepath, self.checkpoint_format)
+            return
+
+        devices = set()
+        checkpoint = _snapshot_to_cpu(checkpoint, devices)
+        # the copies from the GPUs run asynchronously, the thread waits for them before writing
+        copies_done = []
+        for device in devices:
+            with torch.cuda.device(device):
+                copies_done.append(torch.cuda.Event())
+                copies_done[-1].record()
+        self._submit(filepath, _write_checkpoint, checkpoint, filepath, self.checkpoint_format, copies_done)
+
+    def remove(self, filepath: str) -> None:
+        """Removes the checkpoint ``filepath``, after it is written if that is still pending."""
+        self._raise_error()
+        if self.max_pending <= 0:
+            remove_checkpoint(filepath)
+            return
+
+        self._submit(filepath, remove_checkpoint, filepath)
+
+    def is_pending(self, filepath: str) -> bool:
+        """Tells whether a checkpoint is still being written to (or removed from) ``filepath``."""
+        with self._lock:
+            return filepath in self._pending_paths
+
+    def wait(self) -> None:
+        """Blocks until all checkpoints are written, and raises the error of a failed one."""
+        if self._queue is not None:
+            self._queue.join()
+        self._raise_error()
+
+    def close(self) -> None:
+        """Waits for all checkpoints and stops the background thread."""
+        try:
+            self.wait()
+        finally:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._queue, self._thread = None, None
+
+    def _submit(self, filepath: str, fn: Callable, *args) -> None:
+        if self._thread is None:
+            self._queue = queue.Queue(maxsize=self.max_pending)
+            self._thread = threading.Thread(target=self._work, args=(self._queue,),
+                                            name='CheckpointWriter', daemon=True)
+            self._thread.start()
+
+        with self._lock:
+            self._pending_paths[filepath] = self._pending_paths.get(filepath, 0) + 1
+        self._queue.put((filepath, fn, args))
+
+    def _work(self, tasks: queue.Queue) -> None:
+        while True:
+            task = tasks.get()
+            if task is None:
+                tasks.task_done()
+                return
+
+            filepath, fn, args = task
+            try:
+                fn(*args)
+            except Exception as exc:
+                with self._lock:
+                    self._error = self._error or exc
+            finally:
+                with self._lock:
+                    self._pending_paths[filepath] -= 1
+                    if not self._pending_paths[filepath]:
+                        del self._pending_paths[filepath]
+                tasks.task_done()
+
+    def _raise_error(self) -> None:
+        with self._lock:
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+
+class CyclingIterator(object):
+    """
+    Iterates over an iterable in chunks which continue where the previous one stopped, so the
+    underlying iterator (e.g. a DataLoader with its worker processes) survives between chunks.
+
+    The iterable is only iterated again once it is exhausted, ``on_restart`` is then called
+    with the number of completed passes, e.g. to reshuffle a distributed sampler.
+
+    Examples:
+        >>> batches = CyclingIterator(range(5))
+        >>> list(batches.take(3)), list(batches.take(3)), list(batches.take(3))
+        ([0, 1, 2], [3, 4, 0], [1, 2, 3])
+        >>> batches.passes
+        1
+    """
+
+    def __init__(self, iterable, on_restart: Optional[Callable[[int], None]] = None):
+        self.iterable = iterable
+        self.on_restart = on_restart
+        self.passes: int = 0
+        self._iterator = None
+        self._returned = []
+
+    def take(self, num_items: int):
+        """Yields the next ``num_items`` items, fewer only if the iterable is empty."""
+        for _ in range(num_items):
+            try:
+                yield self._next()
+            except StopIteration:
+                return
+
+    def put_back(self, items: list) -> None:
+        """Makes ``items``, which were taken but not used, the next ones returned.
+
+        Examples:
+            >>> batches = CyclingIterator(range(5))
+            >>> taken = list(batches.take(3))
+            >>> batches.put_back(taken[1:])
+            >>> list(batches.take(4))
+            [1, 2, 3, 4]
+        """
+        self._returned = list(items) + self._returned
+
+    def _next(self):
+        if self._returned:
+            return self._returned.pop(0)
+        if self._iterator is None:
+            self._restart()
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            self.passes += 1
+
+        # start the next pass, an empty one ends the iteration
+        self._restart()
+        return next(self._iterator)
+
+    def _restart(self) -> None:
+        if self.on_restart is not None:
+            self.on_restart(self.passes)
+        self._iterator = iter(self.iterable)
+
+    def close(self) -> None:
+        """Releases the underlying iterator, the next item starts a new pass."""
+        self._iterator = None
+        self._returned = []
+
+
+class PersistentWorkersLoader(object):
+    """
+    Iterates over a DataLoader with worker processes through one underlying iterator for all passes,
+    so the workers are started (and the dataset pickled to them) once instead of for every pass.
+
+    The DataLoader is re-created with a batch sampler which repeats ``num_batches`` batches of the
+    original one per pass, a new pass calling ``set_epoch`` on samplers supporting it. Every
+    ``iter()`` yields one such pass; when a pass was left early the workers, which already load
+    the rest of it, are restarted.
+
+    Examples:
+        >>> from torch.utils.data import DataLoader
+        >>> loader = PersistentWorkersLoader(DataLoader(range(10), batch_size=4), num_batches=2)
+        >>> [batch.tolist() for batch in loader], len(loader)
+        ([[0, 1, 2, 3], [4, 5, 6, 7]], 2)
+        >>> iterator = loader._iterator
+        >>> _ = list(loader)
+        >>> loader._iterator is iterator
+        True
+        >>> loader.shutdown()
+    """
+
+    def __init__(self, dataloader, num_batches: int):
+        self.batch_sampler = _RepeatingBatchSampler(dataloader.batch_sampler, num_batches)
+        self.dataloader = rebuild_dataloader(dataloader, batch_sampler=self.batch_sampler)
+        self.dataset = dataloader.dataset
+        self.num_workers = dataloader.num_workers
+        self._iterator = None
+        self._remaining = 0
+
+    def __len__(self):
+        return len(self.batch_sampler)
+
+    def __iter__(self):
+        # the workers already load the rest of a pass left early
+        if self._remaining:
+            self.shutdown()
+        if self._iterator is None:
+            self._iterator = iter(self.dataloader)
+
+        self._remaining = len(self)
+        while self._remaining:
+            batch = next(self._iterator)
+            self._remaining -= 1
+            yield batch
+
+    def shutdown(self) -> None:
+        """Stops the worker processes, the next pass starts new ones."""
+        if self._iterator is not None:
+            shutdown_workers = getattr(self._iterator, '_shutdown_workers', None)
+            if shutdown_workers is not None:
+                shutdown_workers()
+        self._iterator = None
+        self._remaining = 0
+
+
+class BucketBatchSampler(object):
+    """
+    Batches samples of similar length, as many as fit in a budget of ``max_tokens`` padded tokens,
+    to waste little compute on padding variable-length inputs.
+
+    The samples, sorted by length, are split into buckets of ``bucket_size`` samples. The batches of a
+    bucket hold ``max_tokens // longest length in the bucket`` samples (at least one), so the number of
+    batches is the same in every epoch. With ``shuffle`` the samples are shuffled within their bucket
+    and the batches are shuffled, deterministically for the ``seed`` and the epoch set by ``set_epoch``.
+
+    With several replicas every process makes the same batches and takes one of each group of
+    ``num_replicas`` batches of similar cost, so the replicas get balanced token counts in every step.
+    The batches are repeated to give all replicas the same number, unless ``drop_last``.
+
+    Examples:
+        >>> sampler = BucketBatchSampler([1, 5, 2, 5, 1, 2], max_tokens=6, bucket_size=2, shuffle=False)
+        >>> list(sampler), len(sampler)
+        ([[0, 4], [2, 5], [1], [3]], 4)
+        >>> list(BucketBatchSampler([1, 5, 2, 5, 1, 2], max_tokens=6, bucket_size=2, shuffle=False,
+        ...                         num_replicas=2, rank=1))
+        [[2, 5], [3]]
+    """
+
+    def __init__(self, lengths: Sequence[int], max_tokens: int, bucket_size: int = 1024, shuffle: bool = True,
+                 seed: int = 0, num_replicas: int = 1, rank: int = 0, drop_last: bool = False):
+        if max_tokens < 1:
+            raise ValueError(f'max_tokens must be positive, got {max_tokens}')
+        if not 0 <= rank < num_replicas:
+            raise ValueError(f'rank must lie in [0, {num_replicas}), got {rank}')
+
+        self.max_tokens = max_tokens
+        self.shuffle = shuffle
+        self.seed = seed
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.drop_last = drop_last
+        self.epoch: int = 0
+
+        lengths = np.asarray(lengths)
+        order = np.argsort(lengths, kind='stable')
+        # (indices, batch size, longest length) per bucket
+        self.buckets = []
+        for start in range(0, len(order), bucket_size):
+            indices = order[start:start + bucket_size]
+            longest = max(1, int(lengths[indices[-1]]))
+            self.buckets.append((indices, max(1, max_tokens // longest), longest))
+
+    def set_epoch(self, epoch: int) -> None:
+        """Sets the epoch the samples and batches are shuffled for."""
+        self.epoch = epoch
+
+    @property
+    def num_batches(self) -> int:
+        """The number of batches of all replicas together, before they are evened out."""
+        return sum(-(-len(indices) // batch_size) for indices, batch_size, _ in self.buckets)
+
+    def __len__(self):
+        if self.drop_last:
+            return self.num_batches // self.num_replicas
+        return -(-self.num_batches // self.num_replicas)
+
+    def __iter__(self):
+        return iter(self._batches())
+
+    def _batches(self) -> List[List[int]]:
+        generator = torch.Generator()
+        generator.manual_seed(self.seed + self.epoch)
+
+        batches = []
+        for indices, batch_size, longest in self.buckets:
+            if self.shuffle:
+                indices = indices[torch.randperm(len(indices), generator=generator).numpy()]
+            for start in range(0, len(indices), batch_size):
+                batch = indices[start:start + batch_size].tolist()
+                batches.append((len(batch) * longest, batch))
+        if not batches:
+            return []
+
+        # neighbouring batches cost about the same, the replicas take one of each group
+        batches = [batch for _, batch in sorted(batches, key=lambda cost_and_batch: cost_and_batch[0])]
+        num_batches = len(self) * self.num_replicas
+        batches = [batches[i % len(batches)] for i in range(num_batches)]
+        groups = [batches[i:i + self.num_replicas] for i in range(0, num_batches, self.num_replicas)]
+        if self.shuffle:
+            groups = [groups[i] for i in torch.randperm(len(groups), generator=generator).tolist()]
+        return [group[self.rank] for group in groups]
+
+
+class SeededRandomSampler(object):
+    """
+    Samples elements in a random order, drawn from ``seed`` and the epoch set by ``set_epoch``
+    instead of the global random number generator, so the order of an epoch can be drawn again.
+
+    Examples:
+        >>> sampler = SeededRandomSampler(range(6), seed=1)
+        >>> order = list(sampler)
+        >>> sorted(order), order == list(sampler)
+        ([0, 1, 2, 3, 4, 5], True)
+    """
+
+    def __init__(self, data_source, seed: int):
+        self.data_source = data_source
+        self.seed = seed
+        self.epoch: int = 0
+
+    def set_epoch(self, epoch: int) -> None:
+        """Sets the epoch the order is drawn for."""
+        self.epoch = epoch
+
+    def __len__(self):
+        return len(self.data_source)
+
+    def __iter__(self):
+        generator = torch.Generator()
+        generator.manual_seed(self.seed + self.epoch)
+        return iter(torch.randperm(len(self.data_source), generator=generator).tolist())
+
+
+class FastForwardBatchSampler(object):
+    """
+    Starts the next pass of a batch sampler after its first ``num_batches`` batches, e.g. to resume an epoch.
+    Only the indices of the skipped batches are generated, none of their samples is loaded.
+    The passes after the next one are complete.
+
+    Examples:
+        >>> from torch.utils.data import BatchSampler, SequentialSampler
+        >>> sampler = FastForwardBatchSampler(BatchSampler(SequentialSampler(range(6)), 2, False), num_batches=2)
+        >>> list(sampler), list(sampler)
+        ([[4, 5]], [[0, 1], [2, 3], [4, 5]])
+    """
+
+    def __init__(self, batch_sampler, num_batches: int):
+        self.batch_sampler = batch_sampler
+        self.num_batches = num_batches
+
+    def set_epoch(self, epoch: int) -> None:
+        """Sets the epoch of the wrapped batch sampler, or of its sampler."""
+        for sampler in (self.batch_sampler, getattr(self.batch_sampler, 'sampler', None)):
+            if hasattr(sampler, 'set_epoch'):
+                sampler.set_epoch(epoch)
+
+    def __len__(self):
+        return len(self.batch_sampler)
+
+    def __iter__(self):
+        num_batches, self.num_batches = self.num_batches, 0
+        return itertools.islice(self.batch_sampler, num_batches, None)
+
+
+class _RepeatingBatchSampler(object):
+
+    def __init__(self, batch_sampler, num_batches: int):
+        self.batch_sampler = batch_sampler
+        self.num_batches = min(num_batches, len(batch_sampler))
+        self.passes: int = 0
+
+    def __len__(self):
+        return self.num_batches
+
+    def __iter__(self):
+        while self.num_batches:
+            for sampler in (self.batch_sampler, getattr(self.batch_sampler, 'sampler', None)):
+                if hasattr(sampler, 'set_epoch'):
+                    sampler.set_epoch(self.passes)
+            for batch_idx, batch in enumerate(self.batch_sampler):
+                if batch_idx >= self.num_batches:
+                    break
+                yield batch
+            self.passes += 1
+
+
+def _snapshot_to_cpu(checkpoint, devices: set):
+    """Copies all tensors of a (nested) checkpoint to the CPU, and the containers holding them,
+    so training can go on changing the originals. The GPUs copied from are added to ``devices``."""
+    copies = {}
+
+    def copy_to_cpu(tensor):
+        # tensors shared in the checkpoint (e.g. tied weights) stay shared
+        if id(tensor) not in copies:
+            data = tensor.detach()
+            if data.is_cuda:
+                # pinned memory lets the copy run asynchronously
+                devices.add(data.device)
+                copy = torch.empty_like(data, device='cpu', pin_memory=True)
+                copy.copy_(data, non_blocking=True)
+            else:
+                copy = data.clone()
+            copies[id(tensor)] = (tensor, copy)
+        return copies[id(tensor)][1]
+
+    return _map_tensors(checkpoint, copy_to_cpu)
+
+
+def _write_checkpoint(checkpoint: dict, filepath: str, checkpoint_format: str = 'torch',
+                      copies_done: Sequence = ()) -> None:
+    for event in copies_done:
+        event.synchronize()
+    save = _CHECKPOINT_SAVERS[checkpoint_format]
+    tmp_path = str(filepath) + '.part'
+    try:
+        save(checkpoint, tmp_path)
+    except AttributeError:
+        # hparams which can't be pickled are left out
+        if 'hparams' not in checkpoint:
+            raise
+        checkpoint = {k: v for k, v in checkpoint.items() if k != 'hparams'}
+        save(checkpoint, tmp_path)
+    os.replace(tmp_path, filepath)
+
+
+_CHECKPOINT_SAVERS = {
+    'torch': torch.save,
+    'streaming': save_streaming_checkpoint,
+    'incremental': save_incremental_checkpoint,
+}
+
+
+def _drain(batches: queue.Queue) -> list:
+    """Empties the queue of a :class:`BatchPrefetcher`, returning the batches as they were loaded."""
+    originals = []
+    while not batches.empty():
+        item = batches.get_nowait()
+        if isinstance(item, tuple):
+            originals.append(item[2])
+    return originals
+
+
+def _put_until(batches: queue.Queue, item, stop_event: threading.Event) -> bool:
+    """Puts ``item`` into the queue unless the consumer stopped listening."""
+    while not stop_event.is_set():
+        try:
+            batches.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _record_stream(batch, stream) -> None:
+    """Marks all CUDA tensors in a (nested) batch as used by ``stream``."""
+    if isinstance(batch, torch.Tensor):
+        if batch.is_cuda:
+            batch.record_stream(stream)
+    elif isinstance(batch, (list, tuple)):
+        for x in batch:
+            _record_stream(x, stream)
+    elif isinstance(batch, dict):
+        for x in batch.values():
+            _record_stream(x, stream)
@@ -28,7 +28,12 @@ from pytorch_lightning.trainer.evaluation_loop import TrainerEvaluationLoopMixin
 from pytorch_lightning.trainer.logging import TrainerLoggingMixin
 from pytorch_lightning.trainer.model_hooks import TrainerModelHooksMixin
 from pytorch_lightning.trainer.optimizers import TrainerOptimizersMixin
-from pytorch_lightning.trainer.supporters import TensorRunningMean
+from pytorch_lightning.trainer.supporters import (
+    CheckpointWriter,
+    TensorRunningAccum,
+    ThroughputMonitor,
+    ThrottledProgressBar,
+)
 from pytorch_lightning.trainer.training_io import TrainerIOMixin
 from pytorch_lightning.trainer.training_loop import TrainerTrainLoopMixin
 from pytorch_lightning.trainer.training_tricks import TrainerTrainingTricksMixin
@@ -116,6 +121,19 @@ class Trainer(
             profiler: Optional[BaseProfiler] = None,
             benchmark: bool = False,
             reload_dataloaders_every_epoch: bool = False,
+            prefetch_batches: int = 0,
+            nan_check_interval: int = 1,
+            gradient_clip_algorithm: str = 'norm',
+            grad_norm_group_depth: Optional[int] = None,
+            training_outputs_retention: Union[str, List[str]] = 'all',
+            throughput_window: int = 0,
+            progress_bar_min_interval: float = 0.1,
+            batches_per_epoch: Optional[int] = None,
+            persistent_workers: bool = False,
+            auto_tune_dataloader: Union[bool, str] = False,
+            max_tokens_per_batch: Optional[int] = None,
+            async_checkpoints: int = 0,
+            checkpoint_format: str = 'torch',
             gradient_clip=None,  # backward compatible, todo: remove in v0.8.0
             nb_gpu_nodes=None,  # backward compatible, todo: remove in v0.8.0
             max_nb_epochs=None,  # backward compatible, todo: remove in v0.8.0
@@ -251,10 +269,54 @@ class Trainer(
             reload_dataloaders_every_epoch: Set to True to reload dataloaders every epoch
 
             benchmark: If true enables cudnn.benchmark.
+
+            prefetch_batches: Number of batches to load ahead of the training and evaluation loops
+                on a background thread. On a single GPU they are also copied to the device in advance.
+
+            nan_check_interval: Check the loss and the weights for nan and inf values every
+                this many batches. Set to 0 to disable the check.
+
+            gradient_clip_algorithm: 'norm' to clip the total norm of the gradients to `gradient_clip_val`,
+                'value' to clip each gradient value to [-gradient_clip_val, gradient_clip_val].
+
+            grad_norm_group_depth: When tracking grad norms, report one norm per group of parameters
+                sharing the first this many parts of their names (e.g. 1 for one per top-level module).
+
+            training_outputs_retention: What to keep of the training step outputs for `training_epoch_end`:
+                'all' of them, 'cpu' to keep them in CPU memory, or a list of the keys to keep.
+
+            throughput_window: Log the throughput of the training loop, computed over this many recent
+                steps, with the step metrics. Set to 0 to disable.
+
+            progress_bar_min_interval: Minimum time in seconds between two refreshes of the progress bars,
+                the progress bar metrics are only read when the bar refreshes.
+
+            batches_per_epoch: Run epochs of this many batches which continue on the same dataloader
+                iterator, instead of one pass over the train dataloader per epoch.
+
+            persistent_workers: Keep the worker processes of the train and validation dataloaders alive
+                across epochs and validation runs instead of starting them for every pass.
+
+            auto_tune_dataloader: Before training, measure which `num_workers`, `pin_memory` and
+                `prefetch_factor` load the train batches fastest and use them. With `'batch_size'`,
+                also use the largest batch size which fits in GPU memory. With `ddp` and `ddp2` the first
+                process tunes the dataloader for all of them. Not supported on TPUs.
+
+            max_tokens_per_batch: Batch samples of similar length together, as many as fit in this many
+                padded tokens. The lengths are read from the `lengths` attribute of the datasets.
+
+            async_checkpoints: Write checkpoints on a background thread, with up to this many
+                checkpoints waiting to be written. Set to 0 to write them before training goes on.
+
+            checkpoint_format: `'torch'` saves checkpoints with `torch.save`. `'streaming'` saves them
+                so that loading them maps the tensors from the file instead of reading it all into memory.
+                `'incremental'` saves the tensors in a store shared by the checkpoints in a directory,
+                so tensors which didn't change since an earlier checkpoint aren't written again.
         """
 
         # Init callbacks
         self.callbacks = callbacks
+        self._live_callbacks = {}
         self.on_init_start()
 
         # benchmarking
@@ -272,6 +334,11 @@ class Trainer(
         self.log_gpu_memory = log_gpu_memory
 
         self.gradient_clip_val = gradient_clip_val
+        if gradient_clip_algorithm not in ('norm', 'value'):
+            raise MisconfigurationException(
+                f"gradient_clip_algorithm can be 'norm' or 'value', got {gradient_clip_algorithm!r}"
+            )
+        self.gradient_clip_algorithm = gradient_clip_algorithm
         # Backward compatibility, TODO: remove in v0.8.0
         if gradient_clip is not None:
             warnings.warn("Argument `gradient_clip` has renamed to `gradient_clip_val` since v0.5.0"
@@ -279,8 +346,10 @@ class Trainer(
             self.gradient_clip = gradient_clip
 
         self.progress_bar_refresh_rate = progress_bar_refresh_rate
+        self.progress_bar_min_interval = progress_bar_min_interval
         self.check_val_every_n_epoch = check_val_every_n_epoch
         self.track_grad_norm = track_grad_norm
+        self.grad_norm_group_depth = grad_norm_group_depth
         self.on_gpu = True if (gpus and torch.cuda.is_available()) else False
 
         # tpu config
@@ -323,6 +392,36 @@ class Trainer(
                           DeprecationWarning)
 
         self.reload_dataloaders_every_epoch = reload_dataloaders_every_epoch
+        self.prefetch_batches = prefetch_batches
+        self.nan_check_interval = nan_check_interval
+        if isinstance(training_outputs_retention, str) and training_outputs_retention not in ('all', 'cpu'):
+            raise MisconfigurationException(
+                f"training_outputs_retention can be 'all', 'cpu' or a list of keys, got {training_outputs_retention!r}"
+            )
+        self.training_outputs_retention = training_outputs_retention
+        self.throughput_window = throughput_window
+        self.throughput = ThroughputMonitor(throughput_window)
+        if batches_per_epoch is not None and batches_per_epoch < 1:
+            raise MisconfigurationException(f'batches_per_epoch must be positive, got {batches_per_epoch}')
+        self.batches_per_epoch = batches_per_epoch
+        self.persistent_workers = persistent_workers
+        if auto_tune_dataloader not in (True, False, 'batch_size'):
+            raise MisconfigurationException(
+                f"auto_tune_dataloader can be True, False or 'batch_size', got {auto_tune_dataloader!r}"
+            )
+        self.auto_tune_dataloader = auto_tune_dataloader
+        if max_tokens_per_batch is not None and max_tokens_per_batch < 1:
+            raise MisconfigurationException(f'max_tokens_per_batch must be positive, got {max_tokens_per_batch}')
+        self.max_tokens_per_batch = max_tokens_per_batch
+        if async_checkpoints < 0:
+            raise MisconfigurationException(f'async_checkpoints must not be negative, got {async_checkpoints}')
+        self.async_checkpoints = async_checkpoints
+        if checkpoint_format not in ('torch', 'streaming', 'incremental'):
+            raise MisconfigurationException(
+                f"checkpoint_format can be 'torch', 'streaming' or 'incremental', got {checkpoint_format!r}"
+            )
+        self.checkpoint_format = checkpoint_format
+        self.checkpoint_writer = CheckpointWriter(max_pending=async_checkpoints, checkpoint_format=checkpoint_format)
 
         self.truncated_bptt_steps = truncated_bptt_steps
         self.resume_from_checkpoint = resume_from_checkpoint
@@ -342,19 +441,25 @@ class Trainer(
 
         # training bookeeping
         self.total_batch_idx = 0
-        self.running_loss = TensorRunningMean(window_length=20)
+        self.running_loss = TensorRunningAccum(window_length=20)
         self.batch_idx = 0
+        self.epoch_batches_done = 0
+        self.resume_batches = 0
+        self.train_sampler_seed = None
         self.tqdm_metrics = {}
         self.callback_metrics = {}
         self.num_val_batches = 0
         self.num_training_batches = 0
         self.num_test_batches = 0
         self.train_dataloader = None
+        self.train_batch_iterator = None
         self.test_dataloaders = None
         self.val_dataloaders = None
 
         # training state
         self.model = None
+        self._live_model_hooks = None
+        self._training_step_fn = None
         self.testing = False
         self.disable_validation = False
         self.lr_schedulers = []
@@ -403,6 +508,9 @@ class Trainer(
         self.single_gpu = False
         self.distributed_backend = distributed_backend
         self.set_distributed_mode(distributed_backend, self.num_nodes)
+        # hands the trained weights back from spawned processes
+        self.spawn_weights_queue = None
+        self.spawn_weights_received = None
 
         # override dist backend when using tpus
         if self.on_tpu:
@@ -502,6 +610,7 @@ class Trainer(
              ('max_epochs', (<class 'int'>,), 1000),
              ...
              ('precision', (<class 'int'>,), 32),
+             ('prefetch_batches', (<class 'int'>,), 0),
              ('print_nan_grads', (<class 'bool'>,), False),
              ('process_position', (<class 'int'>,), 0),
              ('profiler',
@@ -592,6 +701,8 @@ class Trainer(
         """
         ref_model = self.model if not self.data_parallel else self.model.module
 
+        # tensors collected since the last refresh are converted in one go
+        self.tqdm_metrics = self.metrics_to_scalars(self.tqdm_metrics)
         return dict(**ref_model.get_tqdm_dict(), **self.tqdm_metrics)
 
     @property
@@ -690,11 +801,12 @@ class Trainer(
                 # track for predict
                 self.model = model
 
-                # train
-                mp.spawn(self.ddp_train, nprocs=self.num_gpus, args=(model,))
+                # train, rank 0 hands the weights back through shared memory
+                self.init_spawn_weights_queue()
+                processes = mp.spawn(self.ddp_train, nprocs=self.num_gpus, args=(model,), join=False)
 
                 # load weights if not interrupted
-                self.load_spawn_weights(model)
+                self.load_spawn_weights(model, processes)
                 self.model = model
 
         # 1 gpu or dp option triggers training using DP module
@@ -714,11 +826,14 @@ class Trainer(
             # track for predict
             self.model = model
 
-            # train
-            xmp.spawn(self.tpu_train, args=(model,), nprocs=self.num_tpu_cores, start_method=start_method)
+            # train, rank 0 hands the weights back through shared memory
+            # a single core runs in this process, on the original model
+            self.init_spawn_weights_queue(start_method, in_process=self.num_tpu_cores == 1)
+            processes = xmp.spawn(self.tpu_train, args=(model,), nprocs=self.num_tpu_cores,
+                                  start_method=start_method, join=False)
 
             # load weights if not interrupted
-            self.load_spawn_weights(model)
+            self.load_spawn_weights(model, processes)
             self.model = model
 
         # ON CPU
@@ -777,6 +892,13 @@ class Trainer(
         # set local properties on the model
         self.copy_trainer_model_properties(ref_model)
 
+        # resolve the hooks called in the loops once instead of on every batch
+        self.resolve_model_hooks(ref_model)
+        self.resolve_callback_hooks()
+
+        # partition the parameters between the optimizers once, the training loop toggles them per step
+        self.partition_optimizer_params(ref_model)
+
         # log hyper-parameters
         if self.logger is not None:
             # save exp to get started
@@ -835,9 +957,9 @@ class Trainer(
                         total=self.num_sanity_val_steps * len(self.val_dataloaders),
                         leave=False, position=2 * self.process_position,
                         disable=not self.progress_bar_refresh_rate, dynamic_ncols=True)
-            self.main_progress_bar = pbar
+            self.main_progress_bar = ThrottledProgressBar(pbar, self.progress_bar_min_interval)
             # dummy validation progress bar
-            self.val_progress_bar = tqdm(disable=True)
+            self.val_progress_bar = ThrottledProgressBar(tqdm(disable=True), self.progress_bar_min_interval)
 
             eval_results = self._evaluate(model,
                                           self.val_dataloaders,
@@ -856,7 +978,7 @@ class Trainer(
         pbar = tqdm(leave=True, position=2 * self.process_position,
                     disable=not self.show_progress_bar, dynamic_ncols=True,
                     file=sys.stdout, smoothing=0)
-        self.main_progress_bar = pbar
+        self.main_progress_bar = ThrottledProgressBar(pbar, self.progress_bar_min_interval)
 
         # clear cache before training
         if self.on_gpu:
@@ -895,13 +1017,8 @@ class Trainer(
             self.model = model
             self.fit(model)
         elif self.use_ddp or self.use_tpu:  # pragma: no-cover
-            # attempt to load weights from a spawn
-            path = os.path.join(self.default_save_path, '__temp_weight_ddp_end.ckpt')
-            test_model = self.model
-            if os.path.exists(path):
-                test_model = self.load_spawn_weights(self.model)
-
-            self.fit(test_model)
+            # the weights trained in spawned processes were loaded into the model by fit
+            self.fit(self.model)
         else:
             self.run_evaluation(test_mode=True)
 
@@ -32,7 +32,10 @@ Restoring training session
 
 You might want to not only load a model but also continue training it. Use this method to
 restore the trainer state as well. This will continue from the epoch and global step you last left off.
-However, the dataloaders will start from the first batch again (if you shuffled it shouldn't matter).
+A checkpoint saved in the middle of an epoch (e.g. with `val_check_interval` or when SLURM preempts the job)
+continues that epoch at the batch after the last one trained on, in the same order: the train dataloader skips
+the earlier batches without loading them. With `persistent_workers` or `batches_per_epoch` the dataloaders
+start from the first batch again.
 
 Lightning will restore the session if you pass a logger with the same version and there's a saved checkpoint.
 
@@ -54,6 +57,7 @@ The trainer restores:
 
 - global_step
 - current_epoch
+- The position within the current epoch
 - All optimizers
 - All lr_schedulers
 - Model weights
@@ -97,11 +101,13 @@ import torch.distributed as torch_distrib
 
 from pytorch_lightning import _logger as log
 from pytorch_lightning.core.lightning import LightningModule
+from pytorch_lightning.core.saving import load_checkpoint
 from pytorch_lightning.loggers import LightningLoggerBase
 from pytorch_lightning.overrides.data_parallel import (
     LightningDistributedDataParallel,
     LightningDataParallel,
 )
+from pytorch_lightning.trainer.supporters import CheckpointWriter
 
 try:
     import torch_xla
@@ -133,6 +139,13 @@ class TrainerIOMixin(ABC):
     on_tpu: bool
     num_training_batches: int
     accumulate_grad_batches: int
+    epoch_batches_done: int
+    checkpoint_writer: CheckpointWriter
+    resume_batches: int
+    train_sampler_seed: ...
+    train_batch_iterator: ...
+    persistent_workers: bool
+    batches_per_epoch: ...
 
     def get_model(self):
         is_dp_module = isinstance(self.model, (LightningDistributedDataParallel,
@@ -202,6 +215,8 @@ class TrainerIOMixin(ABC):
             # save weights
             log.info('handling SIGUSR1')
             self.hpc_save(self.weights_save_path, self.logger)
+            # the job must not be requeued before the checkpoint is on disk
+            self.checkpoint_writer.wait()
 
             # find job id
             job_id = os.environ['SLURM_JOB_ID']
@@ -231,7 +246,8 @@ class TrainerIOMixin(ABC):
         """Saves a checkpoint atomically, avoiding the creation of incomplete checkpoints.
 
         This will create a temporary checkpoint with a suffix of ``.part``, then copy it to the final location once
-        saving is finished.
+        saving is finished. Hyperparameters which can't be pickled are left out. With ``async_checkpoints``
+        the checkpoint is written on a background thread.
 
         Args:
             checkpoint: The object to save.
@@ -240,22 +256,14 @@ class TrainerIOMixin(ABC):
             filepath: The path to which the checkpoint will be saved.
                 This points to the file that the checkpoint will be stored in.
         """
-        tmp_path = str(filepath) + ".part"
-        torch.save(checkpoint, tmp_path)
-        os.replace(tmp_path, filepath)
+        self.checkpoint_writer.save(checkpoint, filepath)
 
     def save_checkpoint(self, filepath):
         checkpoint = self.dump_checkpoint()
 
         if self.proc_rank == 0:
-            # do the actual save
-            try:
-                self._atomic_save(checkpoint, filepath)
-            except AttributeError:
-                if 'hparams' in checkpoint:
-                    del checkpoint['hparams']
-
-                self._atomic_save(checkpoint, filepath)
+            # do the actual save, in the background with `async_checkpoints`
+            self._atomic_save(checkpoint, filepath)
 
     def restore(self, checkpoint_path: str, on_gpu: bool):
         """
@@ -271,7 +279,7 @@ class TrainerIOMixin(ABC):
         #     checkpoint = torch.load(checkpoint_path)
         # else:
         # load on CPU first
-        checkpoint = torch.load(checkpoint_path, map_location=lambda storage, loc: storage)
+        checkpoint = load_checkpoint(checkpoint_path)
 
         # load model state
         model = self.get_model()
@@ -290,6 +298,16 @@ class TrainerIOMixin(ABC):
             'global_step': self.global_step + 1,
         }
 
+        # in the middle of an epoch, keep where to continue it
+        # virtual epochs and persistent workers don't restart the dataloader per epoch
+        resumable = self.train_batch_iterator is None and not self.persistent_workers
+        if resumable and 0 < self.epoch_batches_done < self.num_training_batches:
+            checkpoint['epoch_progress'] = {
+                'epoch': self.current_epoch,
+                'batches_done': self.epoch_batches_done,
+                'sampler_seed': self.train_sampler_seed,
+            }
+
         if self.checkpoint_callback is not None and self.checkpoint_callback is not False:
             checkpoint['checkpoint_callback_best'] = self.checkpoint_callback.best
 
@@ -367,11 +385,18 @@ class TrainerIOMixin(ABC):
         self.global_step = checkpoint['global_step']
         self.current_epoch = checkpoint['epoch']
 
+        # continue the epoch the checkpoint was saved in, after the batches already trained on
+        epoch_progress = checkpoint.get('epoch_progress')
+        if epoch_progress is not None and self.batches_per_epoch is None and not self.persistent_workers:
+            self.current_epoch = epoch_progress['epoch']
+            self.resume_batches = epoch_progress['batches_done']
+            self.train_sampler_seed = epoch_progress['sampler_seed']
+
         # Division deals with global step stepping once per accumulated batch
         # Inequality deals with different global step for odd vs even num_training_batches
         n_accum = 1 if self.accumulate_grad_batches is None else self.accumulate_grad_batches
         expected_steps = self.num_training_batches / n_accum
-        if self.num_training_batches != 0 and self.global_step % expected_steps > 1:
+        if not self.resume_batches and self.num_training_batches != 0 and self.global_step % expected_steps > 1:
             warnings.warn(
                 "You're resuming from a checkpoint that ended mid-epoch. "
                 "This can cause unreliable results if further training is done, "
@@ -420,13 +445,7 @@ class TrainerIOMixin(ABC):
 
         # do the actual save
         # TODO: fix for anything with multiprocess DP, DDP, DDP2
-        try:
-            self._atomic_save(checkpoint, filepath)
-        except AttributeError:
-            if 'hparams' in checkpoint:
-                del checkpoint['hparams']
-
-            self._atomic_save(checkpoint, filepath)
+        self._atomic_save(checkpoint, filepath)
 
         return filepath
 
@@ -434,7 +453,7 @@ class TrainerIOMixin(ABC):
         filepath = '{}/hpc_ckpt_{}.ckpt'.format(folderpath, self.max_ckpt_in_folder(folderpath))
 
         # load on CPU first
-        checkpoint = torch.load(filepath, map_location=lambda storage, loc: storage)
+        checkpoint = load_checkpoint(filepath)
 
         # load model state
         model = self.get_model()
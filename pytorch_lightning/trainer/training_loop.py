@@ -63,6 +63,9 @@ Looking at grad norms can help you figure out where training might be going wron
     # track the LP norm (P=2 here)
     trainer = Trainer(track_grad_norm=2)
 
+    # track one norm per top-level module instead of per parameter
+    trainer = Trainer(track_grad_norm=2, grad_norm_group_depth=1)
+
 Set how much of the training set to check
 -----------------------------------------
 
@@ -135,10 +138,11 @@ in your model.
 import copy
 import warnings
 from abc import ABC, abstractmethod
-from typing import Callable
+from typing import Callable, Optional
 from typing import Union, List
 
 import numpy as np
+import torch
 from torch.utils.data import DataLoader
 
 from pytorch_lightning import _logger as log
@@ -147,7 +151,7 @@ from pytorch_lightning.core.lightning import LightningModule
 from pytorch_lightning.loggers import LightningLoggerBase
 from pytorch_lightning.overrides.data_parallel import LightningDistributedDataParallel, LightningDataParallel
 from pytorch_lightning.utilities.exceptions import MisconfigurationException
-from pytorch_lightning.trainer.supporters import TensorRunningMean
+from pytorch_lightning.trainer.supporters import TensorRunningAccum, BatchPrefetcher, ThroughputMonitor
 
 try:
     from apex import amp
@@ -175,6 +179,7 @@ class TrainerTrainLoopMixin(ABC):
     use_dp: bool
     use_ddp2: bool
     single_gpu: bool
+    on_gpu: bool
     use_tpu: bool
     data_parallel_device_ids: ...
     check_val_every_n_epoch: ...
@@ -189,6 +194,14 @@ class TrainerTrainLoopMixin(ABC):
     enable_early_stop: ...
     early_stop_callback: ...
     callback_metrics: ...
+    _training_step_takes_optimizer_idx: bool
+    _training_step_fn: ...
+    nan_check_interval: int
+    training_outputs_retention: ...
+    throughput_window: int
+    throughput: ThroughputMonitor
+    batches_per_epoch: ...
+    train_batch_iterator: ...
     logger: Union[LightningLoggerBase, bool]
     global_step: int
     testing: bool
@@ -201,6 +214,7 @@ class TrainerTrainLoopMixin(ABC):
     optimizer_frequencies: ...
     accumulate_grad_batches: int
     track_grad_norm: ...
+    grad_norm_group_depth: ...
     model: LightningModule
     interrupted: bool
     running_loss: ...
@@ -216,6 +230,9 @@ class TrainerTrainLoopMixin(ABC):
     min_steps: int
     total_batch_idx: int
     checkpoint_callback: ...
+    resume_batches: int
+    epoch_batches_done: int
+    checkpoint_writer: ...
 
     # Callback system
     callbacks: List[Callback]
@@ -248,7 +265,7 @@ class TrainerTrainLoopMixin(ABC):
         """Warning: this is just empty shell for code implemented in other class."""
 
     @abstractmethod
-    def clip_gradients(self):
+    def clip_gradients(self, *args):
         """Warning: this is just empty shell for code implemented in other class."""
 
     @abstractmethod
@@ -263,6 +280,10 @@ class TrainerTrainLoopMixin(ABC):
     def add_tqdm_metrics(self, *args):
         """Warning: this is just empty shell for code implemented in other class."""
 
+    @abstractmethod
+    def add_callback_metrics(self, *args):
+        """Warning: this is just empty shell for code implemented in other class."""
+
     @abstractmethod
     def log_metrics(self, *args):
         """Warning: this is just empty shell for code implemented in other class."""
@@ -280,7 +301,23 @@ class TrainerTrainLoopMixin(ABC):
         """Warning: this is just empty shell for code implemented in other class."""
 
     @abstractmethod
-    def has_arg(self, *args):
+    def is_hook_live(self, *args):
+        """Warning: this is just empty shell for code implemented in other class."""
+
+    @abstractmethod
+    def prefetch_dataloader(self, *args):
+        """Warning: this is just empty shell for code implemented in other class."""
+
+    @abstractmethod
+    def toggle_optimizer_params(self, *args):
+        """Warning: this is just empty shell for code implemented in other class."""
+
+    @abstractmethod
+    def shutdown_persistent_workers(self, *args):
+        """Warning: this is just empty shell for code implemented in other class."""
+
+    @abstractmethod
+    def fast_forward_train_dataloader(self, *args):
         """Warning: this is just empty shell for code implemented in other class."""
 
     def train(self):
@@ -290,6 +327,10 @@ class TrainerTrainLoopMixin(ABC):
         # get model
         model = self.get_model()
 
+        # specialize the training step for this fit
+        self._training_step_fn = self.build_training_step()
+        self.throughput.reset()
+
         # load data
         # if reload_dataloaders_every_epoch, this is moved to the epoch loop
         if not self.reload_dataloaders_every_epoch:
@@ -312,10 +353,16 @@ class TrainerTrainLoopMixin(ABC):
                 # reset train dataloader
                 if self.reload_dataloaders_every_epoch:
                     self.reset_train_dataloader(model)
-                # set seed for distributed sampler (enables shuffling for each epoch)
-                if self.use_ddp \
-                        and hasattr(self.train_dataloader.sampler, 'set_epoch'):
+                # set seed for distributed and seeded random samplers (enables shuffling for each epoch)
+                # virtual epochs set it whenever they start a new pass over the data instead
+                # and dataloaders keeping their workers alive set it on every pass themselves
+                if self.train_batch_iterator is None \
+                        and hasattr(getattr(self.train_dataloader, 'sampler', None), 'set_epoch'):
                     self.train_dataloader.sampler.set_epoch(epoch)
+                # reshuffle batch samplers like the `BucketBatchSampler`
+                if self.train_batch_iterator is None \
+                        and hasattr(getattr(self.train_dataloader, 'batch_sampler', None), 'set_epoch'):
+                    self.train_dataloader.batch_sampler.set_epoch(epoch)
 
                 # update training progress in trainer and model
                 model.current_epoch = epoch
@@ -337,7 +384,7 @@ class TrainerTrainLoopMixin(ABC):
                 self.accumulation_scheduler.on_epoch_start(self, self.get_model())
 
                 # stores accumulated grad fractions per batch
-                self.batch_loss_value = TensorRunningMean(
+                self.batch_loss_value = TensorRunningAccum(
                     window_length=self.accumulate_grad_batches
                 )
 
@@ -401,29 +448,58 @@ class TrainerTrainLoopMixin(ABC):
             self.on_epoch_start()
 
             # model hooks
-            if self.is_function_implemented('on_epoch_start'):
+            if self.is_hook_live('on_epoch_start'):
                 model.on_epoch_start()
 
+        # a resumed epoch continues after the batches trained on before the checkpoint
+        start_batch_idx = 0
+        if self.resume_batches:
+            start_batch_idx = self.fast_forward_train_dataloader(self.resume_batches)
+            self.resume_batches = 0
+            self.main_progress_bar.update(start_batch_idx)
+        self.epoch_batches_done = start_batch_idx
+
         # track local dataloader so TPU can wrap each epoch
         train_dataloader = self.train_dataloader
 
+        # virtual epochs continue where the last one stopped instead of restarting the dataloader
+        if self.train_batch_iterator is not None:
+            train_dataloader = self.train_batch_iterator.take(self.num_training_batches)
+
         # on TPU we have to wrap it under the ParallelLoader
         if self.use_tpu:
             device = xm.xla_device()
             train_dataloader = xla_pl.ParallelLoader(train_dataloader, [device])
             train_dataloader = train_dataloader.per_device_loader(device)
 
-        # bookkeeping
-        outputs = []
+        # load (and transfer) the next batches while the current one is trained on, the batches loaded
+        # ahead when the epoch ends early are used by the next virtual epoch
+        put_back = None
+        if self.train_batch_iterator is not None:
+            put_back = self.train_batch_iterator.put_back
+        train_dataloader = self.prefetch_dataloader(train_dataloader, put_back=put_back)
+
+        # bookkeeping, outputs are only kept when the model uses them at the epoch end
+        accumulate_outputs = self.is_overriden('training_epoch_accumulate', model=model)
+        keep_outputs = self.is_overriden('training_epoch_end', model=model)
+        outputs = None if accumulate_outputs else []
+        # the GPUs the kept outputs are being copied from
+        offload_devices = set()
 
         # run epoch
+        measure_throughput = self.throughput_window > 0
+        if measure_throughput:
+            self.throughput.start_step()
         for batch_idx, (batch, is_last_batch) in self.profiler.profile_iterable(
-            enumerate(_with_is_last(train_dataloader)), "get_train_batch"
+            enumerate(_with_is_last(train_dataloader), start_batch_idx), "get_train_batch"
         ):
             # stop epoch if we limited the number of training batches
             if batch_idx >= self.num_training_batches:
                 break
 
+            if measure_throughput:
+                self.throughput.batch_ready()
+
             self.batch_idx = batch_idx
 
             model.global_step = self.global_step
@@ -433,8 +509,14 @@ class TrainerTrainLoopMixin(ABC):
             # ---------------
             _outputs = self.run_training_batch(batch, batch_idx)
             batch_result, grad_norm_dic, batch_step_metrics, batch_output = _outputs
-            # detach tensors in batch_output before appending to outputs
-            outputs.append(_recursive_detach(batch_output))
+            self.epoch_batches_done = batch_idx + 1
+            if measure_throughput:
+                self.throughput.end_step(_batch_size(batch))
+            # detach tensors in batch_output before folding them into outputs
+            if accumulate_outputs:
+                outputs = model.training_epoch_accumulate(outputs, _recursive_detach(batch_output))
+            elif keep_outputs:
+                outputs.append(self.retain_training_output(batch_output, offload_devices))
 
             # when returning -1 from train_step, we end epoch early
             early_stop_epoch = batch_result == -1
@@ -465,6 +547,8 @@ class TrainerTrainLoopMixin(ABC):
             # when metrics should be logged
             should_log_metrics = batch_idx % self.row_log_interval == 0 or early_stop_epoch
             if should_log_metrics or self.fast_dev_run:
+                if measure_throughput:
+                    batch_step_metrics = {**batch_step_metrics, **self.throughput.metrics()}
                 # logs user requested information to logger
                 self.log_metrics(batch_step_metrics, grad_norm_dic)
 
@@ -483,6 +567,10 @@ class TrainerTrainLoopMixin(ABC):
                 self.global_step += 1
             self.total_batch_idx += 1
 
+            # validation, checkpointing and logging are not part of the next step
+            if measure_throughput:
+                self.throughput.start_step()
+
             # max steps reached, end training
             if self.max_steps is not None and self.max_steps == self.global_step:
                 break
@@ -493,17 +581,30 @@ class TrainerTrainLoopMixin(ABC):
             if early_stop_epoch or self.fast_dev_run:
                 break
 
+        # release the prefetching thread when the epoch was cut short
+        if isinstance(train_dataloader, BatchPrefetcher):
+            train_dataloader.close()
+
+        # checkpoints from now on resume at the next epoch
+        self.epoch_batches_done = 0
+
+        # show the iterations held back by the progress bar
+        self.main_progress_bar.flush()
+
         # process epoch outputs
         if isinstance(model, (LightningDistributedDataParallel, LightningDataParallel)):
             model = model.module
 
-        if self.is_overriden('training_epoch_end', model=model):
+        if keep_outputs:
+            # outputs offloaded to the CPU can only be read once their copies are done
+            for device in offload_devices:
+                torch.cuda.synchronize(device)
             epoch_output = model.training_epoch_end(outputs)
             _processed_outputs = self.process_output(epoch_output)
             log_epoch_metrics = _processed_outputs[2]
             callback_epoch_metrics = _processed_outputs[3]
             self.log_metrics(log_epoch_metrics, {})
-            self.callback_metrics.update(callback_epoch_metrics)
+            self.add_callback_metrics(callback_epoch_metrics)
 
         # in case validation step is missing and you are not running fast-dev to duplicate last batch
         if not self.is_overriden('validation_step') and not (self.fast_dev_run or should_check_val):
@@ -517,9 +618,17 @@ class TrainerTrainLoopMixin(ABC):
             # callbacks
             self.on_epoch_end()
             # model hooks
-            if self.is_function_implemented('on_epoch_end'):
+            if self.is_hook_live('on_epoch_end'):
                 model.on_epoch_end()
 
+    def retain_training_output(self, batch_output: dict, devices: Optional[set] = None) -> dict:
+        """Detaches the output of a training step to keep it for ``training_epoch_end``,
+        following the ``training_outputs_retention`` policy. The GPUs copied from are added to ``devices``."""
+        retention = self.training_outputs_retention
+        if isinstance(retention, (list, tuple)):
+            batch_output = {k: v for k, v in batch_output.items() if k in retention}
+        return _recursive_detach(batch_output, to_cpu=retention == 'cpu', devices=devices)
+
     def run_training_batch(self, batch, batch_idx):
         # track grad norms
         grad_norm_dic = {}
@@ -538,7 +647,7 @@ class TrainerTrainLoopMixin(ABC):
             # callbacks
             self.on_batch_start()
             # hooks
-            if self.is_function_implemented('on_batch_start'):
+            if self.is_hook_live('on_batch_start'):
                 response = self.get_model().on_batch_start(batch)
                 if response == -1:
                     return -1, grad_norm_dic, {}
@@ -557,23 +666,22 @@ class TrainerTrainLoopMixin(ABC):
                 # make sure only the gradients of the current optimizer's paramaters are calculated
                 # in the training step to prevent dangling gradients in multiple-optimizer setup.
                 if len(self.optimizers) > 1:
-                    for param in self.get_model().parameters():
-                        param.requires_grad = False
-                    for group in optimizer.param_groups:
-                        for param in group['params']:
-                            param.requires_grad = True
+                    self.toggle_optimizer_params(opt_idx)
+
+                # the hiddens this split starts from, re-evaluations of the closure start from them too
+                split_hiddens = self.hiddens
 
                 # wrap the forward step in a closure so second order methods work
-                def optimizer_closure():
+                def optimizer_closure(reevaluate=False):
                     # forward pass
-                    with self.profiler.profile('model_forward'):
+                    with self.profiler.profile('model_forward'), self.throughput.record('forward'):
                         output_dict = self.training_forward(
-                            split_batch, batch_idx, opt_idx, self.hiddens)
+                            split_batch, batch_idx, opt_idx, split_hiddens)
 
                         # format and reduce outputs accordingly
                         processed_output = self.process_output(output_dict, train=True)
 
-                    closure_loss, progress_bar_metrics, log_metrics, callback_metrics, self.hiddens = processed_output
+                    closure_loss, progress_bar_metrics, log_metrics, callback_metrics, hiddens = processed_output
 
                     # accumulate loss
                     # (if accumulate_grad_batches = 1 no effect)
@@ -581,9 +689,15 @@ class TrainerTrainLoopMixin(ABC):
 
                     # backward pass
                     model_ref = self.get_model()
-                    with self.profiler.profile('model_backward'):
+                    with self.profiler.profile('model_backward'), self.throughput.record('backward'):
                         model_ref.backward(self, closure_loss, optimizer, opt_idx)
 
+                    # the optimizer only needs the loss and gradients of a re-evaluation
+                    if reevaluate:
+                        return closure_loss, output_dict
+
+                    self.hiddens = hiddens
+
                     # track metrics for callbacks
                     all_callback_metrics.append(callback_metrics)
 
@@ -592,7 +706,7 @@ class TrainerTrainLoopMixin(ABC):
                     all_log_metrics.append(log_metrics)
 
                     # insert after step hook
-                    if self.is_function_implemented('on_after_backward'):
+                    if self.is_hook_live('on_after_backward'):
                         model_ref = self.get_model()
                         with self.profiler.profile('on_after_backward'):
                             model_ref.on_after_backward()
@@ -603,7 +717,8 @@ class TrainerTrainLoopMixin(ABC):
                 loss, batch_output = optimizer_closure()
 
                 # check if loss or model weights are nan
-                self.detect_nan_tensors(loss)
+                if self.nan_check_interval > 0 and self.total_batch_idx % self.nan_check_interval == 0:
+                    self.detect_nan_tensors(loss)
 
                 # track total loss for logging (avoid mem leaks)
                 self.batch_loss_value.append(loss)
@@ -616,18 +731,20 @@ class TrainerTrainLoopMixin(ABC):
                         if self.track_grad_norm > 0:
                             model = self.get_model()
                             grad_norm_dic = model.grad_norm(
-                                self.track_grad_norm)
+                                self.track_grad_norm, self.grad_norm_group_depth)
 
-                    # clip gradients
-                    self.clip_gradients()
+                    # clip gradients, with multiple optimizers only those of the current one
+                    self.clip_gradients(optimizer if len(self.optimizers) > 1 else None)
 
                     # calls .step(), .zero_grad()
                     # override function to modify this behavior
                     model = self.get_model()
-                    with self.profiler.profile('optimizer_step'):
+                    with self.profiler.profile('optimizer_step'), self.throughput.record('optimizer'):
+                        # the first closure call returns the loss computed above, only optimizers
+                        # evaluating it again (e.g. LBFGS line searches) run the step again
                         model.optimizer_step(self.current_epoch, batch_idx,
                                              optimizer, opt_idx,
-                                             lambda: optimizer_closure()[0])
+                                             _cache_first_call(loss, lambda: optimizer_closure(reevaluate=True)[0]))
 
                     # calculate running loss for display
                     self.running_loss.append(self.batch_loss_value.mean())
@@ -640,19 +757,19 @@ class TrainerTrainLoopMixin(ABC):
             # callbacks
             self.on_batch_end()
             # model hooks
-            if self.is_function_implemented('on_batch_end'):
+            if self.is_hook_live('on_batch_end'):
                 self.get_model().on_batch_end()
 
         # update progress bar
+        # the metrics are only read when the bar refreshes
         if self.progress_bar_refresh_rate >= 1 and batch_idx % self.progress_bar_refresh_rate == 0:
-            self.main_progress_bar.update(self.progress_bar_refresh_rate)
-            self.main_progress_bar.set_postfix(**self.training_tqdm_dict)
+            self.main_progress_bar.update(self.progress_bar_refresh_rate, postfix=lambda: self.training_tqdm_dict)
 
         # collapse all metrics into one dict
         all_log_metrics = {k: v for d in all_log_metrics for k, v in d.items()}
 
         # track all metrics for callbacks
-        self.callback_metrics.update({k: v for d in all_callback_metrics for k, v in d.items()})
+        self.add_callback_metrics({k: v for d in all_callback_metrics for k, v in d.items()})
 
         return 0, grad_norm_dic, all_log_metrics, batch_output
 
@@ -672,6 +789,11 @@ class TrainerTrainLoopMixin(ABC):
     def run_training_teardown(self):
         self.main_progress_bar.close()
 
+        # release the dataloader iterator kept across virtual epochs
+        if self.train_batch_iterator is not None:
+            self.train_batch_iterator.close()
+        self.shutdown_persistent_workers()
+
         # Train end events
         with self.profiler.profile('on_train_end'):
             # callbacks
@@ -680,72 +802,97 @@ class TrainerTrainLoopMixin(ABC):
             if self.is_function_implemented('on_train_end'):
                 self.get_model().on_train_end()
 
+        # the last checkpoints are written when fit returns
+        self.checkpoint_writer.wait()
+
         if self.logger is not None:
             self.logger.finalize("success")
 
         # summarize profile results
         self.profiler.describe()
 
-    def training_forward(self, batch, batch_idx, opt_idx, hiddens):
-        """
-        Handle forward for each training case (distributed, single gpu, etc...)
-        :param batch:
-        :param batch_idx:
-        :return:
-        """
-        # ---------------
-        # FORWARD
-        # ---------------
-        # enable not needing to add opt_idx to training_step
-        args = [batch, batch_idx]
-
-        if len(self.optimizers) > 1:
-            if self.has_arg('training_step', 'optimizer_idx'):
-                args.append(opt_idx)
-            else:
-                num_opts = len(self.optimizers)
-                raise ValueError(
-                    f'Your LightningModule defines {num_opts} optimizers but '
-                    f'training_step is missing the "optimizer_idx" argument.'
-                )
+    def build_training_step(self) -> Callable:
+        """Builds the forward of a training step for the active configuration.
 
-        # pass hiddens if using tbptt
-        if self.truncated_bptt_steps is not None:
-            args.append(hiddens)
+        Done once per fit, so the device mode, the number of optimizers and tbptt
+        are not dispatched on again for every batch.
+        """
+        pass_optimizer_idx = len(self.optimizers) > 1
+        if pass_optimizer_idx and not self._training_step_takes_optimizer_idx:
+            num_opts = len(self.optimizers)
+            raise ValueError(
+                f'Your LightningModule defines {num_opts} optimizers but '
+                f'training_step is missing the "optimizer_idx" argument.'
+            )
+        pass_hiddens = self.truncated_bptt_steps is not None
 
         # distributed forward
         if self.use_ddp or self.use_ddp2 or self.use_dp:
-            output = self.model(*args)
+            forward = self.model
 
         # single GPU forward
         elif self.single_gpu:
             gpu_id = 0
             if isinstance(self.data_parallel_device_ids, list):
                 gpu_id = self.data_parallel_device_ids[0]
-            batch = self.transfer_batch_to_gpu(copy.copy(batch), gpu_id)
-            args[0] = batch
-            output = self.model.training_step(*args)
+            training_step = self.model.training_step
+
+            def forward(batch, *args):
+                batch = self.transfer_batch_to_gpu(copy.copy(batch), gpu_id)
+                return training_step(batch, *args)
 
         # TPU support
         elif self.use_tpu:
-            batch = self.transfer_batch_to_tpu(copy.copy(batch))
-            args[0] = batch
-            output = self.model.training_step(*args)
+            training_step = self.model.training_step
+
+            def forward(batch, *args):
+                batch = self.transfer_batch_to_tpu(copy.copy(batch))
+                return training_step(batch, *args)
 
         # CPU forward
         else:
-            output = self.model.training_step(*args)
+            forward = self.model.training_step
+
+        # enable not needing to add opt_idx to training_step
+        if pass_optimizer_idx and pass_hiddens:
+            def training_step_fn(batch, batch_idx, opt_idx, hiddens):
+                return forward(batch, batch_idx, opt_idx, hiddens)
+        elif pass_optimizer_idx:
+            def training_step_fn(batch, batch_idx, opt_idx, hiddens):
+                return forward(batch, batch_idx, opt_idx)
+        elif pass_hiddens:
+            def training_step_fn(batch, batch_idx, opt_idx, hiddens):
+                return forward(batch, batch_idx, hiddens)
+        else:
+            def training_step_fn(batch, batch_idx, opt_idx, hiddens):
+                return forward(batch, batch_idx)
+
+        return training_step_fn
+
+    def training_forward(self, batch, batch_idx, opt_idx, hiddens):
+        """
+        Handle forward for each training case (distributed, single gpu, etc...)
+        :param batch:
+        :param batch_idx:
+        :return:
+        """
+        # ---------------
+        # FORWARD
+        # ---------------
+        if self._training_step_fn is None:
+            self._training_step_fn = self.build_training_step()
+        output = self._training_step_fn(batch, batch_idx, opt_idx, hiddens)
 
         # allow any mode to define training_step_end
         # do something will all the dp outputs (like softmax)
-        if self.is_overriden('training_step_end'):
+        if self.is_hook_live('training_step_end'):
             model_ref = self.get_model()
             with self.profiler.profile('training_step_end'):
                 output = model_ref.training_step_end(output)
 
         # allow any mode to define training_end
         # TODO: remove in 1.0.0
-        if self.is_overriden('training_end'):
+        if self.is_hook_live('training_end'):
             model_ref = self.get_model()
             with self.profiler.profile('training_end'):
                 output = model_ref.training_end(output)
@@ -804,27 +951,79 @@ def _with_is_last(iterable):
     yield last, True
 
 
-def _recursive_detach(in_dict):
-    """Detach all tensors in `in_dict`.
+def _batch_size(batch, default: Optional[int] = 1) -> Optional[int]:
+    """Returns the size of the first dimension of the first tensor found in the batch.
 
-    May operate recursively if some of the values in `in_dict` are dictionaries
-    which contain instances of `torch.Tensor`. Other types in `in_dict` are
-    not affected by this utility function.
+    Examples:
+        >>> _batch_size({'x': [torch.zeros(4, 3)], 'y': torch.zeros(4)})
+        4
+        >>> _batch_size('no tensors')
+        1
+    """
+    if isinstance(batch, torch.Tensor):
+        return batch.size(0) if batch.dim() else 1
+    values = batch.values() if isinstance(batch, dict) else batch if isinstance(batch, (list, tuple)) else ()
+    for value in values:
+        size = _batch_size(value, default=None)
+        if size is not None:
+            return size
+    return default
+
+
+def _cache_first_call(first_result, fn: Callable) -> Callable:
+    """Returns a closure which returns ``first_result`` on its first call and calls ``fn`` on later calls.
+
+    Examples:
+        >>> closure = _cache_first_call('cached', lambda: 'computed')
+        >>> closure(), closure()
+        ('cached', 'computed')
+    """
+    cache = [first_result]
+
+    def closure():
+        if cache:
+            return cache.pop()
+        return fn()
+
+    return closure
+
+
+def _recursive_detach(value, to_cpu: bool = False, devices: Optional[set] = None):
+    """Detach all tensors in `value` in a single pass.
+
+    Operates recursively on dictionaries, lists and tuples which contain
+    instances of `torch.Tensor`. Other types in `value` are not affected
+    by this utility function.
 
     Parameters
     ----------
-    in_dict : dict
+    value : dict, list, tuple or tensor
+    to_cpu : bool
+        also copy CUDA tensors to the CPU, without waiting for the copies to finish
+    devices : set, optional
+        the GPUs copied from are added to it, they have to be synchronized before the copies are read
 
     Returns
     -------
-    out_dict : dict
+    out : same structure as `value`
+
+    Examples
+    --------
+    >>> x = torch.ones(2, requires_grad=True) * 2
+    >>> out = _recursive_detach({'loss': x, 'extra': [x, (x, 'text')]})
+    >>> out['loss'].requires_grad, out['extra'][1][0].requires_grad, out['extra'][1][1]
+    (False, False, 'text')
     """
-    out_dict = {}
-    for k, v in in_dict.items():
-        if isinstance(v, dict):
-            out_dict.update({k: _recursive_detach(v)})
-        elif callable(getattr(v, 'detach', None)):
-            out_dict.update({k: v.detach()})
-        else:
-            out_dict.update({k: v})
-    return out_dict
+    if isinstance(value, dict):
+        return {k: _recursive_detach(v, to_cpu, devices) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        values = [_recursive_detach(v, to_cpu, devices) for v in value]
+        # namedtuples take their fields as arguments
+        return type(value)(*values) if hasattr(value, '_fields') else type(value)(values)
+    if callable(getattr(value, 'detach', None)):
+        value = value.detach()
+        if to_cpu and getattr(value, 'is_cuda', False):
+            if devices is not None:
+                devices.add(value.device)
+            value = value.to('cpu', non_blocking=True)
+    return value
@@ -1,9 +1,11 @@
 import math
 import sys
 from abc import ABC, abstractmethod
+from typing import List, Optional
 
 import torch
 from torch import Tensor
+from torch.optim.optimizer import Optimizer
 
 from pytorch_lightning import _logger as log
 from pytorch_lightning.callbacks import GradientAccumulationScheduler
@@ -17,36 +19,47 @@ class TrainerTrainingTricksMixin(ABC):
     # this is just a summary on variables used in this abstract class,
     #  the proper values/initialisation should be done in child class
     gradient_clip_val: ...
+    gradient_clip_algorithm: str
     precision: ...
 
     @abstractmethod
     def get_model(self):
         """Warning: this is just empty shell for code implemented in other class."""
 
-    def clip_gradients(self):
-        # this code is a modification of torch.nn.utils.clip_grad_norm_
-        # with TPU support based on https://github.com/pytorch/xla/blob/master/TROUBLESHOOTING.md
-        if self.gradient_clip_val > 0:
-            model = self.get_model()
-            parameters = model.parameters()
-            max_norm = float(self.gradient_clip_val)
-            norm_type = float(2.0)
-            if isinstance(parameters, torch.Tensor):
-                parameters = [parameters]
-            parameters = list(filter(lambda p: p.grad is not None, parameters))
-            if norm_type == math.inf:
-                total_norm = max(p.grad.data.abs().max() for p in parameters)
-            else:
-                device = parameters[0].device
-                total_norm = torch.zeros([], device=device if parameters else None)
-                for p in parameters:
-                    param_norm = p.grad.data.norm(norm_type) ** norm_type
-                total_norm.add_(param_norm)
-                total_norm = (total_norm ** (1. / norm_type))
-            eps = EPSILON_FP16 if self.precision == 16 else EPSILON
-            clip_coef = torch.tensor(max_norm, device=device) / (total_norm + eps)
-            for p in parameters:
-                p.grad.data.mul_(torch.where(clip_coef < 1, clip_coef, torch.tensor(1., device=device)))
+    def clip_gradients(self, optimizer: Optional[Optimizer] = None):
+        """Clips the gradients of the model, or only those of ``optimizer``'s parameters if given.
+
+        The gradients are grouped by device and dtype, each group is reduced and scaled (or clamped)
+        with fused multi-tensor ops where PyTorch has them, and the scaling needs no host sync
+        (which also keeps TPUs happy).
+        """
+        if self.gradient_clip_val <= 0:
+            return
+
+        if optimizer is not None:
+            parameters = [p for group in optimizer.param_groups for p in group['params']]
+        else:
+            parameters = self.get_model().parameters()
+        grads = [p.grad.data for p in parameters if p.grad is not None]
+        if not grads:
+            return
+
+        groups = _group_by_device_and_dtype(grads)
+        if self.gradient_clip_algorithm == 'value':
+            clip_value = float(self.gradient_clip_val)
+            for group in groups:
+                _foreach_clamp_(group, -clip_value, clip_value)
+            return
+
+        max_norm = float(self.gradient_clip_val)
+        device = grads[0].device
+        group_norms = [_group_norm(group, 2.).to(device, torch.float32) for group in groups]
+        total_norm = torch.stack(group_norms).norm(2.)
+
+        eps = EPSILON_FP16 if self.precision == 16 else EPSILON
+        clip_coef = (max_norm / (total_norm + eps)).clamp(max=1.0)
+        for group in groups:
+            _foreach_mul_(group, clip_coef.to(group[0].device, group[0].dtype))
 
     def print_nan_gradients(self) -> None:
         model = self.get_model()
@@ -57,6 +70,11 @@ class TrainerTrainingTricksMixin(ABC):
     def detect_nan_tensors(self, loss: Tensor) -> None:
         model = self.get_model()
 
+        # everything is checked at once with a single sync, the slow search for the offending
+        # tensor below only runs when there is a nan or inf
+        if _all_finite([loss] + list(model.parameters())):
+            return
+
         # check if loss is nan
         if not torch.isfinite(loss).all():
             raise ValueError(
@@ -79,3 +97,60 @@ class TrainerTrainingTricksMixin(ABC):
             self.accumulation_scheduler = GradientAccumulationScheduler(schedule)
         else:
             raise TypeError("Gradient accumulation supports only int and dict types")
+
+
+def _all_finite(tensors: List[Tensor]) -> bool:
+    """Checks that all tensors are finite with one fused reduction per device and dtype and a single sync.
+
+    The largest absolute value of each tensor is nan or inf exactly when the tensor has a nan or inf,
+    unlike a sum or a 2-norm it can't overflow for large finite values.
+    """
+    tensors = [tensor for tensor in tensors if tensor.numel() > 0]
+    if not tensors:
+        return True
+
+    device = tensors[0].device
+    finite = []
+    with torch.no_grad():
+        for group in _group_by_device_and_dtype(tensors):
+            finite.append(torch.isfinite(_group_norm(group, math.inf)).to(device))
+        return bool(torch.stack(finite).all())
+
+
+def _group_by_device_and_dtype(tensors: List[Tensor]) -> List[List[Tensor]]:
+    groups = {}
+    for tensor in tensors:
+        groups.setdefault((tensor.device, tensor.dtype), []).append(tensor)
+    return list(groups.values())
+
+
+def _group_norm(tensors: List[Tensor], norm_type: float) -> Tensor:
+    """Computes the norm of all tensors of a device and dtype group together, in one fused reduction
+    where PyTorch supports it and by concatenating the tensors otherwise."""
+    if hasattr(torch, '_foreach_norm'):
+        values = torch.stack(torch._foreach_norm(tensors, norm_type))
+    else:
+        values = torch.cat([tensor.reshape(-1) for tensor in tensors])
+    if norm_type != math.inf:
+        # the sum of squares is taken in at least float32, half precision overflows easily
+        values = values.to(torch.promote_types(values.dtype, torch.float32))
+    return values.norm(norm_type)
+
+
+def _foreach_clamp_(tensors: List[Tensor], min_value: float, max_value: float) -> None:
+    """Clamps all tensors in place to [``min_value``, ``max_value``], fused where PyTorch supports it."""
+    if hasattr(torch, '_foreach_clamp_min_') and hasattr(torch, '_foreach_clamp_max_'):
+        torch._foreach_clamp_min_(tensors, min_value)
+        torch._foreach_clamp_max_(tensors, max_value)
+    else:
+        for tensor in tensors:
+            tensor.clamp_(min_value, max_value)
+
+
+def _foreach_mul_(tensors: List[Tensor], scale: Tensor) -> None:
+    """Multiplies all tensors in place by the scalar tensor ``scale``, fused where PyTorch supports it."""
+    if hasattr(torch, '_foreach_mul_'):
+        torch._foreach_mul_(tensors, [scale] * len(tensors))
+    else:
+        for tensor in tensors:
+            tensor.mul_(scale)
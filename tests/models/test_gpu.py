@@ -59,6 +59,38 @@ def test_multi_gpu_model_ddp(tmpdir):
     tutils.run_model_test(trainer_options, model)
 
 
+@pytest.mark.skipif(torch.cuda.device_count() < 2, reason="test requires multi-GPU machine")
+def test_ddp_spawn_weights_loaded_in_place(tmpdir):
+    """Make sure the weights trained in spawned processes end up in the original model without a checkpoint."""
+
+    tutils.reset_seed()
+    tutils.set_random_master_port()
+
+    model, hparams = tutils.get_default_model()
+    initial_weights = {name: p.detach().clone() for name, p in model.named_parameters()}
+    parameters = list(model.parameters())
+
+    trainer = Trainer(
+        default_save_path=tmpdir,
+        progress_bar_refresh_rate=0,
+        max_epochs=1,
+        train_percent_check=0.4,
+        val_percent_check=0.2,
+        checkpoint_callback=False,
+        logger=False,
+        gpus=[0, 1],
+        distributed_backend='ddp'
+    )
+    result = trainer.fit(model)
+    assert result == 1, 'ddp model failed to complete'
+
+    # the same parameters were updated, and no temporary checkpoint was written
+    assert trainer.model is model
+    assert all(a is b for a, b in zip(model.parameters(), parameters))
+    assert any(not torch.equal(p, initial_weights[name]) for name, p in model.named_parameters())
+    assert not os.path.exists(os.path.join(tmpdir, '__temp_weight_ddp_end.ckpt'))
+
+
 @pytest.mark.skipif(torch.cuda.device_count() < 2, reason="test requires multi-GPU machine")
 def test_ddp_all_dataloaders_passed_to_fit(tmpdir):
     """Make sure DDP works with dataloaders passed to fit()"""
@@ -1,4 +1,6 @@
+import collections
 import glob
+import hashlib
 import logging as log
 import os
 
@@ -8,6 +10,14 @@ import torch
 import tests.base.utils as tutils
 from pytorch_lightning import Trainer
 from pytorch_lightning.callbacks import ModelCheckpoint
+from pytorch_lightning.core.saving import (
+    collect_blobs,
+    is_incremental_checkpoint,
+    is_streaming_checkpoint,
+    load_checkpoint,
+    remove_checkpoint,
+    save_streaming_checkpoint,
+)
 from pytorch_lightning.utilities.exceptions import MisconfigurationException
 from tests.base import (
     LightningTestModel,
@@ -150,6 +160,176 @@ def test_load_model_from_checkpoint(tmpdir):
     tutils.assert_ok_model_acc(new_trainer)
 
 
+def test_streaming_checkpoint(tmpdir):
+    """Verify that streaming checkpoints restore the model weights and the training state."""
+    tutils.reset_seed()
+
+    hparams = tutils.get_default_hparams()
+    model = LightningTestModel(hparams)
+
+    trainer_options = dict(
+        progress_bar_refresh_rate=0,
+        max_epochs=1,
+        train_percent_check=0.4,
+        val_percent_check=0.2,
+        checkpoint_callback=ModelCheckpoint(tmpdir, save_top_k=-1),
+        logger=False,
+        default_save_path=tmpdir,
+        checkpoint_format='streaming',
+    )
+    trainer = Trainer(**trainer_options)
+    result = trainer.fit(model)
+    assert result == 1, 'training failed to complete'
+
+    last_checkpoint = sorted(glob.glob(os.path.join(tmpdir, '*.ckpt')))[-1]
+    assert is_streaming_checkpoint(last_checkpoint)
+
+    pretrained_model = LightningTestModel.load_from_checkpoint(last_checkpoint)
+    for k, v in vars(hparams).items():
+        assert getattr(pretrained_model.hparams, k) == v
+    for old_p, new_p in zip(model.parameters(), pretrained_model.parameters()):
+        assert torch.equal(old_p, new_p), 'loaded weights are not the same as the saved weights'
+
+    # resuming restores the optimizer state from the mapped tensors
+    resumed_model = LightningTestModel(hparams)
+    trainer_options.update(max_epochs=2, resume_from_checkpoint=last_checkpoint)
+    resumed_trainer = Trainer(**trainer_options)
+    assert resumed_trainer.fit(resumed_model) == 1
+
+    with pytest.raises(MisconfigurationException):
+        Trainer(checkpoint_format='zip')
+
+
+def test_load_checkpoint_formats(tmpdir):
+    """Verify that both checkpoint formats load the same values, and streamed tensors can be modified."""
+    shared = torch.arange(6.).view(2, 3)
+    state_dict = collections.OrderedDict([('weight', shared), ('tied', shared), ('steps', torch.tensor(7))])
+    state_dict._metadata = {'': {'version': 1}}
+    checkpoint = {
+        'state_dict': state_dict,
+        'optimizer_states': [{'state': {0: {'mask': torch.tensor([True, False])}}, 'param_groups': [{'lr': 0.1}]}],
+        'bfloat': torch.tensor([1.5]).to(torch.bfloat16),
+        'epoch': 2,
+    }
+
+    torch_path = os.path.join(tmpdir, 'torch.ckpt')
+    streaming_path = os.path.join(tmpdir, 'streaming.ckpt')
+    torch.save(checkpoint, torch_path)
+    save_streaming_checkpoint(checkpoint, streaming_path)
+    assert not is_streaming_checkpoint(torch_path)
+    assert is_streaming_checkpoint(streaming_path)
+
+    for path in (torch_path, streaming_path):
+        loaded = load_checkpoint(path)
+        assert loaded['epoch'] == 2
+        assert loaded['state_dict']._metadata == state_dict._metadata
+        assert list(loaded['state_dict']) == list(state_dict)
+        for key, value in state_dict.items():
+            assert torch.equal(loaded['state_dict'][key], value)
+        assert loaded['optimizer_states'][0]['state'][0]['mask'].tolist() == [True, False]
+        assert loaded['bfloat'].float().tolist() == [1.5]
+
+    loaded = load_checkpoint(streaming_path)
+    # tied tensors stay tied and modifying them leaves the file as it was
+    assert loaded['state_dict']['weight'] is loaded['state_dict']['tied']
+    loaded['state_dict']['weight'].add_(1)
+    assert torch.equal(load_checkpoint(streaming_path)['state_dict']['weight'], shared)
+
+
+def test_incremental_checkpoint_replaced(tmpdir):
+    """Verify that the frozen tensors are written once when each checkpoint replaces the previous one."""
+    tutils.reset_seed()
+
+    hparams = tutils.get_default_hparams()
+    model = LightningTestModel(hparams)
+    for param in model.c_d1.parameters():
+        param.requires_grad = False
+    frozen_blob = os.path.join(tmpdir, '.checkpoint_blobs', hashlib.blake2b(
+        model.c_d1.weight.detach().numpy().tobytes(), digest_size=20).hexdigest())
+
+    class AlwaysBetterCheckpoint(ModelCheckpoint):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.frozen_blob_stats = []
+
+        def check_monitor_top_k(self, current):
+            return True
+
+        def _do_check_save(self, *args, **kwargs):
+            super()._do_check_save(*args, **kwargs)
+            stat = os.stat(frozen_blob)
+            self.frozen_blob_stats.append((stat.st_ino, stat.st_mtime_ns))
+
+    checkpoint_callback = AlwaysBetterCheckpoint(tmpdir, save_top_k=1)
+    trainer = Trainer(
+        progress_bar_refresh_rate=0,
+        max_epochs=3,
+        train_percent_check=0.2,
+        val_percent_check=0.2,
+        checkpoint_callback=checkpoint_callback,
+        logger=False,
+        default_save_path=tmpdir,
+        early_stop_callback=False,
+        checkpoint_format='incremental',
+    )
+    assert trainer.fit(model) == 1
+
+    assert len(glob.glob(os.path.join(tmpdir, '*.ckpt'))) == 1
+    assert len(checkpoint_callback.frozen_blob_stats) == 3
+    assert len(set(checkpoint_callback.frozen_blob_stats)) == 1
+
+
+def test_incremental_checkpoint(tmpdir):
+    """Verify that incremental checkpoints share unchanged tensors and remove them with the last checkpoint."""
+    tutils.reset_seed()
+
+    hparams = tutils.get_default_hparams()
+    model = LightningTestModel(hparams)
+    # the frozen layer is the same in all checkpoints
+    for param in model.c_d1.parameters():
+        param.requires_grad = False
+
+    trainer = Trainer(
+        progress_bar_refresh_rate=0,
+        max_epochs=4,
+        train_percent_check=0.2,
+        val_percent_check=0.2,
+        checkpoint_callback=ModelCheckpoint(tmpdir, save_top_k=2),
+        logger=False,
+        default_save_path=tmpdir,
+        early_stop_callback=False,
+        checkpoint_format='incremental',
+    )
+    assert trainer.fit(model) == 1
+
+    checkpoints = sorted(glob.glob(os.path.join(tmpdir, '*.ckpt')))
+    assert len(checkpoints) == 2
+    assert all(is_incremental_checkpoint(path) for path in checkpoints)
+
+    # the blobs of the checkpoints removed during training are gone
+    assert collect_blobs(str(tmpdir)) == 0
+
+    def num_tensors(obj):
+        if isinstance(obj, torch.Tensor):
+            return 1
+        if isinstance(obj, dict):
+            obj = list(obj.values())
+        return sum(num_tensors(x) for x in obj) if isinstance(obj, (list, tuple)) else 0
+
+    # the frozen weight and bias are kept for the other checkpoint
+    store = os.path.join(tmpdir, '.checkpoint_blobs')
+    num_blobs = len(os.listdir(store))
+    first_tensors = num_tensors(load_checkpoint(checkpoints[0]))
+    remove_checkpoint(checkpoints[0])
+    assert num_blobs - len(os.listdir(store)) <= first_tensors - 2
+
+    pretrained_model = LightningTestModel.load_from_checkpoint(checkpoints[1])
+    assert torch.equal(pretrained_model.c_d1.weight, model.c_d1.weight)
+
+    remove_checkpoint(checkpoints[1])
+    assert not os.listdir(store)
+
+
 @pytest.mark.skipif(torch.cuda.device_count() < 2, reason="test requires multi-GPU machine")
 def test_running_test_pretrained_model_dp(tmpdir):
     """Verify test() on pretrained model."""
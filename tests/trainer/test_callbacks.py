@@ -181,3 +181,44 @@ def test_early_stopping_without_val_step(tmpdir):
 
     assert result == 1, 'training failed to complete'
     assert trainer.current_epoch < trainer.max_epochs
+
+
+def test_loop_hooks_resolved(tmpdir):
+    """Test that only the hooks implemented by the model and callbacks are called in the loops."""
+
+    class CurrentTestModel(LightTrainDataloader, TestModelBase):
+
+        batch_end_calls = 0
+
+        def on_batch_end(self):
+            self.batch_end_calls += 1
+
+    class BatchCallback(Callback):
+
+        batch_start_calls = 0
+
+        def on_batch_start(self, trainer, pl_module):
+            self.batch_start_calls += 1
+
+    class EpochCallback(Callback):
+
+        def on_epoch_end(self, trainer, pl_module):
+            pass
+
+    hparams = tutils.get_default_hparams()
+    model = CurrentTestModel(hparams)
+    batch_callback = BatchCallback()
+
+    trainer = Trainer(
+        default_save_path=tmpdir,
+        callbacks=[batch_callback, EpochCallback()],
+        max_epochs=1,
+        train_percent_check=0.1,
+        logger=False,
+    )
+    trainer.fit(model)
+
+    assert trainer.is_hook_live('on_batch_end')
+    assert not trainer.is_hook_live('on_batch_start')
+    assert trainer._live_callbacks == {'on_batch_start': [batch_callback], 'on_batch_end': []}
+    assert model.batch_end_calls == batch_callback.batch_start_calls == trainer.num_training_batches
@@ -1,8 +1,17 @@
+import functools
+import json
+import threading
+import time
+import types
+
 import pytest
 import torch
+from torch.utils.data.distributed import DistributedSampler
 
 import tests.base.utils as tutils
 from pytorch_lightning import Trainer
+from pytorch_lightning.trainer.dataloader_args import accepts_argument, rebuild_dataloader
+from pytorch_lightning.trainer.supporters import BatchPrefetcher, BucketBatchSampler, CyclingIterator
 from pytorch_lightning.utilities.exceptions import MisconfigurationException
 from tests.base import (
     TestModelBase,
@@ -19,7 +28,8 @@ from tests.base import (
     LightInfTrainDataloader,
     LightInfValDataloader,
     LightInfTestDataloader,
-    LightZeroLenDataloader
+    LightZeroLenDataloader,
+    LightValidationMixin,
 )
 
 
@@ -463,6 +473,443 @@ def test_inf_test_dataloader(tmpdir):
     assert result == 1
 
 
+def test_prefetch_batches(tmpdir):
+    """Verify that all prefetched batches reach the model and the loader threads are released."""
+    tutils.reset_seed()
+
+    class CurrentTestModel(
+        LightTrainDataloader,
+        LightValidationMixin,
+        TestModelBase,
+    ):
+        seen_batches = []
+
+        def training_step(self, batch, batch_idx):
+            self.seen_batches.append(batch_idx)
+            return super().training_step(batch, batch_idx)
+
+    hparams = tutils.get_default_hparams()
+    model = CurrentTestModel(hparams)
+
+    trainer = Trainer(
+        default_save_path=tmpdir,
+        logger=False,
+        max_epochs=1,
+        train_percent_check=0.3,
+        val_percent_check=0.2,
+        prefetch_batches=2,
+    )
+    result = trainer.fit(model)
+
+    # verify training completed
+    assert result == 1
+    assert model.seen_batches == list(range(trainer.num_training_batches))
+
+    # the epoch was cut short, the background loaders must be stopped anyway
+    assert not [t for t in threading.enumerate() if t.name == 'BatchPrefetcher']
+
+
+def test_prefetch_batches_cycling():
+    """Verify that the batches prefetched for a virtual epoch left early are used by the next one."""
+    batches = CyclingIterator(range(10))
+
+    prefetcher = BatchPrefetcher(batches.take(6), depth=3, put_back=batches.put_back)
+    epoch = iter(prefetcher)
+    assert [next(epoch), next(epoch)] == [0, 1]
+    # the loader thread has run ahead by now
+    time.sleep(0.2)
+    epoch.close()
+
+    prefetcher = BatchPrefetcher(batches.take(6), depth=3, put_back=batches.put_back)
+    assert list(prefetcher) == [2, 3, 4, 5, 6, 7]
+    assert list(batches.take(3)) == [8, 9, 0]
+    assert batches.passes == 1
+    assert not [t for t in threading.enumerate() if t.name == 'BatchPrefetcher']
+
+
+class PassCountingLoader:
+    """Counts how often the wrapped dataloader is iterated."""
+
+    def __init__(self, dataloader):
+        self.dataloader = dataloader
+        self.passes = 0
+
+    def __len__(self):
+        return len(self.dataloader)
+
+    def __iter__(self):
+        self.passes += 1
+        return iter(self.dataloader)
+
+
+def test_batches_per_epoch(tmpdir):
+    """Verify that virtual epochs continue on the same dataloader iterator."""
+    tutils.reset_seed()
+
+    class CurrentTestModel(
+        LightTrainDataloader,
+        LightValidationMixin,
+        TestModelBase,
+    ):
+        seen_batches = []
+
+        def training_step(self, batch, batch_idx):
+            self.seen_batches.append(batch_idx)
+            return super().training_step(batch, batch_idx)
+
+        def train_dataloader(self):
+            return PassCountingLoader(super().train_dataloader())
+
+    hparams = tutils.get_default_hparams()
+    model = CurrentTestModel(hparams)
+
+    trainer = Trainer(
+        default_save_path=tmpdir,
+        logger=False,
+        max_epochs=3,
+        val_percent_check=0.2,
+        batches_per_epoch=4,
+    )
+    result = trainer.fit(model)
+
+    # verify training completed
+    assert result == 1
+    assert trainer.num_training_batches == 4
+    assert trainer.global_step == 12
+    assert model.seen_batches == [0, 1, 2, 3] * 3
+
+    # 12 batches of a dataloader of 10 batches take two passes, the first pass is not restarted per epoch
+    assert len(trainer.train_dataloader) == 10
+    assert trainer.train_dataloader.passes == 2
+    assert trainer.train_batch_iterator.passes == 1
+
+    with pytest.raises(MisconfigurationException):
+        Trainer(batches_per_epoch=0)
+
+
+def test_batches_per_epoch_inf_dataloader(tmpdir):
+    """Verify that an infinite train dataloader can be validated within virtual epochs."""
+    tutils.reset_seed()
+
+    class CurrentTestModel(
+        LightInfTrainDataloader,
+        LightningTestModel
+    ):
+        pass
+
+    hparams = tutils.get_default_hparams()
+    model = CurrentTestModel(hparams)
+
+    trainer = Trainer(
+        default_save_path=tmpdir,
+        logger=False,
+        max_epochs=2,
+        val_percent_check=0.2,
+        val_check_interval=0.5,
+        batches_per_epoch=6,
+    )
+    result = trainer.fit(model)
+
+    # verify training completed
+    assert result == 1
+    assert trainer.val_check_batch == 3
+    assert trainer.global_step == 12
+
+
+def test_persistent_workers(tmpdir):
+    """Verify that the dataloader workers are started once and stopped when training ends."""
+    tutils.reset_seed()
+
+    class CurrentTestModel(
+        LightTrainDataloader,
+        LightValidationMixin,
+        TestModelBase,
+    ):
+        train_iterators = []
+        val_iterators = []
+
+        def _dataloader(self, train):
+            dataloader = super()._dataloader(train)
+            return torch.utils.data.DataLoader(dataloader.dataset, batch_size=dataloader.batch_size,
+                                               shuffle=True, num_workers=1)
+
+        def on_epoch_end(self):
+            self.train_iterators.append(self.trainer.train_dataloader._iterator)
+
+        def on_post_performance_check(self):
+            self.val_iterators.append(self.trainer.val_dataloaders[0]._iterator)
+
+    hparams = tutils.get_default_hparams()
+    model = CurrentTestModel(hparams)
+
+    trainer = Trainer(
+        default_save_path=tmpdir,
+        logger=False,
+        max_epochs=3,
+        train_percent_check=0.5,
+        val_percent_check=0.2,
+        persistent_workers=True,
+    )
+    result = trainer.fit(model)
+
+    # verify training completed
+    assert result == 1
+    assert trainer.num_training_batches == 5
+    assert len(model.train_iterators) == 3 and len(set(map(id, model.train_iterators))) == 1
+
+    # the sanity check leaves its pass early, the workers are restarted once for the first validation
+    assert len(model.val_iterators) == 3 and len(set(map(id, model.val_iterators))) == 1
+
+    # all workers are stopped
+    assert trainer.train_dataloader._iterator is None
+    assert trainer.val_dataloaders[0]._iterator is None
+
+
+def test_auto_tune_dataloader(tmpdir, monkeypatch):
+    """Verify that the tuned dataloader settings are used, saved and reused by later runs."""
+    tutils.reset_seed()
+
+    class CurrentTestModel(
+        LightTrainDataloader,
+        TestModelBase,
+    ):
+        pass
+
+    hparams = tutils.get_default_hparams()
+    model = CurrentTestModel(hparams)
+
+    trainer_options = dict(
+        default_save_path=tmpdir,
+        logger=False,
+        max_epochs=1,
+        train_percent_check=0.1,
+        auto_tune_dataloader=True,
+    )
+    trainer = Trainer(**trainer_options)
+    result = trainer.fit(model)
+
+    # verify training completed
+    assert result == 1
+
+    cache = json.loads(tmpdir.join('dataloader_tuning.json').read())
+    assert len(cache) == 1
+    settings = list(cache.values())[0]['settings']
+    assert settings['num_workers'] == trainer.train_dataloader.num_workers
+    assert settings['pin_memory'] is False
+
+    # a second run over the same data does not measure again
+    def tune_dataloader(*args, **kwargs):
+        raise AssertionError('the saved settings were not used')
+
+    monkeypatch.setattr('pytorch_lightning.trainer.data_loading.tune_dataloader', tune_dataloader)
+    trainer = Trainer(**trainer_options)
+    result = trainer.fit(model)
+    assert result == 1
+    assert trainer.train_dataloader.num_workers == settings['num_workers']
+
+    with pytest.raises(MisconfigurationException):
+        Trainer(auto_tune_dataloader='everything')
+
+
+def test_auto_tune_dataloader_ddp(tmpdir, monkeypatch):
+    """Verify that under DDP only the first process tunes the dataloader and the others use its settings."""
+    from pytorch_lightning.trainer import data_loading
+
+    model = LightningTestModel(tutils.get_default_hparams())
+    dataloader = torch.utils.data.DataLoader(range(64), batch_size=4)
+    trainer = Trainer(default_save_path=tmpdir, auto_tune_dataloader=True)
+    trainer.use_ddp = True
+
+    sent = []
+
+    def broadcast(tensor, src):
+        assert src == 0
+        if rank == 0:
+            sent.append(tensor.clone())
+        else:
+            tensor.copy_(sent.pop(0))
+
+    def tune_dataloader(*args, **kwargs):
+        assert rank == 0, 'only the first process tunes the dataloader'
+        return dict(num_workers=3, pin_memory=False), [(dict(num_workers=3, pin_memory=False), 100.)]
+
+    monkeypatch.setattr(data_loading, 'tune_dataloader', tune_dataloader)
+    monkeypatch.setattr(data_loading.torch_distrib, 'is_initialized', lambda: True)
+    monkeypatch.setattr(data_loading.torch_distrib, 'get_rank', lambda: rank)
+    monkeypatch.setattr(data_loading.torch_distrib, 'get_backend', lambda: 'gloo')
+    monkeypatch.setattr(data_loading.torch_distrib, 'broadcast', broadcast)
+
+    rank = 0
+    assert trainer.tune_train_dataloader(model, dataloader).num_workers == 3
+    assert tmpdir.join('dataloader_tuning.json').exists()
+
+    rank = 1
+    tmpdir.join('dataloader_tuning.json').remove()
+    assert trainer.tune_train_dataloader(model, dataloader).num_workers == 3
+    assert not tmpdir.join('dataloader_tuning.json').exists()
+    assert not sent
+
+    # the TPU cores are not tuned
+    trainer.use_ddp, trainer.use_tpu = False, True
+    with pytest.warns(UserWarning, match='not supported on TPUs'):
+        assert trainer.tune_train_dataloader(model, dataloader) is dataloader
+
+
+def test_auto_add_sampler_keeps_dataloader_settings(monkeypatch):
+    """Verify that adding a distributed sampler keeps the other dataloader arguments, also of subclasses."""
+
+    class CustomDataLoader(torch.utils.data.DataLoader):
+        def __init__(self, dataset, custom_arg, **kwargs):
+            super().__init__(dataset, **kwargs)
+            self.custom_arg = custom_arg
+
+    class UnknownArgDataLoader(torch.utils.data.DataLoader):
+        def __init__(self, dataset, custom_arg, **kwargs):
+            super().__init__(dataset, **kwargs)
+            # not kept under the name of the argument
+            self.custom_attr = custom_arg
+
+    def collate_fn(batch):
+        return torch.tensor(batch)
+
+    def worker_init_fn(worker_id):
+        pass
+
+    # no process group here
+    sampler_class = functools.partial(DistributedSampler, num_replicas=2, rank=0)
+    monkeypatch.setattr('pytorch_lightning.trainer.data_loading.DistributedSampler', sampler_class)
+    trainer = Trainer()
+    trainer.use_ddp = True
+
+    dataset = list(range(100))
+    dl_args = dict(batch_size=8, shuffle=True, num_workers=2, pin_memory=True, collate_fn=collate_fn,
+                   worker_init_fn=worker_init_fn, timeout=5, drop_last=True)
+    if accepts_argument(torch.utils.data.DataLoader(dataset), 'persistent_workers'):
+        dl_args.update(persistent_workers=True, prefetch_factor=4)
+
+    custom_dataloader = CustomDataLoader(dataset, 'custom', **dl_args)
+    dataloader = torch.utils.data.DataLoader(dataset, **dl_args)
+
+    for original in (custom_dataloader, dataloader):
+        result = trainer.auto_add_sampler(original, train=True)
+        assert type(result) is type(original)
+        assert isinstance(result.sampler, DistributedSampler)
+        assert len(result) == 6
+        for name, value in dl_args.items():
+            if name != 'shuffle':
+                assert getattr(result, name) == value, name
+    result = trainer.auto_add_sampler(custom_dataloader, train=True)
+    assert result.custom_arg == 'custom'
+    assert result.sampler.shuffle
+
+    # the re-created dataloader can be re-created in turn
+    assert rebuild_dataloader(result, batch_size=4).custom_arg == 'custom'
+
+    # the value of an argument which isn't kept in an attribute is unknown
+    with pytest.raises(MisconfigurationException):
+        trainer.auto_add_sampler(UnknownArgDataLoader(dataset, 'custom'), train=True)
+
+    # samplers of the user are kept
+    sampler = torch.utils.data.SubsetRandomSampler(list(range(10)))
+    dataloader = torch.utils.data.DataLoader(dataset, sampler=sampler)
+    assert trainer.auto_add_sampler(dataloader, train=True) is dataloader
+
+
+@pytest.mark.parametrize('backend', ['ddp', 'ddp2', 'tpu'])
+def test_auto_add_sampler_eval_dataloaders(monkeypatch, backend):
+    """Verify that the evaluation dataloaders keep their order and samples under distributed training,
+    while the train dataloader is split between the processes."""
+    sampler_class = functools.partial(DistributedSampler, num_replicas=3, rank=0)
+    monkeypatch.setattr('pytorch_lightning.trainer.data_loading.DistributedSampler', sampler_class)
+    if backend == 'tpu':
+        xm = types.SimpleNamespace(xrt_world_size=lambda: 3, get_ordinal=lambda: 0)
+        monkeypatch.setattr('pytorch_lightning.trainer.data_loading.xm', xm, raising=False)
+    trainer = Trainer()
+    setattr(trainer, f'use_{backend}', True)
+
+    dataset = list(range(10))
+    eval_dataloader = trainer.auto_add_sampler(torch.utils.data.DataLoader(dataset, batch_size=4), train=False)
+    assert [x for batch in eval_dataloader for x in batch.tolist()] == dataset
+
+    # 10 samples split between 3 processes
+    train_dataloader = trainer.auto_add_sampler(torch.utils.data.DataLoader(dataset, batch_size=4), train=True)
+    assert isinstance(train_dataloader.sampler, DistributedSampler)
+    assert not train_dataloader.sampler.shuffle
+    assert len(train_dataloader.sampler) == 4
+
+
+def test_bucket_batch_sampler():
+    """Verify that the samples are batched by length within the token budget, the same way on every replica."""
+    torch.manual_seed(1)
+    lengths = torch.randint(1, 50, (200,)).tolist()
+
+    sampler = BucketBatchSampler(lengths, max_tokens=100, bucket_size=32)
+    batches = list(sampler)
+    assert len(batches) == len(sampler)
+    assert sorted(i for batch in batches for i in batch) == list(range(200))
+    assert all(len(batch) * max(lengths[i] for i in batch) <= 100 for batch in batches)
+
+    # deterministic per epoch, with the same number of batches in every epoch
+    assert list(sampler) == batches
+    sampler.set_epoch(1)
+    assert list(sampler) != batches
+    assert len(list(sampler)) == len(batches)
+
+    # the replicas get as many batches, of similar cost, and all samples together
+    replicas = [list(BucketBatchSampler(lengths, max_tokens=100, bucket_size=32, num_replicas=3, rank=rank))
+                for rank in range(3)]
+    assert len(set(map(len, replicas))) == 1
+    assert set(i for batches in replicas for batch in batches for i in batch) == set(range(200))
+
+
+def test_max_tokens_per_batch(monkeypatch):
+    """Verify that the trainer batches the samples of datasets with lengths by their length."""
+
+    class LengthDataset(torch.utils.data.Dataset):
+        lengths = [1, 2, 3, 4] * 25
+
+        def __len__(self):
+            return len(self.lengths)
+
+        def __getitem__(self, index):
+            return torch.ones(self.lengths[index])
+
+    def collate_fn(batch):
+        return torch.nn.utils.rnn.pad_sequence(batch, batch_first=True)
+
+    trainer = Trainer(max_tokens_per_batch=8)
+    dataloader = torch.utils.data.DataLoader(LengthDataset(), batch_size=4, shuffle=True, collate_fn=collate_fn)
+    result = trainer.auto_add_sampler(dataloader, train=True)
+    assert isinstance(result.batch_sampler, BucketBatchSampler)
+    assert result.batch_sampler.shuffle
+    assert result.collate_fn is collate_fn
+    assert all(batch.numel() <= 8 for batch in result)
+
+    # eval dataloaders keep their order
+    dataloader = torch.utils.data.DataLoader(LengthDataset(), batch_size=4, collate_fn=collate_fn)
+    assert not trainer.auto_add_sampler(dataloader, train=False).batch_sampler.shuffle
+
+    # under DDP only the train dataloader is sharded, the eval dataloaders are not padded with repeated samples
+    from pytorch_lightning.trainer import data_loading
+    monkeypatch.setattr(data_loading.torch_distrib, 'get_world_size', lambda: 3)
+    monkeypatch.setattr(data_loading.torch_distrib, 'get_rank', lambda: 1)
+    trainer.use_ddp = True
+    train_sampler = trainer.auto_add_sampler(dataloader, train=True).batch_sampler
+    assert (train_sampler.num_replicas, train_sampler.rank) == (3, 1)
+    eval_sampler = trainer.auto_add_sampler(dataloader, train=False).batch_sampler
+    assert (eval_sampler.num_replicas, eval_sampler.rank) == (1, 0)
+    assert sorted(i for batch in eval_sampler for i in batch) == list(range(len(LengthDataset.lengths)))
+    trainer.use_ddp = False
+
+    # datasets without lengths are left alone
+    dataloader = torch.utils.data.DataLoader(list(range(10)), batch_size=4)
+    with pytest.warns(UserWarning, match='lengths'):
+        assert trainer.auto_add_sampler(dataloader, train=True) is dataloader
+
+    with pytest.raises(MisconfigurationException):
+        Trainer(max_tokens_per_batch=0)
+
+
 def test_error_on_zero_len_dataloader(tmpdir):
     """ Test that error is raised if a zero-length dataloader is defined """
     tutils.reset_seed()
@@ -275,3 +275,73 @@ def test_none_optimizer(tmpdir):
 
     # verify training completed
     assert result == 1
+
+
+def test_multi_optimizer_requires_grad(tmpdir):
+    """Verify that only the parameters of the current optimizer require grads in its training step."""
+
+    class CurrentTestModel(LightTrainDataloader, TestModelBase):
+
+        def configure_optimizers(self):
+            first_params = list(self.c_d1.parameters())
+            other_params = [p for p in self.parameters() if all(p is not q for q in first_params)]
+            self.param_sets = [first_params, other_params]
+            return [torch.optim.SGD(first_params, lr=0.01), torch.optim.SGD(other_params, lr=0.01)]
+
+        def training_step(self, batch, batch_idx, optimizer_idx):
+            for idx, params in enumerate(self.param_sets):
+                assert all(p.requires_grad == (idx == optimizer_idx) for p in params)
+            return super().training_step(batch, batch_idx)
+
+    hparams = tutils.get_default_hparams()
+    model = CurrentTestModel(hparams)
+
+    trainer = Trainer(
+        default_save_path=tmpdir,
+        max_epochs=1,
+        val_percent_check=0.1,
+        train_percent_check=0.2,
+        logger=False,
+    )
+    result = trainer.fit(model)
+    assert result == 1
+    assert [len(own) for own in trainer._params_by_optimizer] == [len(params) for params in model.param_sets]
+
+    # after the first step only the parameters that change owner are flipped
+    assert set(trainer._params_toggles) == {(None, 0), (0, 1), (1, 0)}
+    enable, disable = trainer._params_toggles[(0, 1)]
+    assert len(enable) == len(model.param_sets[1]) and len(disable) == len(model.param_sets[0])
+
+
+def test_toggle_optimizer_params_freeze():
+    """Verify that `freeze()` and `unfreeze()` between two toggles are corrected."""
+    hparams = tutils.get_default_hparams()
+    model = TestModelBase(hparams)
+    first, second = list(model.c_d1.parameters()), list(model.c_d2.parameters())
+    unused = list(model.c_d1_bn.parameters())
+
+    trainer = Trainer()
+    trainer.optimizers = [torch.optim.SGD(first, lr=0.01), torch.optim.SGD(second, lr=0.01)]
+    trainer.partition_optimizer_params(model)
+
+    def check(opt_idx):
+        own = [first, second][opt_idx]
+        for params in (first, second, unused):
+            assert all(p.requires_grad == (params is own) for p in params)
+
+    trainer.toggle_optimizer_params(0)
+    check(0)
+    trainer.toggle_optimizer_params(1)
+    check(1)
+
+    # e.g. a callback freezes the model, or unfreezes all of it
+    for change in (model.freeze, model.unfreeze):
+        change()
+        trainer.toggle_optimizer_params(0)
+        check(0)
+        trainer.toggle_optimizer_params(1)
+        check(1)
+
+    # the transitions between the optimizers only flip the parameters which change owner
+    enable, disable = trainer._params_toggles[(0, 1)]
+    assert len(enable) == len(second) and len(disable) == len(first)
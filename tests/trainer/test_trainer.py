@@ -15,6 +15,8 @@ from pytorch_lightning.callbacks import (
 from pytorch_lightning import Callback
 from pytorch_lightning.core.lightning import load_hparams_from_tags_csv
 from pytorch_lightning.trainer.logging import TrainerLoggingMixin
+from pytorch_lightning.trainer.supporters import CheckpointWriter, EpochOutputReducer
+from pytorch_lightning.trainer.training_tricks import _all_finite
 from pytorch_lightning.utilities.exceptions import MisconfigurationException
 from tests.base import (
     TestModelBase,
@@ -250,6 +252,26 @@ def test_dp_output_reduce():
     assert reduced['b']['c'] == out['b']['c']
 
 
+def test_metrics_to_scalars():
+    mixin = TrainerLoggingMixin()
+    mixin.callback_metrics = {}
+
+    loss = torch.tensor(2., requires_grad=True) * 1
+    mixin.add_callback_metrics({'loss': loss, 'step': torch.tensor(3), 'epoch': 1})
+
+    # metrics are stored without syncing, but detached from the graph
+    assert isinstance(mixin._callback_metrics['loss'], torch.Tensor)
+    assert not mixin._callback_metrics['loss'].requires_grad
+
+    # and converted when read
+    assert mixin.callback_metrics == {'loss': 2.0, 'step': 3, 'epoch': 1}
+    assert isinstance(mixin.callback_metrics['step'], int)
+
+    # nested dicts keep their structure
+    metrics = {'a': torch.tensor([0.5]), 'b': {'c': torch.tensor(1.5, dtype=torch.float64)}}
+    assert mixin.metrics_to_scalars(metrics) == {'a': 0.5, 'b': {'c': 1.5}}
+
+
 @pytest.mark.parametrize(["save_top_k", "file_prefix", "expected_files"], [
     pytest.param(-1, '', {'epoch=4.ckpt', 'epoch=3.ckpt', 'epoch=2.ckpt', 'epoch=1.ckpt', 'epoch=0.ckpt'},
                  id="CASE K=-1  (all)"),
@@ -367,6 +389,125 @@ def test_resume_from_checkpoint_epoch_restored(tmpdir):
         assert state['global_step'] + next_model.num_batches_seen == training_batches * trainer_options['max_epochs']
 
 
+def test_resume_from_checkpoint_mid_epoch(tmpdir):
+    """Verify that a checkpoint saved in the middle of an epoch resumes at the next batch, in the same order."""
+    tutils.reset_seed()
+    hparams = tutils.get_default_hparams()
+    ckpt_path = os.path.join(tmpdir, 'mid_epoch.ckpt')
+
+    class CurrentTestModel(LightningTestModel):
+        def __init__(self, *args, save_at=None, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.save_at = save_at
+            self.batches_seen = []
+
+        def on_batch_start(self, batch):
+            # the batch being started is not part of the checkpoint yet
+            if self.current_epoch == 0 and self.trainer.batch_idx == self.save_at:
+                self.trainer.save_checkpoint(ckpt_path)
+
+        def training_step(self, batch, batch_idx):
+            self.batches_seen.append((self.current_epoch, batch_idx, batch[1].tolist()))
+            return super().training_step(batch, batch_idx)
+
+    trainer_options = dict(
+        max_epochs=2,
+        train_percent_check=0.1,
+        val_percent_check=0.1,
+        checkpoint_callback=False,
+        logger=False,
+        default_save_path=tmpdir,
+        early_stop_callback=False,
+    )
+
+    model = CurrentTestModel(hparams, save_at=4)
+    trainer = Trainer(**trainer_options)
+    trainer.fit(model)
+
+    state = torch.load(ckpt_path)
+    assert state['epoch_progress']['epoch'] == 0
+    assert state['epoch_progress']['batches_done'] == 4
+
+    tutils.reset_seed()
+    resumed_model = CurrentTestModel(hparams)
+    resumed_trainer = Trainer(**trainer_options, resume_from_checkpoint=ckpt_path)
+    resumed_trainer.fit(resumed_model)
+
+    # the batches of the first epoch before the checkpoint are skipped, all others are the same
+    assert resumed_model.batches_seen[0][:2] == (0, 4)
+    assert resumed_model.batches_seen == model.batches_seen[4:]
+
+
+def test_async_checkpoints(tmpdir):
+    """Verify that checkpoints written in the background are all complete when fit returns."""
+    tutils.reset_seed()
+    hparams = tutils.get_default_hparams()
+    model = LightningTestModel(hparams)
+
+    trainer = Trainer(
+        max_epochs=3,
+        train_percent_check=0.2,
+        val_percent_check=0.2,
+        checkpoint_callback=ModelCheckpoint(tmpdir, save_top_k=2),
+        logger=False,
+        default_save_path=tmpdir,
+        early_stop_callback=False,
+        async_checkpoints=1,
+    )
+    trainer.fit(model)
+
+    # the checkpoints left out of the top k are removed after they are written
+    checkpoints = sorted(glob.glob(os.path.join(tmpdir, '*.ckpt')))
+    assert set(checkpoints) == set(trainer.checkpoint_callback.best_k_models)
+    assert not glob.glob(os.path.join(tmpdir, '*.part'))
+    for path in checkpoints:
+        state = torch.load(path)
+        assert state['state_dict'].keys() == model.state_dict().keys()
+
+    with pytest.raises(MisconfigurationException):
+        Trainer(async_checkpoints=-1)
+
+
+def test_checkpoint_writer(tmpdir):
+    """Verify that the background writes happen in order, on copies, and raise their errors."""
+    writer = CheckpointWriter(max_pending=2)
+    tensor = torch.zeros(3)
+    path = os.path.join(tmpdir, 'a.ckpt')
+
+    writer.save({'tensor': tensor}, path)
+    # the checkpoint keeps the value at the time of saving
+    tensor += 1
+    writer.remove(path)
+    writer.save({'tensor': tensor}, path)
+    writer.wait()
+    assert not writer.is_pending(path)
+    assert torch.load(path)['tensor'].tolist() == [1., 1., 1.]
+
+    writer.save({'tensor': tensor}, os.path.join(tmpdir, 'missing', 'b.ckpt'))
+    with pytest.raises(OSError):
+        writer.wait()
+    writer.close()
+
+
+def test_spawn_weights_in_process():
+    """Verify that handing back the weights is skipped when the training ran in this process,
+    as for a single TPU core."""
+    model = LightningTestModel(tutils.get_default_hparams())
+    weights = {name: p.detach().clone() for name, p in model.named_parameters()}
+    trainer = Trainer()
+    trainer.model = model
+
+    trainer.init_spawn_weights_queue(in_process=True)
+    assert trainer.spawn_weights_queue is None
+    # would wait for a receiver which doesn't exist otherwise
+    trainer.save_spawn_weights(model)
+    trainer.load_spawn_weights(model, None)
+
+    assert trainer.spawn_weights_queue is None and trainer.spawn_weights_received is None
+    for name, p in model.named_parameters():
+        assert torch.equal(p, weights[name])
+
+
 def _init_steps_model():
     """private method for initializing a model with 5% train epochs"""
     tutils.reset_seed()
@@ -633,6 +774,307 @@ def test_nan_params_detection(tmpdir):
     assert not torch.isfinite(params).all()
 
 
+def test_nan_check_interval(tmpdir):
+    """Test that the nan check can be disabled and does not fail on large finite values."""
+
+    class NanParamModel(LightTrainDataloader, TestModelBase):
+
+        def on_after_backward(self):
+            torch.nn.init.constant_(self.c_d1.bias, math.nan)
+
+    hparams = tutils.get_default_hparams()
+    model = NanParamModel(hparams)
+    trainer = Trainer(
+        default_save_path=tmpdir,
+        max_steps=3,
+        nan_check_interval=0,
+        logger=False,
+    )
+    trainer.fit(model)
+    assert trainer.global_step == 3
+
+    # the sum of these weights overflows, which must not be mistaken for an inf
+    model = TestModelBase(hparams)
+    trainer.model = model
+    torch.nn.init.constant_(model.c_d1.bias, 3e38)
+    trainer.detect_nan_tensors(torch.tensor(1.))
+    assert _all_finite(list(model.parameters()))
+
+    torch.nn.init.constant_(model.c_d1.bias[:1], math.inf)
+    assert not _all_finite(list(model.parameters()))
+    torch.nn.init.constant_(model.c_d1.bias[:1], math.nan)
+    assert not _all_finite(list(model.parameters()))
+
+
+def test_gradient_clipping():
+    """Test that the gradients are clipped like torch does it, by norm, by value and per optimizer."""
+    hparams = tutils.get_default_hparams()
+    model = TestModelBase(hparams)
+    parameters = [p for p in model.parameters()]
+
+    def set_grads():
+        torch.manual_seed(0)
+        for p in parameters:
+            p.grad = torch.randn_like(p) * 10
+
+    trainer = Trainer(gradient_clip_val=1.0, logger=False, checkpoint_callback=False)
+    trainer.model = model
+
+    set_grads()
+    expected = [torch.nn.Parameter(p.detach().clone()) for p in parameters]
+    for p, expected_p in zip(parameters, expected):
+        expected_p.grad = p.grad.clone()
+    torch.nn.utils.clip_grad_norm_(expected, 1.0)
+    trainer.clip_gradients()
+    for p, expected_p in zip(parameters, expected):
+        assert torch.allclose(p.grad, expected_p.grad)
+
+    # only the parameters of the given optimizer are clipped
+    set_grads()
+    optimizer = torch.optim.SGD(parameters[:1], lr=0.1)
+    untouched = parameters[-1].grad.clone()
+    trainer.clip_gradients(optimizer)
+    assert parameters[0].grad.norm() <= 1.0 + 1e-4
+    assert torch.equal(parameters[-1].grad, untouched)
+
+    trainer.gradient_clip_algorithm = 'value'
+    set_grads()
+    expected = [p.grad.clamp(-1.0, 1.0) for p in parameters]
+    trainer.clip_gradients()
+    assert all(torch.equal(p.grad, expected_grad) for p, expected_grad in zip(parameters, expected))
+
+    with pytest.raises(MisconfigurationException):
+        Trainer(gradient_clip_algorithm='foo')
+
+
+def test_grad_norm():
+    """Test the gradient norms per parameter, per group and in total."""
+    hparams = tutils.get_default_hparams()
+    model = TestModelBase(hparams)
+    for p in model.parameters():
+        p.grad = torch.ones_like(p)
+
+    norms = model.grad_norm(2)
+    assert norms['grad_2_norm_c_d1.weight'] == round(math.sqrt(model.c_d1.weight.numel()), 3)
+    num_params = sum(p.numel() for p in model.parameters())
+    assert norms['grad_2_norm_total'] == round(math.sqrt(num_params), 3)
+
+    norms = model.grad_norm(2, group_depth=1)
+    c_d1_params = model.c_d1.weight.numel() + model.c_d1.bias.numel()
+    assert norms['grad_2_norm_c_d1'] == round(math.sqrt(c_d1_params), 3)
+    assert 'grad_2_norm_c_d1.weight' not in norms
+    assert norms['grad_2_norm_total'] == round(math.sqrt(num_params), 3)
+
+
+def test_training_epoch_accumulate(tmpdir):
+    """Test that the epoch outputs are folded into a state instead of being collected."""
+
+    class AccumulateModel(LightTrainDataloader, TestModelBase):
+
+        def training_epoch_accumulate(self, state, output):
+            if state is None:
+                state = EpochOutputReducer(loss='mean', steps='sum')
+            assert not output['loss'].requires_grad
+            state.update({'loss': output['loss'], 'steps': 1})
+            return state
+
+        def training_epoch_end(self, state):
+            self.epoch_state = state.compute()
+            return {'log': {'train_loss': self.epoch_state['loss']}}
+
+    hparams = tutils.get_default_hparams()
+    model = AccumulateModel(hparams)
+
+    trainer = Trainer(
+        default_save_path=tmpdir,
+        max_epochs=1,
+        train_percent_check=0.1,
+        logger=False,
+    )
+    trainer.fit(model)
+
+    assert model.epoch_state['steps'] == trainer.num_training_batches
+    assert torch.isfinite(model.epoch_state['loss'])
+
+
+def test_epoch_output_reducer_promotes_dtype():
+    """Test that the running sums take the type of all the values folded into them."""
+    reducer = EpochOutputReducer(total='sum', loss='mean', correct='sum')
+    reducer.update({'total': 1, 'loss': torch.tensor(2), 'correct': torch.tensor([True, False])})
+    reducer.update({'total': 0.5, 'loss': torch.tensor(1.5), 'correct': torch.tensor([True, True])})
+    results = reducer.compute()
+    assert results['total'].item() == 1.5
+    assert results['loss'].item() == 1.75
+    assert results['correct'].tolist() == [2, 1]
+
+
+def test_training_outputs_retention(tmpdir):
+    """Test that only the requested keys of the training outputs are kept for the epoch end."""
+
+    class RetentionModel(LightTrainDataloader, TestModelBase):
+
+        def training_step(self, batch, batch_idx):
+            output = super().training_step(batch, batch_idx)
+            output['activations'] = [torch.rand(32, 100), torch.rand(32, 100)]
+            return output
+
+        def training_epoch_end(self, outputs):
+            self.epoch_outputs = outputs
+            return {}
+
+    hparams = tutils.get_default_hparams()
+    model = RetentionModel(hparams)
+
+    trainer = Trainer(
+        default_save_path=tmpdir,
+        max_epochs=1,
+        train_percent_check=0.1,
+        training_outputs_retention=['loss'],
+        logger=False,
+    )
+    trainer.fit(model)
+
+    assert len(model.epoch_outputs) == trainer.num_training_batches
+    assert all(list(output.keys()) == ['loss'] for output in model.epoch_outputs)
+    assert not any(output['loss'].requires_grad for output in model.epoch_outputs)
+
+    with pytest.raises(MisconfigurationException):
+        Trainer(training_outputs_retention='none')
+
+
+def test_running_loss_accumulation(tmpdir):
+    """Test that the running loss holds the mean of each gradient accumulation window."""
+
+    class CurrentTestModel(LightTrainDataloader, TestModelBase):
+
+        def training_step(self, batch, batch_idx):
+            output = super().training_step(batch, batch_idx)
+            self.losses.append(output['loss'].detach())
+            return output
+
+    hparams = tutils.get_default_hparams()
+    model = CurrentTestModel(hparams)
+    model.losses = []
+
+    trainer = Trainer(
+        default_save_path=tmpdir,
+        max_epochs=1,
+        max_steps=3,
+        accumulate_grad_batches=3,
+        logger=False,
+    )
+    trainer.fit(model)
+
+    # the loss of every batch is scaled by the number of accumulated batches
+    expected = torch.stack(model.losses).view(-1, 3).mean(dim=1) / 3
+    assert len(expected) == 3
+    assert torch.allclose(trainer.running_loss.memory[:3], expected)
+    assert torch.allclose(trainer.running_loss.mean(), expected.mean())
+    assert torch.allclose(trainer.running_loss.min(), expected.min())
+
+
+@pytest.mark.parametrize('min_interval', [0, 3600])
+def test_progress_bar_min_interval(tmpdir, min_interval):
+    """Test that the progress bar metrics are only read when the bar refreshes."""
+
+    class CurrentTestModel(LightTrainDataloader, TestModelBase):
+
+        def get_tqdm_dict(self):
+            self.tqdm_reads += 1
+            return super().get_tqdm_dict()
+
+    hparams = tutils.get_default_hparams()
+    model = CurrentTestModel(hparams)
+    model.tqdm_reads = 0
+
+    trainer = Trainer(
+        default_save_path=tmpdir,
+        max_epochs=1,
+        progress_bar_min_interval=min_interval,
+        logger=False,
+    )
+    trainer.fit(model)
+
+    if min_interval:
+        # the first batch and the end of the epoch
+        assert model.tqdm_reads == 2
+    else:
+        assert model.tqdm_reads == trainer.num_training_batches
+    assert trainer.main_progress_bar.n == trainer.num_training_batches
+
+
+def test_throughput_window(tmpdir):
+    """Test that the throughput of the recent training steps is computed and logged."""
+    hparams = tutils.get_default_hparams()
+    model = LightningTestModel(hparams)
+
+    trainer = Trainer(
+        default_save_path=tmpdir,
+        max_epochs=1,
+        train_percent_check=0.1,
+        val_percent_check=0.1,
+        throughput_window=4,
+        logger=False,
+    )
+    logged_metrics = []
+    trainer.log_metrics = lambda metrics, grad_norm_dic, step=None: logged_metrics.append(metrics)
+    trainer.fit(model)
+
+    assert trainer.throughput.num_steps == trainer.num_training_batches
+    metrics = trainer.throughput.metrics()
+    assert metrics['throughput/samples_per_sec'] > 0
+    assert metrics['throughput/step_time_p50'] <= metrics['throughput/step_time_p95']
+    fractions = [v for k, v in metrics.items() if k.endswith('_fraction')]
+    assert len(fractions) == 4
+    assert all(0 <= v <= 1 for v in fractions) and sum(fractions) <= 1
+    assert any('throughput/samples_per_sec' in metrics for metrics in logged_metrics)
+
+    # a window of 0 doesn't time the steps at all
+    trainer = Trainer(
+        default_save_path=tmpdir,
+        max_epochs=1,
+        train_percent_check=0.1,
+        val_percent_check=0.1,
+        throughput_window=0,
+        logger=False,
+    )
+    trainer.throughput.clock = lambda: pytest.fail('the disabled throughput monitor read the clock')
+    trainer.fit(model)
+    assert trainer.throughput.num_steps == 0
+
+
+def test_validation_epoch_accumulate(tmpdir):
+    """Test that the validation outputs are folded into a state instead of being collected."""
+
+    class AccumulateModel(LightTrainDataloader, LightValidationStepMixin, TestModelBase):
+
+        def validation_epoch_accumulate(self, state, output):
+            if state is None:
+                state = EpochOutputReducer(val_loss='mean', val_acc='cat', offload=True)
+            state.update(output)
+            return state
+
+        def validation_epoch_end(self, state):
+            self.epoch_state = state.compute()
+            return {'val_loss': self.epoch_state['val_loss']}
+
+    hparams = tutils.get_default_hparams()
+    model = AccumulateModel(hparams)
+
+    trainer = Trainer(
+        default_save_path=tmpdir,
+        max_epochs=1,
+        train_percent_check=0.1,
+        val_percent_check=0.1,
+        num_sanity_val_steps=0,
+        logger=False,
+    )
+    trainer.fit(model)
+
+    assert model.epoch_state['val_acc'].shape == (trainer.num_val_batches,)
+    assert trainer.callback_metrics['val_loss'] == model.epoch_state['val_loss'].item()
+
+
 def test_trainer_interrupted_flag(tmpdir):
     """Test the flag denoting that a user interrupted training."""
 